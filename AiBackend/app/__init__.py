@@ -1,14 +1,32 @@
 from flask import Flask, jsonify
 from flask_cors import CORS
 import os
+import time
+
+from app import pdf_text, providers, resources, soil, weather
+from app.blueprint_loader import register_eager, register_lazy
+from app.http_client import pool_stats
+from app.procstats import memory_usage, rss_delta_mb, rss_mb
 
 def create_app():
+    started = time.perf_counter()
+    rss_at_start = rss_mb()
+
     app = Flask(__name__)
     CORS(app)
     
     # Track loaded blueprints for status endpoint
     app.config['LOADED_BLUEPRINTS'] = []
     app.config['FAILED_BLUEPRINTS'] = []
+    app.config['BLUEPRINT_REPORT'] = {}
+    app.config['PRELOADED'] = False  # set by gunicorn.conf.py when the master preloads
+    # Werkzeug refuses larger request bodies (413) before they are read, chunked ones included
+    app.config['MAX_CONTENT_LENGTH'] = pdf_text.MAX_REQUEST_BYTES
+
+    # Lazy mode registers lightweight stubs and imports each route module
+    # (embeddings, Chroma, LLM clients) on the first request to one of its URLs
+    app.config['LAZY_BLUEPRINTS'] = os.getenv("LAZY_BLUEPRINTS", "false").lower() == "true"
+    register = register_lazy if app.config['LAZY_BLUEPRINTS'] else register_eager
 
     # ============================================
     # CORE ROUTES (Always required)
@@ -24,6 +42,8 @@ def create_app():
         ('app.routes.crop_suggestion', 'crop_suggestion_bp'),
         ('app.routes.crop_calendar', 'crop_calendar_bp'),
         ('app.routes.water_management', 'water_management_bp'),
+        ('app.routes.weather', 'weather_bp'),
+        ('app.routes.prices', 'prices_bp'),
     ]
     
     # ============================================
@@ -43,9 +63,7 @@ def create_app():
     def safe_register_blueprint(module_path, bp_name):
         """Safely register a blueprint with fallback handling"""
         try:
-            module = __import__(module_path, fromlist=[bp_name])
-            blueprint = getattr(module, bp_name)
-            app.register_blueprint(blueprint)
+            register(app, module_path, bp_name)
             app.config['LOADED_BLUEPRINTS'].append(bp_name)
             return True
         except ImportError as e:
@@ -122,6 +140,22 @@ def create_app():
                 "total_loaded": len(app.config['LOADED_BLUEPRINTS']),
                 "total_failed": len(app.config['FAILED_BLUEPRINTS'])
             },
+            "startup": {
+                "mode": "lazy" if app.config['LAZY_BLUEPRINTS'] else "eager",
+                "create_app_seconds": app.config['STARTUP_SECONDS'],
+                "rss_after_startup_mb": app.config['STARTUP_RSS_MB'],
+                "rss_now_mb": rss_mb(),
+                "blueprints": app.config['BLUEPRINT_REPORT']
+            },
+            "shared_resources": resources.stats(),
+            "http_pools": pool_stats(),
+            "weather_cache": weather.stats(),
+            "soil_cache": soil.stats(),
+            "worker": {
+                "pid": os.getpid(),
+                "preloaded_by_master": app.config['PRELOADED'],
+                "memory": memory_usage()
+            },
             "api_keys": {
                 "configured": configured_keys,
                 "total": len(api_keys),
@@ -132,64 +166,75 @@ def create_app():
                 "fallback_1": "openrouter" if api_keys["OPENROUTER_API_KEY"] else None,
                 "fallback_2": "huggingface" if api_keys["HUGGINGFACE_API_KEY"] else None,
                 "fallback_3": "groq" if api_keys["GROQ_API_KEY"] else None,
-            }
+                "available": providers.available_providers(),
+                "fallback_mode": providers.FALLBACK_MODE,
+                "latency": providers.latency_stats()
+            },
+            "ai_provider_health": providers.breaker_stats()
         }), 200
     
     @app.route('/api/ai-fallback', methods=['POST'])
     def ai_with_fallback():
         """
         Unified AI endpoint with automatic fallback
-        Tries: Gemini -> OpenRouter -> HuggingFace -> Groq
+        Tries: Gemini -> OpenRouter -> HuggingFace -> Groq, skipping providers
+        whose circuit breaker is open
+
+        "mode": "hedged" (or AI_FALLBACK_MODE=hedged) starts the next provider
+        in parallel once the current one is slower than its p95 latency;
+        "hedge_delay" overrides that delay in seconds.
         """
         from flask import request
-        import requests as req
         
         data = request.json or {}
         message = data.get("message", "")
         context = data.get("context", "advisory")
+        lang = data.get("lang", "English")
         
         if not message:
             return jsonify({"error": "Message is required"}), 400
         
-        providers = []
-        
-        # Try Gemini first
-        if os.getenv("GOOGLE_API_KEY"):
-            providers.append(("gemini", "/gemini/chat"))
-        
-        # Try OpenRouter
-        if os.getenv("OPENROUTER_API_KEY"):
-            providers.append(("openrouter", "/openrouter/chat"))
-        
-        # Try HuggingFace
-        if os.getenv("HUGGINGFACE_API_KEY"):
-            providers.append(("huggingface", "/huggingface/chat"))
-        
-        # Try internal endpoints
-        for provider_name, endpoint in providers:
+        # Providers are called in-process through their generate() functions
+        messages = [{"role": "user", "content": message}]
+        mode = data.get("mode", providers.FALLBACK_MODE)
+        hedge = None
+        if mode == "hedged":
             try:
-                # Make internal request
-                with app.test_client() as client:
-                    if provider_name == "huggingface":
-                        resp = client.post(endpoint, json={"query": message, "context": context})
-                    else:
-                        resp = client.post(endpoint, json={"message": message, "context": context})
-                    
-                    if resp.status_code == 200:
-                        result = resp.get_json()
-                        result["provider"] = provider_name
-                        return jsonify(result), 200
-            except Exception as e:
-                print(f"Fallback: {provider_name} failed: {e}")
-                continue
+                delay = float(data["hedge_delay"]) if data.get("hedge_delay") is not None else None
+            except (TypeError, ValueError):
+                return jsonify({"error": "hedge_delay must be a number of seconds"}), 400
+            result, attempts, hedge = providers.generate_hedged(messages, context, lang, delay)
+        else:
+            result, attempts = providers.generate_with_fallback(messages, context, lang)
         
-        return jsonify({
+        if result:
+            response = {
+                "success": True,
+                **result,
+                "context": context,
+                "attempts": attempts
+            }
+            if hedge:
+                response["hedge"] = hedge
+            return jsonify(response), 200
+        
+        response = {
             "error": "All AI providers failed",
-            "tried": [p[0] for p in providers]
-        }), 503
+            "tried": [a["provider"] for a in attempts],
+            "attempts": attempts
+        }
+        if hedge:
+            response["hedge"] = hedge
+        return jsonify(response), 503
     
+    app.config['STARTUP_SECONDS'] = round(time.perf_counter() - started, 3)
+    app.config['STARTUP_RSS_MB'] = rss_mb()
+    startup_rss_delta = rss_delta_mb(rss_at_start)
+
     print(f"\n✅ AgriX Backend Ready!")
     print(f"   Loaded: {len(app.config['LOADED_BLUEPRINTS'])} routes")
-    print(f"   Failed: {len(app.config['FAILED_BLUEPRINTS'])} routes\n")
+    print(f"   Failed: {len(app.config['FAILED_BLUEPRINTS'])} routes")
+    print(f"   Startup: {app.config['STARTUP_SECONDS']}s, "
+          f"RSS {app.config['STARTUP_RSS_MB']} MB (+{startup_rss_delta} MB)\n")
     
     return app
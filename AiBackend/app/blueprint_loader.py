@@ -0,0 +1,218 @@
+import ast
+import importlib
+import importlib.util
+import threading
+import time
+
+from flask import Blueprint, jsonify
+from werkzeug.exceptions import HTTPException
+
+from app.procstats import rss_delta_mb, rss_mb
+
+
+def _timed_import(module_path):
+    """Import a route module and measure wall time and RSS growth"""
+    rss_before = rss_mb()
+    started = time.perf_counter()
+    module = importlib.import_module(module_path)
+    return module, {
+        "import_seconds": round(time.perf_counter() - started, 3),
+        "rss_delta_mb": rss_delta_mb(rss_before),
+    }
+
+
+def discover_routes(module_path, bp_name):
+    """
+    Read a route module's source (without importing it) and return
+    (blueprint_name, [(rule, methods, view_func_name), ...]).
+
+    Only the `Blueprint('name', __name__)` assignment and
+    `@<bp>.route(rule, methods=[...])` decorators are understood; anything
+    else makes this return None so the caller can fall back to eager loading.
+    """
+    spec = importlib.util.find_spec(module_path)
+    if spec is None or not spec.origin:
+        return None
+
+    with open(spec.origin, encoding="utf-8") as f:
+        tree = ast.parse(f.read(), filename=spec.origin)
+
+    blueprint_name = None
+    routes = []
+
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and isinstance(node.value, ast.Call):
+            targets = [t.id for t in node.targets if isinstance(t, ast.Name)]
+            func = node.value.func
+            if bp_name in targets and getattr(func, "id", None) == "Blueprint":
+                first_arg = node.value.args[0] if node.value.args else None
+                if isinstance(first_arg, ast.Constant):
+                    blueprint_name = first_arg.value
+
+        if isinstance(node, ast.FunctionDef):
+            for deco in node.decorator_list:
+                if not (isinstance(deco, ast.Call) and isinstance(deco.func, ast.Attribute)):
+                    continue
+                owner = deco.func.value
+                if not (isinstance(owner, ast.Name) and owner.id == bp_name and deco.func.attr == "route"):
+                    continue
+                if not deco.args or not isinstance(deco.args[0], ast.Constant):
+                    return None
+                methods = ["GET"]
+                for kw in deco.keywords:
+                    if kw.arg == "methods":
+                        methods = [ast.literal_eval(m) for m in kw.value.elts]
+                    else:
+                        return None
+                routes.append((deco.args[0].value, methods, node.name))
+
+    if not blueprint_name or not routes:
+        return None
+    return blueprint_name, routes
+
+
+class LazyBlueprint:
+    """
+    A stub blueprint exposing a route module's URL rules without importing it.
+
+    The real module (and whatever heavy state it builds at import time) is
+    imported on the first request to any of its URLs. Views, the module
+    blueprint's before/after/teardown request hooks and its error handlers
+    are then proxied to the real blueprint, so responses match eager mode.
+    """
+
+    def __init__(self, app, module_path, bp_name, blueprint_name, routes):
+        self.app = app
+        self.module_path = module_path
+        self.bp_name = bp_name
+        self.blueprint_name = blueprint_name
+        self.routes = routes
+        self.module = None
+        self.error = None
+        self._lock = threading.Lock()
+
+    def build_stub(self):
+        stub = Blueprint(self.blueprint_name, self.module_path)
+        for rule, methods, func_name in self.routes:
+            stub.add_url_rule(rule, endpoint=func_name, view_func=self._proxy(func_name), methods=methods)
+
+        @stub.after_request
+        def after_request(response):
+            if self.module is None:
+                return response
+            real_bp = getattr(self.module, self.bp_name)
+            for func in reversed(real_bp.after_request_funcs.get(None, [])):
+                response = func(response)
+            return response
+
+        @stub.teardown_request
+        def teardown_request(exc):
+            if self.module is None:
+                return
+            real_bp = getattr(self.module, self.bp_name)
+            for func in reversed(real_bp.teardown_request_funcs.get(None, [])):
+                func(exc)
+
+        return stub
+
+    @staticmethod
+    def _error_handler(real_bp, e):
+        """The real blueprint's handler for e, looked up as Flask does (by status code, then class)"""
+        spec = real_bp.error_handler_spec.get(None, {})
+        code = e.code if isinstance(e, HTTPException) else None
+        for key in ((code, None) if code else (None,)):
+            handlers = spec.get(key, {})
+            for cls in type(e).__mro__:
+                if cls in handlers:
+                    return handlers[cls]
+        return None
+
+    def load(self):
+        """Import the real module once; safe to call from many threads"""
+        if self.module is not None or self.error is not None:
+            return self.module
+
+        with self._lock:
+            if self.module is not None or self.error is not None:
+                return self.module
+            try:
+                module, timing = _timed_import(self.module_path)
+                getattr(module, self.bp_name)
+                self.module = module
+                self.app.config['BLUEPRINT_REPORT'][self.bp_name].update(timing, imported=True)
+                print(f"  ✅ {self.bp_name} loaded on first use ({timing['import_seconds']}s)")
+            except Exception as e:
+                self.error = str(e)
+                print(f"⚠️ Warning: Could not lazily import {self.module_path}: {e}")
+                if self.bp_name in self.app.config['LOADED_BLUEPRINTS']:
+                    self.app.config['LOADED_BLUEPRINTS'].remove(self.bp_name)
+                self.app.config['FAILED_BLUEPRINTS'].append({
+                    'name': self.bp_name,
+                    'error': self.error,
+                    'type': 'lazy_import_error'
+                })
+        return self.module
+
+    def _proxy(self, func_name):
+        def view(**kwargs):
+            module = self.load()
+            if module is None:
+                return jsonify({
+                    "error": f"Route module unavailable: {self.bp_name}",
+                    "details": self.error
+                }), 503
+            real_bp = getattr(module, self.bp_name)
+            try:
+                for func in real_bp.before_request_funcs.get(None, []):
+                    response = func()
+                    if response is not None:
+                        return response
+                return getattr(module, func_name)(**kwargs)
+            except Exception as e:
+                handler = self._error_handler(real_bp, e)
+                if handler is None:
+                    raise
+                return handler(e)
+
+        view.__name__ = func_name
+        return view
+
+
+def register_eager(app, module_path, bp_name):
+    """Import a route module now and register its blueprint"""
+    module, timing = _timed_import(module_path)
+    app.register_blueprint(getattr(module, bp_name))
+    app.config['BLUEPRINT_REPORT'][bp_name] = dict(
+        module=module_path, mode="eager", imported=True, **timing
+    )
+
+
+def register_lazy(app, module_path, bp_name):
+    """
+    Register a stub for a route module, importing it on first request.
+    Falls back to eager registration if the module's routes cannot be
+    discovered from source.
+    """
+    discovered = discover_routes(module_path, bp_name)
+    if discovered is None:
+        register_eager(app, module_path, bp_name)
+        return
+
+    blueprint_name, routes = discovered
+    lazy = LazyBlueprint(app, module_path, bp_name, blueprint_name, routes)
+    app.register_blueprint(lazy.build_stub())
+    app.extensions.setdefault('lazy_blueprints', []).append(lazy)
+    app.config['BLUEPRINT_REPORT'][bp_name] = {
+        "module": module_path,
+        "mode": "lazy",
+        "imported": False,
+        "import_seconds": None,
+        "rss_delta_mb": None,
+        "routes": len(routes),
+    }
+
+
+def load_all(app):
+    """Import every lazily registered route module (e.g. to warm a worker)"""
+    for lazy in app.extensions.get('lazy_blueprints', []):
+        lazy.load()
@@ -0,0 +1,163 @@
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+# Background refreshes for stale-while-revalidate entries
+_refresh_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="cache-refresh")
+
+
+class TTLCache:
+    """
+    Thread-safe in-process cache with per-entry expiry and LRU eviction.
+
+    get_or_load() runs the loader once per key even when many requests miss
+    at the same time; the others wait for that result instead of issuing
+    their own upstream call. With `stale_ttl`, get_or_load_stale() serves an
+    entry for that long past expiry while one background refresh replaces it.
+    """
+
+    def __init__(self, name, ttl, maxsize=1024, stale_ttl=0):
+        self.name = name
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._loading = {}             # key -> Event for an in-flight load
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.loads = 0
+        self.load_errors = 0
+
+    def _lookup(self, key):
+        # Caller holds the lock
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] > time.monotonic():
+            self._entries.move_to_end(key)
+            return entry[1]
+        return None
+
+    def get(self, key):
+        """Cached value or None; counts a hit or miss"""
+        with self._lock:
+            value = self._lookup(key)
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return value
+
+    def set(self, key, value, ttl=None):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def get_or_load(self, key, loader, ttl=None):
+        """
+        Cached value for `key`, calling loader() on a miss. Loader errors
+        propagate to every waiting caller and nothing is cached.
+        """
+        waited = False
+        while True:
+            with self._lock:
+                value = self._lookup(key)
+                if value is not None:
+                    # Requests that waited on another's load count as hits too
+                    self.hits += 1
+                    return value
+                event = self._loading.get(key)
+                if event is None:
+                    if not waited:
+                        self.misses += 1
+                    event = self._loading[key] = threading.Event()
+                    break
+            # Another request is loading this key; wait and re-read (if that
+            # load failed, the loop makes this request the loader)
+            event.wait()
+            waited = True
+
+        try:
+            with self._lock:
+                self.loads += 1
+            value = loader()
+            self.set(key, value, ttl)
+            return value
+        except Exception:
+            with self._lock:
+                self.load_errors += 1
+            raise
+        finally:
+            with self._lock:
+                self._loading.pop(key).set()
+
+    def get_or_load_stale(self, key, loader, ttl=None):
+        """
+        Like get_or_load(), but an entry expired less than `stale_ttl` ago is
+        returned at once while a single background refresh replaces it.
+        Returns (value, state) with state "hit", "stale" or "miss".
+        """
+        with self._lock:
+            value = self._lookup(key)
+            if value is not None:
+                self.hits += 1
+                return value, "hit"
+
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] + self.stale_ttl > time.monotonic():
+                self.stale_hits += 1
+                refresh = key not in self._loading
+                if refresh:
+                    self._loading[key] = threading.Event()
+                stale = entry[1]
+            else:
+                stale = None
+
+        if stale is None:
+            return self.get_or_load(key, loader, ttl), "miss"
+        if refresh:
+            _refresh_executor.submit(self._refresh, key, loader, ttl)
+        return stale, "stale"
+
+    def _refresh(self, key, loader, ttl):
+        try:
+            self.record_load(lambda: self.set(key, loader(), ttl))
+        except Exception as e:
+            print(f"[WARN] {self.name} cache refresh failed for {key}: {e}")
+        finally:
+            with self._lock:
+                self._loading.pop(key).set()
+
+    def record_load(self, loader):
+        """Run a loader that fills several keys itself (batch fetch), counting it as one upstream call"""
+        with self._lock:
+            self.loads += 1
+        try:
+            return loader()
+        except Exception:
+            with self._lock:
+                self.load_errors += 1
+            raise
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            served = self.hits + self.stale_hits
+            lookups = served + self.misses
+            return {
+                "entries": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl_s": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(served / lookups, 3) if lookups else None,
+                **({"stale_ttl_s": self.stale_ttl, "stale_hits": self.stale_hits} if self.stale_ttl else {}),
+                "upstream_calls": self.loads,
+                "upstream_errors": self.load_errors,
+            }
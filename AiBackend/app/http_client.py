@@ -0,0 +1,170 @@
+import os
+import threading
+import time
+from urllib.parse import urlsplit, urlunsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import EmptyPoolError
+
+# ==== UPSTREAMS ====
+# One keep-alive Session per upstream host. Timeouts are (connect, read) in
+# seconds and apply whenever a caller passes no `timeout=` (or None).
+UPSTREAMS = {
+    "groq":        {"host": "api.groq.com",                "connect": 5, "read": 60,  "pool": 20},
+    "openrouter":  {"host": "openrouter.ai",               "connect": 5, "read": 60,  "pool": 20},
+    "huggingface": {"host": "api-inference.huggingface.co", "connect": 5, "read": 120, "pool": 10},
+    "perplexity":  {"host": "api.perplexity.ai",           "connect": 5, "read": 30,  "pool": 10},
+    "open_meteo":  {"host": "api.open-meteo.com",          "connect": 3, "read": 15,  "pool": 10},
+    "openepi":     {"host": "api.openepi.io",              "connect": 5, "read": 20,  "pool": 10},
+    "ambee":       {"host": "api.ambeedata.com",           "connect": 5, "read": 30,  "pool": 10},
+    "upag":        {"host": "data.upag.gov.in",            "connect": 5, "read": 60,  "pool": 10},
+    "myscheme":    {"host": "api.myscheme.gov.in",         "connect": 5, "read": 30,  "pool": 5},
+    "alu":         {"host": "alu.googleapis.com",          "connect": 5, "read": 30,  "pool": 5},
+}
+
+# Overrides every pool size, e.g. for async workers holding many calls in flight
+POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", "0")) or None
+# How long a request may wait for a free pooled connection before failing
+POOL_TIMEOUT = float(os.getenv("HTTP_POOL_TIMEOUT", "10"))
+
+
+def _parse_overrides(value):
+    """
+    Parse HTTP_UPSTREAM_OVERRIDES ("groq=http://127.0.0.1:9100,ambee=...").
+    Requests to an overridden upstream keep their path and query but go to
+    the given scheme://host:port instead; used for staging and benchmarks.
+    """
+    overrides = {}
+    for item in filter(None, (part.strip() for part in value.split(","))):
+        name, _, base = item.partition("=")
+        overrides[name.strip()] = urlsplit(base.strip())
+    return overrides
+
+
+UPSTREAM_OVERRIDES = _parse_overrides(os.getenv("HTTP_UPSTREAM_OVERRIDES", ""))
+
+
+class PoolStats:
+    """Connection checkouts, new connections and pool wait time for one upstream"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.new_connections = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    def record_checkout(self, waited):
+        with self._lock:
+            self.checkouts += 1
+            self.wait_seconds += waited
+            self.max_wait_seconds = max(self.max_wait_seconds, waited)
+
+    def record_new_connection(self):
+        with self._lock:
+            self.new_connections += 1
+
+    def snapshot(self):
+        with self._lock:
+            reused = max(self.checkouts - self.new_connections, 0)
+            return {
+                "requests": self.checkouts,
+                "new_connections": self.new_connections,
+                "reuse_ratio": round(reused / self.checkouts, 3) if self.checkouts else None,
+                "avg_wait_ms": round(self.wait_seconds / self.checkouts * 1000, 2) if self.checkouts else None,
+                "max_wait_ms": round(self.max_wait_seconds * 1000, 2),
+            }
+
+
+def _instrumented_pool(pool_cls, stats):
+    class InstrumentedPool(pool_cls):
+        def _get_conn(self, timeout=None):
+            started = time.perf_counter()
+            conn = super()._get_conn(timeout=POOL_TIMEOUT if timeout is None else timeout)
+            stats.record_checkout(time.perf_counter() - started)
+            return conn
+
+        def _new_conn(self):
+            stats.record_new_connection()
+            return super()._new_conn()
+
+    return InstrumentedPool
+
+
+class PooledAdapter(HTTPAdapter):
+    """HTTPAdapter whose connection pools report into a PoolStats"""
+
+    def __init__(self, stats, **kwargs):
+        self.stats = stats
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _instrumented_pool(HTTPConnectionPool, self.stats),
+            "https": _instrumented_pool(HTTPSConnectionPool, self.stats),
+        }
+
+
+class UpstreamSession(requests.Session):
+    """A keep-alive Session for one upstream host with default timeouts"""
+
+    def __init__(self, name, connect, read, pool, **_):
+        super().__init__()
+        self.name = name
+        self.default_timeout = (connect, read)
+        self.pool_maxsize = POOL_MAXSIZE or pool
+        self.stats = PoolStats()
+        self.override = UPSTREAM_OVERRIDES.get(name)
+        adapter = PooledAdapter(
+            self.stats,
+            pool_connections=4,
+            pool_maxsize=self.pool_maxsize,
+            pool_block=True
+        )
+        self.mount("https://", adapter)
+        self.mount("http://", adapter)
+
+    def request(self, method, url, **kwargs):
+        if kwargs.get("timeout") is None:
+            kwargs["timeout"] = self.default_timeout
+        if self.override is not None:
+            parts = urlsplit(url)
+            url = urlunsplit((self.override.scheme, self.override.netloc, parts.path, parts.query, parts.fragment))
+        try:
+            return super().request(method, url, **kwargs)
+        except EmptyPoolError as e:
+            raise requests.exceptions.ConnectionError(
+                f"{self.name}: no free connection after {POOL_TIMEOUT}s"
+            ) from e
+
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+def get_session(name):
+    """Shared Session for an upstream listed in UPSTREAMS"""
+    session = _sessions.get(name)
+    if session is None:
+        with _sessions_lock:
+            session = _sessions.get(name)
+            if session is None:
+                session = UpstreamSession(name, **UPSTREAMS[name])
+                _sessions[name] = session
+    return session
+
+
+def pool_stats():
+    """Per-upstream pool statistics for upstreams used so far in this process"""
+    return {
+        name: {
+            "host": UPSTREAMS[name]["host"],
+            "pool_maxsize": session.pool_maxsize,
+            "timeout": list(session.default_timeout),
+            **session.stats.snapshot()
+        }
+        for name, session in sorted(_sessions.items())
+    }
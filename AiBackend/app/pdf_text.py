@@ -0,0 +1,88 @@
+import os
+import tempfile
+
+from app.translate_cache import hash_stream
+
+# ==== PDF UPLOADS ====
+# Uploads are spooled to a temp file while they are hashed, then opened by
+# path so MuPDF reads pages from disk on demand instead of holding the whole
+# file (plus a copy) in memory. Limits are checked as early as possible:
+# the request body by Werkzeug (MAX_CONTENT_LENGTH, set from
+# MAX_REQUEST_BYTES in create_app, also for chunked uploads), the file
+# while spooling, the page count on open.
+
+MAX_UPLOAD_BYTES = int(float(os.getenv("TRANSLATE_MAX_UPLOAD_MB", "50")) * 1024 * 1024)
+MAX_REQUEST_BYTES = MAX_UPLOAD_BYTES + 64 * 1024  # allow for multipart overhead
+MAX_PAGES = int(os.getenv("TRANSLATE_MAX_PAGES", "200"))
+SPOOL_DIR = os.getenv("TRANSLATE_SPOOL_DIR") or None  # None: system temp dir
+
+
+class UploadTooLarge(Exception):
+    """The upload exceeds MAX_UPLOAD_BYTES or MAX_PAGES (HTTP 413)"""
+
+
+class UnreadablePDF(Exception):
+    """The upload is not a PDF MuPDF can open (HTTP 400)"""
+
+
+def too_large_message(max_bytes=MAX_UPLOAD_BYTES):
+    return f"Upload is larger than {max_bytes // (1024 * 1024)} MB"
+
+
+def spool_upload(pdf_file, max_bytes=MAX_UPLOAD_BYTES):
+    """
+    Copy an uploaded file to a temp file, hashing it on the way.
+    Returns (path, sha256, size); the caller deletes the file.
+    Raises UploadTooLarge as soon as the size limit is passed.
+    """
+    spool = tempfile.NamedTemporaryFile(suffix=".pdf", dir=SPOOL_DIR, delete=False)
+    written = 0
+
+    def write(block):
+        nonlocal written
+        written += len(block)
+        if written > max_bytes:
+            raise UploadTooLarge(too_large_message(max_bytes))
+        spool.write(block)
+
+    try:
+        with spool:
+            doc_hash, size = hash_stream(pdf_file.stream, write)
+    except BaseException:
+        os.unlink(spool.name)
+        raise
+    return spool.name, doc_hash, size
+
+
+def iter_pages(doc):
+    """Text of each page, one page at a time"""
+    for page in doc:
+        yield page.get_text()
+
+
+def open_pdf(path, max_pages=MAX_PAGES):
+    """
+    Open a spooled PDF by path. Raises UnreadablePDF if it can't be opened
+    (the error text, which names the spool file, is not passed on) and
+    UploadTooLarge beyond max_pages.
+    """
+    import fitz  # PyMuPDF
+
+    try:
+        doc = fitz.open(path, filetype="pdf")
+    except Exception as e:
+        print(f"[WARN] Could not open uploaded PDF: {e}")
+        raise UnreadablePDF("PDF appears empty or unreadable.")
+    page_count = doc.page_count
+    if page_count > max_pages:
+        doc.close()
+        raise UploadTooLarge(f"PDF has {page_count} pages; the limit is {max_pages}")
+    return doc
+
+
+def remove_spool(path):
+    if path:
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
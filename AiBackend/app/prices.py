@@ -0,0 +1,300 @@
+import re
+import time
+from datetime import datetime
+
+import numpy as np
+
+# ==== MANDI PRICE INDEX ====
+# agmarknet arrivals held as flat NumPy arrays sorted by (series, date),
+# where a series is one commodity at one market. Rolling and week-on-week
+# analytics are computed for every row at once when the index is built, so
+# a query is a dictionary lookup plus array slicing.
+
+DEFAULT_WINDOW = 7  # days
+WOW_DAYS = 7
+WOW_MAX_LOOKBACK = 14  # week-on-week ignores reference prices older than this
+
+# Field -> record keys it is read from (agmarknet exports vary in naming)
+FIELD_KEYS = {
+    "commodity": ["commodity", "commodity_name", "Commodity", "crop_name"],
+    "market": ["market", "market_name", "Market", "apmc", "mandi"],
+    "state": ["state", "state_name", "State"],
+    "district": ["district", "district_name", "District"],
+    "date": ["arrival_date", "date", "price_date", "Arrival_Date", "reported_date"],
+    "min_price": ["min_price", "Min_Price", "minimum_price"],
+    "max_price": ["max_price", "Max_Price", "maximum_price"],
+    "modal_price": ["modal_price", "Modal_Price", "price"],
+}
+DATE_FORMATS = ["%Y-%m-%d", "%d/%m/%Y", "%d-%m-%Y", "%Y/%m/%d", "%d-%b-%Y", "%Y-%m-%dT%H:%M:%S"]
+_DAY_BITS = 21  # days since 1970 fit in 21 bits until the year 7711
+
+
+def _field(record, name):
+    for key in FIELD_KEYS[name]:
+        value = record.get(key)
+        if value not in (None, ""):
+            return value
+    return None
+
+
+def parse_date(value):
+    """Days since 1970-01-01 for the date formats agmarknet uses, or None"""
+    text = str(value).strip()[:19]
+    for fmt in DATE_FORMATS:
+        try:
+            return (datetime.strptime(text, fmt) - datetime(1970, 1, 1)).days
+        except ValueError:
+            continue
+    return None
+
+
+def _price(value):
+    try:
+        price = float(re.sub(r"[^0-9.]", "", str(value)))
+    except ValueError:
+        return np.nan
+    return price if price > 0 else np.nan
+
+
+def _day_string(day):
+    return str(np.datetime64(int(day), "D"))
+
+
+def window_starts(keys, window):
+    """Index of the first row within `window` days before each row, in the same series"""
+    return np.searchsorted(keys, keys - (window - 1), side="left")
+
+
+def range_reduce(values, starts, func):
+    """
+    func (np.fmin or np.fmax) over values[starts[i]:i + 1] for every i, via a
+    sparse table: O(n log w) for windows of at most w rows. NaNs are ignored.
+    """
+    n = len(values)
+    if n == 0:
+        return values.copy()
+    idx = np.arange(n)
+    lengths = idx - starts + 1
+    levels = int(np.log2(lengths.max())) + 1
+    table = np.full((levels, n), np.nan)
+    table[0] = values
+    for k in range(1, levels):
+        half = 1 << (k - 1)
+        table[k, :n - half] = func(table[k - 1, :n - half], table[k - 1, half:])
+    k = np.log2(lengths).astype(np.int64)
+    return func(table[k, starts], table[k, idx - (1 << k) + 1])
+
+
+def rolling_stats(keys, series, days, min_price, max_price, modal, window):
+    """
+    Per-row analytics over each row's trailing `window` days in its series:
+    rolling min of min_price, max of max_price and mean of modal_price, plus
+    the % change in modal price against the last price 7-14 days earlier.
+    """
+    starts = window_starts(keys, window)
+
+    valid = ~np.isnan(modal)
+    sums = np.concatenate([[0.0], np.cumsum(np.where(valid, modal, 0.0))])
+    counts = np.concatenate([[0], np.cumsum(valid)])
+    idx = np.arange(len(keys))
+    n_valid = counts[idx + 1] - counts[starts]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        rolling_mean = np.where(n_valid > 0, (sums[idx + 1] - sums[starts]) / n_valid, np.nan)
+
+    prev = np.searchsorted(keys, keys - WOW_DAYS, side="right") - 1
+    prev_clipped = np.clip(prev, 0, None)
+    comparable = ((prev >= 0) & (series[prev_clipped] == series)
+                  & (days - days[prev_clipped] <= WOW_MAX_LOOKBACK))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        wow = np.where(comparable, (modal - modal[prev_clipped]) / modal[prev_clipped] * 100, np.nan)
+
+    return {
+        "rolling_min": range_reduce(min_price, starts, np.fmin),
+        "rolling_max": range_reduce(max_price, starts, np.fmax),
+        "rolling_mean": rolling_mean,
+        "wow_change_pct": wow,
+    }
+
+
+class PriceIndex:
+    """
+    Time-series index of mandi prices keyed by (commodity, market, date).
+    Several arrivals for the same series and day are merged: lowest min,
+    highest max, mean modal price.
+    """
+
+    def __init__(self, records, window=DEFAULT_WINDOW):
+        started = time.perf_counter()
+        self.window = window
+        series_ids = {}
+        self.series_meta = []  # id -> {"commodity", "market", "state", "district"}
+        sid, days, mins, maxs, modals = [], [], [], [], []
+        parsed_dates = {}
+        skipped = 0
+
+        for record in records:
+            commodity, market = _field(record, "commodity"), _field(record, "market")
+            raw_date = _field(record, "date") or ""
+            day = parsed_dates.get(raw_date)
+            if day is None:
+                day = parsed_dates[raw_date] = parse_date(raw_date)
+            if not commodity or not market or day is None:
+                skipped += 1
+                continue
+            key = (str(commodity).strip().lower(), str(market).strip().lower())
+            series = series_ids.get(key)
+            if series is None:
+                series = series_ids[key] = len(self.series_meta)
+                self.series_meta.append({
+                    "commodity": str(commodity).strip(),
+                    "market": str(market).strip(),
+                    "state": _field(record, "state"),
+                    "district": _field(record, "district"),
+                })
+            sid.append(series)
+            days.append(day)
+            mins.append(_price(_field(record, "min_price")))
+            maxs.append(_price(_field(record, "max_price")))
+            modals.append(_price(_field(record, "modal_price")))
+
+        keys = (np.asarray(sid, dtype=np.int64) << _DAY_BITS) | np.asarray(days, dtype=np.int64)
+        order = np.argsort(keys, kind="stable")
+        keys = keys[order]
+        mins = np.asarray(mins, dtype=np.float64)[order]
+        maxs = np.asarray(maxs, dtype=np.float64)[order]
+        modals = np.asarray(modals, dtype=np.float64)[order]
+
+        # Merge duplicate (series, day) rows
+        self.keys, first = np.unique(keys, return_index=True)
+        if len(first) < len(keys):
+            valid = ~np.isnan(modals)
+            modal_sum = np.add.reduceat(np.where(valid, modals, 0.0), first)
+            modal_n = np.add.reduceat(valid.astype(np.int64), first)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                modals = np.where(modal_n > 0, modal_sum / modal_n, np.nan)
+            mins = np.fmin.reduceat(mins, first)
+            maxs = np.fmax.reduceat(maxs, first)
+
+        self.series = self.keys >> _DAY_BITS
+        self.days = self.keys & ((1 << _DAY_BITS) - 1)
+        self.min_price, self.max_price, self.modal_price = mins, maxs, modals
+        self.analytics = rolling_stats(self.keys, self.series, self.days, mins, maxs, modals, window)
+
+        # Row range of each series, and series ids per commodity
+        bounds = np.searchsorted(self.series, np.arange(len(self.series_meta) + 1))
+        self.ranges = list(zip(bounds[:-1].tolist(), bounds[1:].tolist()))
+        self.by_commodity = {}
+        for series, meta in enumerate(self.series_meta):
+            self.by_commodity.setdefault(meta["commodity"].lower(), []).append(series)
+
+        self.skipped = skipped
+        self.built_at = time.time()
+        self.build_s = round(time.perf_counter() - started, 3)
+
+    def _select(self, commodity=None, market=None, state=None):
+        if commodity:
+            candidates = self.by_commodity.get(commodity.strip().lower(), [])
+        else:
+            candidates = range(len(self.series_meta))
+        market = market.strip().lower() if market else None
+        state = state.strip().lower() if state else None
+        return [
+            series for series in candidates
+            if (not market or self.series_meta[series]["market"].lower() == market)
+            and (not state or str(self.series_meta[series]["state"] or "").lower() == state)
+        ]
+
+    def _row(self, i, analytics):
+        def number(value):
+            return None if np.isnan(value) else round(float(value), 2)
+        return {
+            "date": _day_string(self.days[i]),
+            "min_price": number(self.min_price[i]),
+            "max_price": number(self.max_price[i]),
+            "modal_price": number(self.modal_price[i]),
+            **{name: number(values[i]) for name, values in analytics.items()},
+        }
+
+    def _analytics(self, window, selected):
+        """Analytics for `window`: precomputed, or computed over the selected series' rows only"""
+        if window == self.window:
+            return self.analytics
+        rows = np.concatenate([np.arange(*self.ranges[s]) for s in selected]) if selected else np.array([], dtype=np.int64)
+        partial = rolling_stats(self.keys[rows], self.series[rows], self.days[rows],
+                                self.min_price[rows], self.max_price[rows], self.modal_price[rows], window)
+        analytics = {}
+        for name, values in partial.items():
+            analytics[name] = np.full(len(self.keys), np.nan)
+            analytics[name][rows] = values
+        return analytics
+
+    def series_for(self, commodity, market=None, state=None, start=None, end=None, window=None):
+        """Daily prices with rolling analytics for each matching market, oldest first"""
+        selected = self._select(commodity, market, state)
+        analytics = self._analytics(window or self.window, selected)
+        start_day = parse_date(start) if start else None
+        end_day = parse_date(end) if end else None
+        result = []
+        for series in selected:
+            lo, hi = self.ranges[series]
+            days = self.days[lo:hi]
+            if start_day is not None:
+                lo += int(np.searchsorted(days, start_day, side="left"))
+            if end_day is not None:
+                hi = self.ranges[series][0] + int(np.searchsorted(days, end_day, side="right"))
+            result.append({**self.series_meta[series],
+                           "prices": [self._row(i, analytics) for i in range(lo, hi)]})
+        return result
+
+    def latest(self, commodity=None, state=None, window=None):
+        """Most recent price and analytics per matching market"""
+        selected = self._select(commodity, state=state)
+        analytics = self._analytics(window or self.window, selected)
+        result = []
+        for series in selected:
+            lo, hi = self.ranges[series]
+            if hi > lo:
+                result.append({**self.series_meta[series], **self._row(hi - 1, analytics)})
+        return result
+
+    def summary(self, commodity, state=None, days=WOW_DAYS):
+        """Spread of modal prices across markets over the last `days` days of data"""
+        series = self._select(commodity, state=state)
+        rows = np.concatenate([np.arange(*self.ranges[s]) for s in series]) if series else np.array([], dtype=np.int64)
+        if rows.size == 0:
+            return None
+        latest_day = int(self.days[rows].max())
+        recent = rows[self.days[rows] > latest_day - days]
+        modal = self.modal_price[recent]
+        modal = modal[~np.isnan(modal)]
+        if modal.size == 0:
+            return None
+        wow = self.analytics["wow_change_pct"][recent]
+        wow = wow[~np.isnan(wow)]
+        return {
+            "commodity": self.series_meta[series[0]]["commodity"],
+            "from": _day_string(latest_day - days + 1),
+            "to": _day_string(latest_day),
+            "markets": int(np.unique(self.series[recent]).size),
+            "observations": int(modal.size),
+            "modal_price": {
+                "min": round(float(modal.min()), 2),
+                "max": round(float(modal.max()), 2),
+                "mean": round(float(modal.mean()), 2),
+                "median": round(float(np.median(modal)), 2),
+            },
+            "median_wow_change_pct": round(float(np.median(wow)), 2) if wow.size else None,
+        }
+
+    def stats(self):
+        return {
+            "rows": int(len(self.keys)),
+            "series": len(self.series_meta),
+            "commodities": len(self.by_commodity),
+            "skipped_records": self.skipped,
+            "from": _day_string(self.days.min()) if len(self.keys) else None,
+            "to": _day_string(self.days.max()) if len(self.keys) else None,
+            "window_days": self.window,
+            "build_s": self.build_s,
+            "built_at": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.built_at)),
+        }
@@ -0,0 +1,62 @@
+import os
+import sys
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def rss_mb():
+    """
+    Current resident set size of this process in MB.
+    Reads /proc on Linux and falls back to the peak RSS elsewhere;
+    None where neither is available (Windows).
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            resident_pages = int(f.read().split()[1])
+        return round(resident_pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024), 2)
+    except (OSError, ValueError, IndexError):
+        if resource is None:
+            return None
+        # ru_maxrss is bytes on macOS, KB everywhere else
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        divisor = 1024 * 1024 if sys.platform == "darwin" else 1024
+        return round(peak / divisor, 2)
+
+
+def rss_delta_mb(before):
+    """RSS growth in MB since an earlier rss_mb() reading, or None if RSS is unknown"""
+    now = rss_mb()
+    if now is None or before is None:
+        return None
+    return round(now - before, 2)
+
+
+def memory_usage(pid="self"):
+    """
+    RSS, PSS and USS (unique set size) of a process in MB.
+
+    USS is the memory that would be freed if the process exited; with a
+    preloaded gunicorn master it shows how much each worker has copied
+    away from the shared model pages. Returns only RSS where
+    /proc/<pid>/smaps_rollup is unavailable.
+    """
+    try:
+        fields = {}
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) == 3 and parts[2] == "kB":
+                    fields[parts[0].rstrip(":")] = int(parts[1])
+    except OSError:
+        return {"rss_mb": rss_mb() if pid == "self" else None}
+
+    uss_kb = fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0)
+    return {
+        "rss_mb": round(fields.get("Rss", 0) / 1024, 2),
+        "pss_mb": round(fields.get("Pss", 0) / 1024, 2),
+        "uss_mb": round(uss_kb / 1024, 2),
+        "shared_mb": round((fields.get("Shared_Clean", 0) + fields.get("Shared_Dirty", 0)) / 1024, 2),
+    }
@@ -0,0 +1,411 @@
+import importlib
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, TimeoutError as FutureTimeout, wait
+
+from app.http_client import get_session
+
+# ==== PROVIDER INTERFACE ====
+# Every AI provider module exposes
+#
+#     generate(messages, context, lang, timeout=None) -> {"response": str, "model": str}
+#
+# where `messages` are OpenAI-style {"role", "content"} dicts. Failures raise
+# ProviderError. /api/ai-fallback calls these in-process instead of
+# re-dispatching HTTP requests to each provider's blueprint.
+
+
+class ProviderError(Exception):
+    """A provider could not produce an answer (not configured, upstream error, timeout)"""
+
+    def __init__(self, message, status=None):
+        super().__init__(message)
+        self.status = status
+
+
+def _timeout(name, default):
+    return float(os.getenv(f"AI_TIMEOUT_{name.upper()}", default))
+
+
+# Fallback order, the key each provider needs and its per-call deadline (seconds)
+PROVIDERS = {
+    "gemini":      {"module": "app.routes.gemini",      "env": "GOOGLE_API_KEY",      "timeout": _timeout("gemini", 30)},
+    "openrouter":  {"module": "app.routes.openrouter",  "env": "OPENROUTER_API_KEY",  "timeout": _timeout("openrouter", 45)},
+    "huggingface": {"module": "app.routes.huggingface", "env": "HUGGINGFACE_API_KEY", "timeout": _timeout("huggingface", 60)},
+    "groq":        {"module": "app.providers",          "env": "GROQ_API_KEY",        "timeout": _timeout("groq", 30)},
+}
+
+_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("AI_PROVIDER_THREADS", "32")),
+    thread_name_prefix="ai-provider"
+)
+
+
+# ==== LATENCY TRACKING ====
+# Recent successful call latencies per provider, used to pick hedge delays.
+
+HEDGE_DEFAULT_DELAY = float(os.getenv("AI_HEDGE_DELAY", "8"))      # until enough samples exist
+HEDGE_MIN_DELAY = float(os.getenv("AI_HEDGE_MIN_DELAY", "1"))
+HEDGE_MIN_SAMPLES = 20
+
+# "sequential" waits for each provider to fail; "hedged" races them (see generate_hedged)
+FALLBACK_MODE = os.getenv("AI_FALLBACK_MODE", "sequential")
+
+_latencies = {name: deque(maxlen=200) for name in PROVIDERS}
+_latencies_lock = threading.Lock()
+
+
+def record_latency(name, seconds):
+    with _latencies_lock:
+        _latencies[name].append(seconds)
+
+
+def latency_p95(name):
+    """95th percentile of recent successful calls, or None with too few samples"""
+    with _latencies_lock:
+        samples = sorted(_latencies[name])
+    if len(samples) < HEDGE_MIN_SAMPLES:
+        return None
+    return samples[min(int(len(samples) * 0.95), len(samples) - 1)]
+
+
+def hedge_delay(name):
+    """How long to wait on a provider before starting the next one in parallel"""
+    p95 = latency_p95(name)
+    if p95 is None:
+        return HEDGE_DEFAULT_DELAY
+    return round(max(HEDGE_MIN_DELAY, p95), 3)
+
+
+def latency_stats():
+    """Sample count, p95 and current hedge delay per provider"""
+    return {
+        name: {"samples": len(_latencies[name]), "p95_s": latency_p95(name), "hedge_delay_s": hedge_delay(name)}
+        for name in PROVIDERS
+    }
+
+
+# ==== CIRCUIT BREAKERS ====
+# A provider that keeps failing (or answering slower than its deadline
+# allows) is skipped for a cooldown instead of burning its full timeout on
+# every request. After the cooldown one trial call is let through
+# (half-open); its outcome closes or re-opens the breaker.
+
+BREAKER_WINDOW = int(os.getenv("AI_BREAKER_WINDOW", "20"))              # recent calls considered
+BREAKER_MIN_CALLS = int(os.getenv("AI_BREAKER_MIN_CALLS", "5"))
+BREAKER_ERROR_RATE = float(os.getenv("AI_BREAKER_ERROR_RATE", "0.5"))   # opens at this failure ratio
+BREAKER_CONSECUTIVE = int(os.getenv("AI_BREAKER_CONSECUTIVE", "3"))     # ...or this many failures in a row
+BREAKER_COOLDOWN = float(os.getenv("AI_BREAKER_COOLDOWN", "30"))
+BREAKER_SLOW_RATIO = 0.8  # a success slower than this share of the deadline counts as a failure
+
+
+class CircuitBreaker:
+    """closed -> open -> half-open breaker for one provider"""
+
+    def __init__(self, name):
+        self.name = name
+        self._lock = threading.Lock()
+        self.state = "closed"
+        self.opened_at = None
+        self.trial_in_flight = False
+        self.consecutive_failures = 0
+        self.outcomes = deque(maxlen=BREAKER_WINDOW)  # (ok, latency)
+        self.times_opened = 0
+
+    def _cooled_down(self):
+        return time.monotonic() - self.opened_at >= BREAKER_COOLDOWN
+
+    def available(self):
+        """Whether a call would be let through now (does not claim the trial)"""
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open":
+                return self._cooled_down()
+            return not self.trial_in_flight
+
+    def allow(self):
+        """Claim permission for one call; in half-open state only one trial runs"""
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and self._cooled_down():
+                self.state = "half_open"
+            if self.state == "half_open" and not self.trial_in_flight:
+                self.trial_in_flight = True
+                return True
+            return False
+
+    def release(self):
+        """Give back a claimed call that never ran (cancelled before starting)"""
+        with self._lock:
+            self.trial_in_flight = False
+
+    def record(self, ok, latency):
+        if ok and latency > PROVIDERS[self.name]["timeout"] * BREAKER_SLOW_RATIO:
+            ok = False
+        with self._lock:
+            self.outcomes.append((ok, latency))
+            self.consecutive_failures = 0 if ok else self.consecutive_failures + 1
+
+            if self.state == "half_open":
+                self.trial_in_flight = False
+                if ok:
+                    self.state = "closed"
+                    self.outcomes.clear()
+                    self.outcomes.append((ok, latency))
+                else:
+                    self._open()
+            elif self.state == "closed" and not ok:
+                failures = sum(1 for success, _ in self.outcomes if not success)
+                if (self.consecutive_failures >= BREAKER_CONSECUTIVE or
+                        (len(self.outcomes) >= BREAKER_MIN_CALLS and failures / len(self.outcomes) >= BREAKER_ERROR_RATE)):
+                    self._open()
+
+    def _open(self):
+        self.state = "open"
+        self.opened_at = time.monotonic()
+        self.times_opened += 1
+        print(f"Circuit breaker opened for {self.name} ({self.consecutive_failures} consecutive failures)")
+
+    def snapshot(self):
+        with self._lock:
+            calls = len(self.outcomes)
+            failures = sum(1 for ok, _ in self.outcomes if not ok)
+            snapshot = {
+                "state": self.state,
+                "recent_calls": calls,
+                "error_rate": round(failures / calls, 3) if calls else None,
+                "avg_latency_s": round(sum(lat for _, lat in self.outcomes) / calls, 3) if calls else None,
+                "consecutive_failures": self.consecutive_failures,
+                "times_opened": self.times_opened,
+            }
+            if self.state == "open":
+                snapshot["retry_in_s"] = round(max(BREAKER_COOLDOWN - (time.monotonic() - self.opened_at), 0), 1)
+            return snapshot
+
+
+_breakers = {name: CircuitBreaker(name) for name in PROVIDERS}
+
+
+def breaker_stats():
+    """Breaker state and recent error rate per provider"""
+    return {name: breaker.snapshot() for name, breaker in _breakers.items()}
+
+
+def configured_providers():
+    """Provider names with an API key, in fallback order"""
+    return [name for name, spec in PROVIDERS.items() if os.getenv(spec["env"])]
+
+
+def available_providers():
+    """Configured providers in fallback order, minus those with an open breaker"""
+    return [name for name in configured_providers() if _breakers[name].available()]
+
+
+def get_generate(name):
+    """The `generate` function implemented by a provider's module"""
+    return importlib.import_module(PROVIDERS[name]["module"]).generate
+
+
+def call_provider(name, messages, context, lang):
+    """
+    Run one provider with its deadline. The call runs on a worker thread so
+    the deadline also holds for SDK clients without a timeout option.
+    """
+    timeout = PROVIDERS[name]["timeout"]
+    breaker = _breakers[name]
+    started = time.perf_counter()
+    try:
+        # Resolving the module or submitting can fail too; the breaker must
+        # still hear about it or a half-open trial would never be released
+        future = _executor.submit(get_generate(name), messages, context, lang, timeout)
+        result = future.result(timeout=timeout)
+    except FutureTimeout:
+        future.cancel()
+        breaker.record(False, time.perf_counter() - started)
+        raise ProviderError(f"{name} did not answer within {timeout}s")
+    except Exception:
+        breaker.record(False, time.perf_counter() - started)
+        raise
+    latency = time.perf_counter() - started
+    breaker.record(True, latency)
+    record_latency(name, latency)
+    return result
+
+
+def _skipped(name):
+    """Attempt entry for a provider passed over because its breaker is open"""
+    attempt = {"provider": name, "skipped": "circuit open"}
+    retry_in = _breakers[name].snapshot().get("retry_in_s")
+    if retry_in is not None:
+        attempt["retry_in_s"] = retry_in
+    return attempt
+
+
+def generate_with_fallback(messages, context="advisory", lang="English"):
+    """
+    Try each configured provider in order until one answers, skipping those
+    whose circuit breaker is open.
+    Returns (result or None, attempts) where each attempt records the
+    provider, its latency and the error if it failed.
+    """
+    attempts = []
+    for name in configured_providers():
+        if not _breakers[name].allow():
+            attempts.append(_skipped(name))
+            continue
+        started = time.perf_counter()
+        try:
+            result = call_provider(name, messages, context, lang)
+        except Exception as e:
+            print(f"Fallback: {name} failed: {e}")
+            attempts.append({"provider": name, "error": str(e),
+                             "latency_s": round(time.perf_counter() - started, 3)})
+            continue
+        attempts.append({"provider": name, "latency_s": round(time.perf_counter() - started, 3)})
+        return dict(result, provider=name), attempts
+    return None, attempts
+
+
+def generate_hedged(messages, context="advisory", lang="English", delay=None):
+    """
+    Hedged fallback: start the first provider, and if it has not answered
+    within its hedge delay (recent p95 latency) start the next one in
+    parallel, and so on. A provider that fails starts the next one at once.
+    The first successful answer wins; the rest are cancelled or ignored.
+    Providers with an open circuit breaker are skipped.
+
+    `delay` (seconds) overrides the p95-based hedge delay for every provider.
+    Returns (result or None, attempts, hedge) where `hedge` records the
+    providers launched, the delays used and the winner.
+    """
+    queue = configured_providers()
+    attempts = []
+    hedge = {"mode": "hedged", "launched": [], "delays_s": [], "winner": None}
+    pending = {}  # future -> (provider, started)
+
+    def launch():
+        while queue:
+            name = queue.pop(0)
+            if not _breakers[name].allow():
+                attempts.append(_skipped(name))
+                continue
+            started = time.perf_counter()
+            try:
+                future = _executor.submit(get_generate(name), messages, context, lang, PROVIDERS[name]["timeout"])
+            except Exception as e:
+                print(f"Hedged fallback: {name} failed to start: {e}")
+                _breakers[name].record(False, time.perf_counter() - started)
+                attempts.append({"provider": name, "error": str(e), "latency_s": 0.0})
+                continue
+            hedge["launched"].append(name)
+            pending[future] = (name, started)
+            return
+
+    def settle_abandoned(future, name, started):
+        # Losers keep running on the executor; their outcome still feeds the breaker
+        def done(f):
+            if f.cancelled():
+                _breakers[name].release()
+            else:
+                _breakers[name].record(f.exception() is None, time.perf_counter() - started)
+        future.add_done_callback(done)
+
+    launch()
+
+    while pending:
+        now = time.perf_counter()
+
+        # Wake up for the next hedge or the earliest provider deadline
+        newest_name, newest_started = pending[max(pending, key=lambda f: pending[f][1])]
+        hedge_after = delay if delay is not None else hedge_delay(newest_name)
+        wait_for = hedge_after if queue else None
+        wakeups = [started + PROVIDERS[name]["timeout"] - now for name, started in pending.values()]
+        if wait_for is not None:
+            wakeups.append(newest_started + wait_for - now)
+        done, _ = wait(list(pending), timeout=max(min(wakeups), 0), return_when=FIRST_COMPLETED)
+
+        failed = False
+        for future in done:
+            name, started = pending.pop(future)
+            latency = round(time.perf_counter() - started, 3)
+            try:
+                result = future.result()
+            except Exception as e:
+                print(f"Hedged fallback: {name} failed: {e}")
+                _breakers[name].record(False, latency)
+                attempts.append({"provider": name, "error": str(e), "latency_s": latency})
+                failed = True
+                continue
+
+            _breakers[name].record(True, latency)
+            record_latency(name, latency)
+            attempts.append({"provider": name, "latency_s": latency})
+            for other, (other_name, other_started) in pending.items():
+                if not other.cancel():
+                    settle_abandoned(other, other_name, other_started)
+                else:
+                    _breakers[other_name].release()
+                attempts.append({"provider": other_name, "abandoned": True})
+            hedge["winner"] = name
+            return dict(result, provider=name), attempts, hedge
+
+        # Drop providers past their own deadline
+        now = time.perf_counter()
+        for future, (name, started) in list(pending.items()):
+            if now - started >= PROVIDERS[name]["timeout"]:
+                future.cancel()
+                del pending[future]
+                _breakers[name].record(False, now - started)
+                attempts.append({"provider": name, "error": f"{name} did not answer within {PROVIDERS[name]['timeout']}s",
+                                 "latency_s": round(now - started, 3)})
+                failed = True
+
+        # A failure starts the next provider at once; a slow newest provider
+        # starts it after the hedge delay
+        if queue:
+            if failed or not pending:
+                launch()
+            elif wait_for is not None and now - newest_started >= wait_for:
+                hedge["delays_s"].append(wait_for)
+                launch()
+
+    return None, attempts, hedge
+
+
+# ==== GROQ PROVIDER ====
+# Groq has no blueprint of its own; its provider implementation lives here.
+
+GROQ_URL = "https://api.groq.com/openai/v1/chat/completions"
+GROQ_MODEL = "llama-3.3-70b-versatile"
+GROQ_SYSTEM_PROMPT = """You are an expert agricultural advisor for Indian farmers.
+Provide practical, actionable advice on crops, pests, fertilizers, irrigation,
+government schemes and market prices in simple language farmers can understand."""
+
+
+def generate(messages, context="advisory", lang="English", timeout=None):
+    """Groq chat completion implementing the provider interface"""
+    api_key = os.getenv("GROQ_API_KEY")
+    if not api_key:
+        raise ProviderError("Groq API key not configured")
+
+    response = get_session("groq").post(
+        GROQ_URL,
+        headers={
+            "Authorization": f"Bearer {api_key}",
+            "Content-Type": "application/json"
+        },
+        json={
+            "model": GROQ_MODEL,
+            "messages": [{"role": "system", "content": f"{GROQ_SYSTEM_PROMPT}\n\nRespond in {lang} language."}, *messages],
+            "temperature": 0.7,
+            "max_tokens": 2048
+        },
+        timeout=(5, timeout) if timeout else None
+    )
+    if response.status_code != 200:
+        raise ProviderError(f"Groq API returned {response.status_code}", response.status_code)
+    return {"response": response.json()["choices"][0]["message"]["content"], "model": GROQ_MODEL}
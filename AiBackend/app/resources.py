@@ -0,0 +1,77 @@
+import threading
+import time
+
+# ==== CONFIGURATION ====
+EMBED_MODEL = "all-MiniLM-L6-v2"
+PERSIST_DIR = "./app/chromadb"
+COLLECTION = "agri_collection"
+
+# Process-wide registry shared by every RAG blueprint. Each resource is built
+# at most once per process, on first use, so gunicorn workers hold a single
+# copy of the embedding model and one Chroma client.
+_lock = threading.RLock()
+_embeddings = None
+_vectorstores = {}
+_retrievers = {}
+_build_seconds = {}
+
+
+def get_embeddings():
+    """Shared sentence-transformer embedding model"""
+    global _embeddings
+    if _embeddings is None:
+        with _lock:
+            if _embeddings is None:
+                from langchain_community.embeddings import HuggingFaceEmbeddings
+
+                started = time.perf_counter()
+                _embeddings = HuggingFaceEmbeddings(model_name=EMBED_MODEL)
+                _build_seconds["embeddings"] = round(time.perf_counter() - started, 3)
+    return _embeddings
+
+
+def get_vectorstore(collection=COLLECTION):
+    """Shared Chroma vector store for a collection"""
+    if collection not in _vectorstores:
+        with _lock:
+            if collection not in _vectorstores:
+                from langchain_community.vectorstores import Chroma
+
+                embeddings = get_embeddings()
+                started = time.perf_counter()
+                _vectorstores[collection] = Chroma(
+                    collection_name=collection,
+                    persist_directory=PERSIST_DIR,
+                    embedding_function=embeddings
+                )
+                _build_seconds[f"vectorstore:{collection}"] = round(time.perf_counter() - started, 3)
+    return _vectorstores[collection]
+
+
+def get_retriever(collection=COLLECTION, k=3):
+    """Shared similarity retriever over a collection"""
+    key = (collection, k)
+    if key not in _retrievers:
+        with _lock:
+            if key not in _retrievers:
+                _retrievers[key] = get_vectorstore(collection).as_retriever(
+                    search_type="similarity",
+                    search_kwargs={"k": k}
+                )
+    return _retrievers[key]
+
+
+def warm(collection=COLLECTION):
+    """Build the embedding model and vector store ahead of the first request"""
+    get_retriever(collection)
+
+
+def stats():
+    """Which shared resources exist in this process and how long they took to build"""
+    return {
+        "embed_model": EMBED_MODEL,
+        "embeddings_loaded": _embeddings is not None,
+        "vectorstores": sorted(_vectorstores),
+        "retrievers": [f"{c}:k={k}" for c, k in sorted(_retrievers)],
+        "build_seconds": dict(_build_seconds)
+    }
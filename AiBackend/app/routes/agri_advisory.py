@@ -2,33 +2,21 @@ import os
 from flask import Blueprint, request, jsonify
 from crewai import Agent, Task, Crew, Process, LLM
 from crewai.tools import tool
-from langchain.embeddings import HuggingFaceEmbeddings  
-from langchain.vectorstores import Chroma
 from langchain.chains import RetrievalQA
 
+from app.resources import get_retriever
+
 agri_advisory_bp = Blueprint('agri_advisory', __name__)
 
 # ==== CONFIGURATION ====
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 llm = LLM(api_key=GROQ_API_KEY, model="groq/llama-3.3-70b-versatile")
 
-# ==== VECTOR STORE ====
-EMBED_MODEL = "all-MiniLM-L6-v2"
-PERSIST_DIR = "./app/chromadb"
-COLLECTION = "agri_collection"
-
-embeddings = HuggingFaceEmbeddings(model_name=EMBED_MODEL)
-vectorstore = Chroma(
-    persist_directory=PERSIST_DIR,
-    embedding_function=embeddings
-)
-retriever = vectorstore.as_retriever(search_type="similarity", search_kwargs={"k": 3})
-
 # ==== TOOL ====
 @tool("RAG Search Tool")
 def retrieve_context(query: str) -> str:
     """Retrieve context from agricultural documents."""
-    qa = RetrievalQA.from_chain_type(llm=llm, retriever=retriever, chain_type="stuff")
+    qa = RetrievalQA.from_chain_type(llm=llm, retriever=get_retriever(), chain_type="stuff")
     return qa.run(query)
 
 # ==== AGENTS ====
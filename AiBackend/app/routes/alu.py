@@ -3,6 +3,8 @@ import os
 import requests
 from dotenv import load_dotenv
 
+from app.http_client import get_session
+
 load_dotenv()
 
 alu_bp = Blueprint('alu_bp', __name__)
@@ -73,7 +75,7 @@ def get_crop_health():
             "Content-Type": "application/json"
         }
         
-        response = requests.post(
+        response = get_session("alu").post(
             f"{ALU_BASE_URL}/analyze/crop-health",
             headers=headers,
             json=payload,
@@ -146,7 +148,7 @@ def detect_field_boundary():
             "Content-Type": "application/json"
         }
         
-        response = requests.post(
+        response = get_session("alu").post(
             f"{ALU_BASE_URL}/detect/field-boundary",
             headers=headers,
             json=payload,
@@ -206,7 +208,7 @@ def classify_crop():
             "Content-Type": "application/json"
         }
         
-        response = requests.post(
+        response = get_session("alu").post(
             f"{ALU_BASE_URL}/classify/crop",
             headers=headers,
             json={"location": {"latitude": latitude, "longitude": longitude}},
@@ -280,7 +282,7 @@ def predict_yield():
             "Content-Type": "application/json"
         }
         
-        response = requests.post(
+        response = get_session("alu").post(
             f"{ALU_BASE_URL}/predict/yield",
             headers=headers,
             json={
@@ -1,8 +1,14 @@
 from flask import Blueprint, request, jsonify
+import math
 import os
-import requests
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
 from dotenv import load_dotenv
 
+from app.cache import TTLCache
+from app.http_client import get_session
+
 load_dotenv()
 
 ambee_bp = Blueprint('ambee_bp', __name__)
@@ -11,6 +17,37 @@ ambee_bp = Blueprint('ambee_bp', __name__)
 AMBEE_API_KEY = os.getenv("AMBEE_API_KEY")
 AMBEE_BASE_URL = "https://api.ambeedata.com"
 
+# Ambee bills per call, so responses are cached per endpoint and grid cell.
+# TTLs follow how often each dataset changes; an expired entry is still served
+# for another TTL while one background call refreshes it.
+AMBEE_ENDPOINTS = {
+    "weather_latest":   {"path": "/weather/latest/by-lat-lng",   "ttl": 600},     # ~10 min
+    "weather_forecast": {"path": "/weather/forecast/by-lat-lng", "ttl": 3600},
+    "soil":             {"path": "/soil/latest/by-lat-lng",      "ttl": 3600},    # hourly
+    "air_quality":      {"path": "/latest/by-lat-lng",           "ttl": 1800},
+    "pollen":           {"path": "/latest/pollen/by-lat-lng",    "ttl": 21600},   # daily
+    "fire":             {"path": "/fire/latest/by-lat-lng",      "ttl": 900},
+    "disasters":        {"path": "/disasters/latest/by-lat-lng", "ttl": 900},
+}
+AMBEE_GRID_DEG = float(os.getenv("AMBEE_GRID_DEG", "0.01"))  # ~1 km, twice Ambee's resolution
+CACHE_BYPASS_HEADER = "X-Cache-Bypass"
+
+_caches = {}
+for _name, _spec in AMBEE_ENDPOINTS.items():
+    _ttl = int(os.getenv(f"AMBEE_CACHE_TTL_{_name.upper()}", _spec["ttl"]))
+    _caches[_name] = TTLCache(f"ambee_{_name}", ttl=_ttl, stale_ttl=_ttl, maxsize=4096)
+_bypasses = {name: 0 for name in AMBEE_ENDPOINTS}
+_stats_lock = threading.Lock()
+
+# The home-screen dashboard fans out to several endpoints at once and returns
+# whatever finished within this many seconds
+DASHBOARD_DEADLINE = float(os.getenv("AMBEE_DASHBOARD_DEADLINE", "8"))
+MIN_DASHBOARD_DEADLINE = 1  # shorter client timeouts are raised to this
+_dashboard_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("AMBEE_DASHBOARD_THREADS", "16")),
+    thread_name_prefix="ambee-dashboard"
+)
+
 @ambee_bp.after_request
 def after_request(response):
     response.headers.add('Access-Control-Allow-Origin', '*')
@@ -26,6 +63,58 @@ def get_ambee_headers():
     }
 
 
+def fetch_ambee(path, lat, lng, timeout=30):
+    """GET an Ambee by-lat-lng endpoint and return its JSON; raises for HTTP errors"""
+    response = get_session("ambee").get(
+        f"{AMBEE_BASE_URL}{path}",
+        headers=get_ambee_headers(),
+        params={"lat": lat, "lng": lng},
+        timeout=timeout
+    )
+    response.raise_for_status()
+    return response.json()
+
+
+def snap(lat, lng):
+    return (round(round(float(lat) / AMBEE_GRID_DEG) * AMBEE_GRID_DEG, 4),
+            round(round(float(lng) / AMBEE_GRID_DEG) * AMBEE_GRID_DEG, 4))
+
+
+def cache_bypassed():
+    """Whether the caller asked to skip the cache (debugging)"""
+    return request.headers.get(CACHE_BYPASS_HEADER, "").lower() in ("1", "true", "yes")
+
+
+def get_ambee(endpoint, lat, lng, timeout=30, bypass=False):
+    """
+    Cached Ambee data for an endpoint in AMBEE_ENDPOINTS at the grid cell
+    containing (lat, lng). Returns (json, cache_state) where cache_state is
+    "hit", "stale" (served while refreshing), "miss" or "bypass".
+    """
+    cell = snap(lat, lng)
+    cache = _caches[endpoint]
+    path = AMBEE_ENDPOINTS[endpoint]["path"]
+
+    def loader():
+        return fetch_ambee(path, *cell, timeout=timeout)
+
+    if bypass:
+        with _stats_lock:
+            _bypasses[endpoint] += 1
+        result = cache.record_load(loader)
+        cache.set(cell, result)
+        return result, "bypass"
+    return cache.get_or_load_stale(cell, loader)
+
+
+def cache_stats():
+    """Per-endpoint hit/miss counters and upstream (billed) calls"""
+    return {
+        name: {**cache.stats(), "bypasses": _bypasses[name]}
+        for name, cache in _caches.items()
+    }
+
+
 # ============================================
 # WEATHER API - Real-time weather for farming
 # ============================================
@@ -47,18 +136,12 @@ def get_weather_latest():
         if not AMBEE_API_KEY:
             return jsonify({"error": "Ambee API key not configured"}), 500
         
-        response = requests.get(
-            f"{AMBEE_BASE_URL}/weather/latest/by-lat-lng",
-            headers=get_ambee_headers(),
-            params={"lat": lat, "lng": lng},
-            timeout=30
-        )
-        response.raise_for_status()
+        result, cache_state = get_ambee("weather_latest", lat, lng, bypass=cache_bypassed())
         
-        result = response.json()
         return jsonify({
             "success": True,
             "source": "ambee",
+            "cache": cache_state,
             "data": result.get("data", {}),
             "farming_insights": generate_weather_insights(result.get("data", {}))
         }), 200
@@ -80,18 +163,13 @@ def get_weather_forecast():
         if not AMBEE_API_KEY:
             return jsonify({"error": "Ambee API key not configured"}), 500
         
-        response = requests.get(
-            f"{AMBEE_BASE_URL}/weather/forecast/by-lat-lng",
-            headers=get_ambee_headers(),
-            params={"lat": lat, "lng": lng},
-            timeout=30
-        )
-        response.raise_for_status()
+        result, cache_state = get_ambee("weather_forecast", lat, lng, bypass=cache_bypassed())
         
         return jsonify({
             "success": True,
             "source": "ambee",
-            "data": response.json().get("data", {})
+            "cache": cache_state,
+            "data": result.get("data", {})
         }), 200
         
     except Exception as e:
@@ -119,18 +197,12 @@ def get_soil_data():
         if not AMBEE_API_KEY:
             return jsonify({"error": "Ambee API key not configured"}), 500
         
-        response = requests.get(
-            f"{AMBEE_BASE_URL}/soil/latest/by-lat-lng",
-            headers=get_ambee_headers(),
-            params={"lat": lat, "lng": lng},
-            timeout=30
-        )
-        response.raise_for_status()
+        result, cache_state = get_ambee("soil", lat, lng, bypass=cache_bypassed())
         
-        result = response.json()
         return jsonify({
             "success": True,
             "source": "ambee",
+            "cache": cache_state,
             "data": result.get("data", {}),
             "irrigation_recommendation": generate_irrigation_advice(result.get("data", {}))
         }), 200
@@ -157,20 +229,14 @@ def get_air_quality():
         if not AMBEE_API_KEY:
             return jsonify({"error": "Ambee API key not configured"}), 500
         
-        response = requests.get(
-            f"{AMBEE_BASE_URL}/latest/by-lat-lng",
-            headers=get_ambee_headers(),
-            params={"lat": lat, "lng": lng},
-            timeout=30
-        )
-        response.raise_for_status()
+        result, cache_state = get_ambee("air_quality", lat, lng, bypass=cache_bypassed())
         
-        result = response.json()
         aqi = result.get("stations", [{}])[0].get("AQI", 0) if result.get("stations") else 0
         
         return jsonify({
             "success": True,
             "source": "ambee",
+            "cache": cache_state,
             "data": result,
             "aqi": aqi,
             "spray_recommendation": "Good for spraying" if aqi < 100 else "Avoid spraying - poor air quality"
@@ -198,18 +264,13 @@ def get_pollen_data():
         if not AMBEE_API_KEY:
             return jsonify({"error": "Ambee API key not configured"}), 500
         
-        response = requests.get(
-            f"{AMBEE_BASE_URL}/latest/pollen/by-lat-lng",
-            headers=get_ambee_headers(),
-            params={"lat": lat, "lng": lng},
-            timeout=30
-        )
-        response.raise_for_status()
+        result, cache_state = get_ambee("pollen", lat, lng, bypass=cache_bypassed())
         
         return jsonify({
             "success": True,
             "source": "ambee",
-            "data": response.json().get("data", [])
+            "cache": cache_state,
+            "data": result.get("data", [])
         }), 200
         
     except Exception as e:
@@ -234,20 +295,14 @@ def get_fire_data():
         if not AMBEE_API_KEY:
             return jsonify({"error": "Ambee API key not configured"}), 500
         
-        response = requests.get(
-            f"{AMBEE_BASE_URL}/fire/latest/by-lat-lng",
-            headers=get_ambee_headers(),
-            params={"lat": lat, "lng": lng},
-            timeout=30
-        )
-        response.raise_for_status()
+        result, cache_state = get_ambee("fire", lat, lng, bypass=cache_bypassed())
         
-        result = response.json()
         fires = result.get("data", [])
         
         return jsonify({
             "success": True,
             "source": "ambee",
+            "cache": cache_state,
             "fires_nearby": len(fires),
             "data": fires,
             "alert_level": "High" if len(fires) > 0 else "None"
@@ -275,20 +330,14 @@ def get_disaster_alerts():
         if not AMBEE_API_KEY:
             return jsonify({"error": "Ambee API key not configured"}), 500
         
-        response = requests.get(
-            f"{AMBEE_BASE_URL}/disasters/latest/by-lat-lng",
-            headers=get_ambee_headers(),
-            params={"lat": lat, "lng": lng},
-            timeout=30
-        )
-        response.raise_for_status()
+        result, cache_state = get_ambee("disasters", lat, lng, bypass=cache_bypassed())
         
-        result = response.json()
         events = result.get("data", [])
         
         return jsonify({
             "success": True,
             "source": "ambee",
+            "cache": cache_state,
             "active_alerts": len(events),
             "data": events
         }), 200
@@ -306,6 +355,10 @@ def get_farming_dashboard():
     """
     Get all environmental data for farming in one call
     Perfect for AgriX home screen dashboard
+
+    Sections are fetched concurrently; any still running at the deadline
+    (AMBEE_DASHBOARD_DEADLINE, or a shorter "timeout" in the body) are left
+    out and marked "timeout" in dashboard.sections with their latency.
     """
     try:
         data = request.json
@@ -318,10 +371,14 @@ def get_farming_dashboard():
         if not AMBEE_API_KEY:
             return jsonify({"error": "Ambee API key not configured"}), 500
         
-        headers = get_ambee_headers()
-        params = {"lat": lat, "lng": lng}
+        try:
+            deadline = float(data.get("timeout", DASHBOARD_DEADLINE))
+        except (TypeError, ValueError):
+            return jsonify({"error": "timeout must be a number of seconds"}), 400
+        if math.isnan(deadline):
+            return jsonify({"error": "timeout must be a number of seconds"}), 400
+        deadline = min(max(deadline, MIN_DASHBOARD_DEADLINE), DASHBOARD_DEADLINE)
         
-        # Fetch all data in parallel (simplified sequential for reliability)
         dashboard = {
             "location": {"lat": lat, "lng": lng},
             "weather": None,
@@ -330,55 +387,57 @@ def get_farming_dashboard():
             "alerts": []
         }
         
-        # Weather
-        try:
-            weather_resp = requests.get(
-                f"{AMBEE_BASE_URL}/weather/latest/by-lat-lng",
-                headers=headers, params=params, timeout=10
-            )
-            if weather_resp.status_code == 200:
-                dashboard["weather"] = weather_resp.json().get("data", {})
-        except:
-            pass
-        
-        # Soil
-        try:
-            soil_resp = requests.get(
-                f"{AMBEE_BASE_URL}/soil/latest/by-lat-lng",
-                headers=headers, params=params, timeout=10
-            )
-            if soil_resp.status_code == 200:
-                dashboard["soil"] = soil_resp.json().get("data", {})
-        except:
-            pass
-        
-        # Air Quality
-        try:
-            aqi_resp = requests.get(
-                f"{AMBEE_BASE_URL}/latest/by-lat-lng",
-                headers=headers, params=params, timeout=10
-            )
-            if aqi_resp.status_code == 200:
-                dashboard["air_quality"] = aqi_resp.json()
-        except:
-            pass
-        
-        # Fire alerts
-        try:
-            fire_resp = requests.get(
-                f"{AMBEE_BASE_URL}/fire/latest/by-lat-lng",
-                headers=headers, params=params, timeout=10
-            )
-            if fire_resp.status_code == 200:
-                fires = fire_resp.json().get("data", [])
+        # Fetch every section in parallel under one deadline, through the
+        # same per-endpoint cache as the individual routes
+        sections = {
+            "weather": "weather_latest",
+            "soil": "soil",
+            "air_quality": "air_quality",
+            "fire": "fire",
+        }
+        bypass = cache_bypassed()  # read here: worker threads have no request context
+        started = time.perf_counter()
+        
+        latencies = {}
+        
+        def timed_fetch(name):
+            call_started = time.perf_counter()
+            try:
+                return get_ambee(sections[name], lat, lng, timeout=(3, deadline), bypass=bypass)
+            finally:
+                latencies[name] = round((time.perf_counter() - call_started) * 1000)
+        
+        futures = {name: _dashboard_executor.submit(timed_fetch, name) for name in sections}
+        wait(futures.values(), timeout=deadline)
+        
+        section_status = {}
+        for name, future in futures.items():
+            if not future.done():
+                future.cancel()
+                section_status[name] = {"status": "timeout", "latency_ms": round((time.perf_counter() - started) * 1000)}
+                continue
+            try:
+                result, cache_state = future.result()
+            except Exception as e:
+                section_status[name] = {"status": "error", "error": str(e), "latency_ms": latencies.get(name)}
+                continue
+            section_status[name] = {"status": "ok", "cache": cache_state, "latency_ms": latencies.get(name)}
+            
+            if name == "air_quality":
+                dashboard["air_quality"] = result
+            elif name == "fire":
+                fires = result.get("data", [])
                 if fires:
                     dashboard["alerts"].append({
                         "type": "fire",
                         "count": len(fires),
                         "severity": "high"
                     })
-        except:
-            pass
+            else:
+                dashboard[name] = result.get("data", {})
+        
+        dashboard["sections"] = section_status
+        dashboard["latency_ms"] = round((time.perf_counter() - started) * 1000)
         
         # Generate farming insights
         dashboard["farming_insights"] = generate_farming_insights(dashboard)
@@ -484,5 +543,10 @@ def ambee_status():
             "/ambee/disasters",
             "/ambee/farming-dashboard"
         ],
+        "cache": {
+            "grid_deg": AMBEE_GRID_DEG,
+            "bypass_header": CACHE_BYPASS_HEADER,
+            "endpoints": cache_stats()
+        },
         "note": "Get your API key at: https://api-dashboard.getambee.com"
     }), 200
@@ -1,12 +1,14 @@
 from flask import Blueprint, request, jsonify
 import os
-import requests
 from dotenv import load_dotenv
 from typing import List
 
 from pydantic import BaseModel, Field
 from langchain.output_parsers import PydanticOutputParser
 
+from app import weather
+from app.http_client import get_session
+
 load_dotenv()
 
 crop_calendar_bp = Blueprint("crop_calendar_bp", __name__)
@@ -30,23 +32,9 @@ class CropCalendar(BaseModel):
     calendar: List[WeekPlan] = Field(..., description="Weekly farming plan")
 
 
-# -------------------- Helper: Weather Fetch --------------------
+# -------------------- Weather Fields (shared forecast) --------------------
 
-def get_weather_forecast(lat, lon):
-    try:
-        url = (
-            f"https://api.open-meteo.com/v1/forecast"
-            f"?latitude={lat}&longitude={lon}"
-            f"&daily=temperature_2m_max,temperature_2m_min,precipitation_sum,wind_speed_10m_max,"
-            f"relative_humidity_2m_max,relative_humidity_2m_min"
-            f"&forecast_days=7&timezone=auto"
-        )
-        response = requests.get(url)
-        response.raise_for_status()
-        return response.json().get("daily", {})
-    except Exception as e:
-        print(f"[ERROR] Weather fetch failed: {e}")
-        return {}
+WEATHER_FIELDS = ["dates", "temp_max", "temp_min", "precipitation", "wind_speed_max", "humidity_max", "humidity_min"]
 
 
 # -------------------- Main Route: Crop Calendar --------------------
@@ -63,7 +51,7 @@ def crop_calendar():
     if not crop or not region or lat is None or lon is None :
         return jsonify({"error": "Missing crop, region or coordinates"}), 400
 
-    weather_info = get_weather_forecast(lat, lon)
+    weather_info = weather.get_daily(lat, lon, WEATHER_FIELDS)
 
     parser = PydanticOutputParser(pydantic_object=CropCalendar)
     format_instructions = parser.get_format_instructions()
@@ -98,7 +86,7 @@ def crop_calendar():
     }
 
     try:
-        response = requests.post(
+        response = get_session("groq").post(
             "https://api.groq.com/openai/v1/chat/completions",
             headers=headers,
             json=payload
@@ -1,10 +1,11 @@
 from flask import Blueprint, request, jsonify
-import requests
 import os
 import datetime
 from dotenv import load_dotenv
 from groq import Groq
 
+from app import soil, weather
+
 load_dotenv()
 
 fertilizer_bp = Blueprint('fertilizer', __name__)
@@ -49,8 +50,17 @@ Use clear, jargon‑free language, and localize units & terminology for Indian f
 
 # ─── LLM FUNCTION ─────────────────────────────────────────────────────────────
 
+# One client per process so its HTTP connection pool is reused across requests
+_groq_client = None
+
+def get_groq_client():
+    global _groq_client
+    if _groq_client is None:
+        _groq_client = Groq(api_key=os.getenv("GROQ_API_KEY"))
+    return _groq_client
+
 def get_fertilizer_recommendation(data, crop, lang):
-    client = Groq(api_key=os.getenv("GROQ_API_KEY"))
+    client = get_groq_client()
 
     user_prompt = f"""
 Please answer in {lang} language only.
@@ -89,91 +99,22 @@ Timestamp: {data['timestamp']}
 # ─── HELPERS ──────────────────────────────────────────────────────────────────
 
 def get_soil_data(lat, lon):
-    try:
-        url = (
-            f"https://api.openepi.io/soil/property?"
-            f"lon={lon}&lat={lat}&depths=0-5cm&depths=0-30cm&"
-            f"properties=phh2o&properties=nitrogen&properties=soc&properties=clay&"
-            f"values=mean"
-        )
-        response = requests.get(url)
-        data = response.json()
-        properties = data.get('properties', [])
-
-        soil_data = {
-            "soil_ph": None,
-            "soil_organic_carbon": None,
-            "soil_nitrogen": None,
-            "soil_clay": None
-        }
-
-        for prop in properties:
-            if prop['property'] == 'phh2o':
-                soil_data['soil_ph'] = prop['depth_0_5']['mean']
-            elif prop['property'] == 'nitrogen':
-                soil_data['soil_nitrogen'] = prop['depth_0_5']['mean']
-            elif prop['property'] == 'soc':
-                soil_data['soil_organic_carbon'] = prop['depth_0_5']['mean']
-            elif prop['property'] == 'clay':
-                soil_data['soil_clay'] = prop['depth_0_5']['mean']
-
-        ocs_url = (
-            f"https://api.openepi.io/soil/property?"
-            f"lon={lon}&lat={lat}&depths=0-30cm&properties=ocs&values=mean"
-        )
-        ocs_response = requests.get(ocs_url)
-        if ocs_response.status_code == 200:
-            ocs_data = ocs_response.json()
-            for prop in ocs_data.get('properties', []):
-                if prop['property'] == 'ocs':
-                    soil_data['soil_organic_carbon_stock'] = prop['depth_0_30']['mean']
-
-        # Fill missing with defaults
-        defaults = {
-            "soil_ph": 6.5,
-            "soil_organic_carbon": 1.2,
-            "soil_nitrogen": 0.1,
-            "soil_clay": 20.0,
-            "soil_organic_carbon_stock": 50.0
-        }
-        for key in defaults:
-            if soil_data.get(key) is None:
-                soil_data[key] = defaults[key]
-
-        return soil_data
-
-    except Exception as e:
-        print(f"[ERROR] Soil data fetch failed: {e}")
-        return {
-            "soil_ph": 6.5,
-            "soil_organic_carbon": 1.2,
-            "soil_nitrogen": 0.1,
-            "soil_clay": 20.0,
-            "soil_organic_carbon_stock": 50.0
-        }
+    # One openepi call per soil cell, cached on disk (see app/soil.py)
+    return soil.get_soil(lat, lon)
 
 def get_weather(lat, lon):
+    defaults = {
+        "temperature": 30,
+        "humidity": 50,
+        "precipitation": 0,
+        "windspeed": 10
+    }
     try:
-        url = (
-            f"https://api.open-meteo.com/v1/forecast"
-            f"?latitude={lat}&longitude={lon}&current_weather=true&hourly=relativehumidity_2m,precipitation"
-        )
-        response = requests.get(url)
-        data = response.json()
-        return {
-            "temperature": data.get("current_weather", {}).get("temperature", 30),
-            "humidity": data.get("hourly", {}).get("relativehumidity_2m", [50])[0],
-            "precipitation": data.get("hourly", {}).get("precipitation", [0])[0],
-            "windspeed": data.get("current_weather", {}).get("windspeed", 10)
-        }
+        current = weather.get_current(lat, lon)
+        return {key: defaults[key] if value is None else value for key, value in current.items()}
     except Exception as e:
         print(f"[ERROR] Weather data fetch failed: {e}")
-        return {
-            "temperature": 30,
-            "humidity": 50,
-            "precipitation": 0,
-            "windspeed": 10
-        }
+        return defaults
 
 # ─── ROUTE: FERTILIZER RECOMMENDATION ─────────────────────────────────────────
 
@@ -2,6 +2,8 @@ from flask import Blueprint, request, jsonify
 import os
 from dotenv import load_dotenv
 
+from app.providers import ProviderError
+
 load_dotenv()
 
 gemini_bp = Blueprint('gemini_bp', __name__)
@@ -56,6 +58,36 @@ SYSTEM_PROMPTS = {
 }
 
 
+def generate(messages, context="general", lang="English", timeout=None):
+    """
+    Provider interface (see app/providers.py): answer OpenAI-style
+    messages with Gemini 2.5 Flash.
+    """
+    if not client:
+        raise ProviderError("Gemini API not configured")
+
+    system_prompt = SYSTEM_PROMPTS.get(context, SYSTEM_PROMPTS["general"])
+    system_prompt += f"\n\nRespond in {lang} language."
+
+    # Gemini calls the assistant role "model"
+    contents = [
+        {"role": "model" if m.get("role") in ("assistant", "model") else "user",
+         "parts": [{"text": m.get("content", "")}]}
+        for m in messages if m.get("role") != "system"
+    ]
+
+    response = client.models.generate_content(
+        model="gemini-2.5-flash",
+        contents=contents,
+        config={
+            "system_instruction": system_prompt,
+            "temperature": 0.7,
+            "max_output_tokens": 2048
+        }
+    )
+    return {"response": response.text, "model": "gemini-2.5-flash"}
+
+
 @gemini_bp.route("/gemini/chat", methods=["POST"])
 def gemini_chat():
     """
@@ -74,31 +106,16 @@ def gemini_chat():
         if not client:
             return jsonify({"error": "Gemini API not configured"}), 500
         
-        # Build system prompt
-        system_prompt = SYSTEM_PROMPTS.get(context, SYSTEM_PROMPTS["general"])
-        system_prompt += f"\n\nRespond in {lang} language."
-        
         # Build conversation
-        contents = []
-        for h in history:
-            contents.append({"role": h.get("role", "user"), "parts": [{"text": h.get("content", "")}]})
-        contents.append({"role": "user", "parts": [{"text": message}]})
+        messages = [{"role": h.get("role", "user"), "content": h.get("content", "")} for h in history]
+        messages.append({"role": "user", "content": message})
         
-        # Call Gemini 2.5 Flash
-        response = client.models.generate_content(
-            model="gemini-2.5-flash",
-            contents=contents,
-            config={
-                "system_instruction": system_prompt,
-                "temperature": 0.7,
-                "max_output_tokens": 2048
-            }
-        )
+        result = generate(messages, context, lang)
         
         return jsonify({
             "success": True,
-            "response": response.text,
-            "model": "gemini-2.5-flash",
+            "response": result["response"],
+            "model": result["model"],
             "context": context
         }), 200
         
@@ -1,14 +1,10 @@
 # govscheme_bp.py
 
 from flask import Blueprint, request, jsonify
-import requests
 import os
 
-from langchain.embeddings import HuggingFaceEmbeddings
-from langchain.vectorstores import Chroma
-from langchain.chains import RetrievalQA
-from langchain_google_genai import ChatGoogleGenerativeAI  # Gemini LLM wrapper
-from langchain.schema import BaseRetriever
+from app.http_client import get_session
+from app.resources import get_retriever
 
 govscheme_bp = Blueprint('govscheme', __name__)
 
@@ -17,21 +13,9 @@ GROQ_API_KEY = os.environ.get("GROQ_API_KEY")
 GROQ_URL = "https://api.groq.com/openai/v1/chat/completions"
 MODEL_ID = "llama-3.3-70b-versatile"
 
-# ==== VECTOR STORE ====
-EMBED_MODEL = "all-MiniLM-L6-v2"
-PERSIST_DIR = "./app/chromadb"
-COLLECTION = "agri_collection"
-
-embeddings = HuggingFaceEmbeddings(model_name=EMBED_MODEL)
-vectorstore = Chroma(
-    persist_directory=PERSIST_DIR,
-    embedding_function=embeddings
-)
-retriever: BaseRetriever = vectorstore.as_retriever(search_type="similarity", search_kwargs={"k": 3})
-
 # ==== RAG Function ====
 def retrieve_context(query: str) -> str:
-    docs = retriever.get_relevant_documents(query)
+    docs = get_retriever().get_relevant_documents(query)
     return "\n\n".join(doc.page_content for doc in docs)
 
 # ==== SYSTEM PROMPT ====
@@ -83,7 +67,7 @@ def get_gov_scheme_info():
             "max_tokens": 1024
         }
 
-        response = requests.post(GROQ_URL, headers=headers, json=payload)
+        response = get_session("groq").post(GROQ_URL, headers=headers, json=payload)
 
         if response.status_code != 200:
             return jsonify({"error": "Groq API error", "details": response.json()}), 500
@@ -3,6 +3,9 @@ import os
 import requests
 from dotenv import load_dotenv
 
+from app.http_client import get_session
+from app.providers import ProviderError
+
 load_dotenv()
 
 huggingface_bp = Blueprint('huggingface_bp', __name__)
@@ -103,6 +106,59 @@ def after_request(response):
     return response
 
 
+def generate(messages, context="advisory", lang="English", timeout=None, model="agriparam"):
+    """
+    Provider interface (see app/providers.py): answer the latest user
+    message with an agricultural LLM on the HF Inference API.
+    Raises ProviderError with status 503 while the model is loading.
+    """
+    if not HF_API_KEY:
+        raise ProviderError("Hugging Face API key not configured")
+
+    query = next((m.get("content", "") for m in reversed(messages) if m.get("role") == "user"), "")
+
+    # Get model info
+    model_info = AGRI_MODELS.get(model, AGRI_MODELS["agriparam"])
+    model_id = model_info["id"]
+
+    # Build prompt
+    prompt_template = AGRI_PROMPTS.get(context, AGRI_PROMPTS["advisory"])
+    prompt = prompt_template.format(query=query)
+
+    if lang != "English":
+        prompt += f"\n\nRespond in {lang} language."
+
+    # Call Hugging Face Inference API
+    response = get_session("huggingface").post(
+        f"{HF_INFERENCE_URL}/{model_id}",
+        headers={"Authorization": f"Bearer {HF_API_KEY}"},
+        json={
+            "inputs": prompt,
+            "parameters": {
+                "max_new_tokens": 1024,
+                "temperature": 0.7,
+                "do_sample": True,
+                "return_full_text": False
+            }
+        },
+        timeout=(5, timeout) if timeout else 120  # Models may need warmup time
+    )
+
+    if response.status_code == 503:
+        raise ProviderError(f"Model {model_id} is loading", status=503)
+
+    response.raise_for_status()
+    result = response.json()
+
+    # Extract generated text
+    if isinstance(result, list) and len(result) > 0:
+        generated = result[0].get("generated_text", "")
+    else:
+        generated = str(result)
+
+    return {"response": generated, "model": model_id}
+
+
 @huggingface_bp.route("/huggingface/chat", methods=["POST"])
 def hf_chat():
     """
@@ -121,55 +177,23 @@ def hf_chat():
         if not HF_API_KEY:
             return jsonify({"error": "Hugging Face API key not configured"}), 500
         
-        # Get model info
-        model_info = AGRI_MODELS.get(model, AGRI_MODELS["agriparam"])
-        model_id = model_info["id"]
-        
-        # Build prompt
-        prompt_template = AGRI_PROMPTS.get(context, AGRI_PROMPTS["advisory"])
-        prompt = prompt_template.format(query=query)
-        
-        if lang != "English":
-            prompt += f"\n\nRespond in {lang} language."
-        
-        # Call Hugging Face Inference API
-        response = requests.post(
-            f"{HF_INFERENCE_URL}/{model_id}",
-            headers={"Authorization": f"Bearer {HF_API_KEY}"},
-            json={
-                "inputs": prompt,
-                "parameters": {
-                    "max_new_tokens": 1024,
-                    "temperature": 0.7,
-                    "do_sample": True,
-                    "return_full_text": False
-                }
-            },
-            timeout=120  # Models may need warmup time
-        )
-        
-        if response.status_code == 503:
+        try:
+            result = generate([{"role": "user", "content": query}], context, lang, model=model)
+        except ProviderError as e:
+            if e.status != 503:
+                raise
             # Model is loading
             return jsonify({
                 "success": False,
                 "loading": True,
                 "message": "Model is loading, please try again in 20-30 seconds",
-                "model": model_id
+                "model": AGRI_MODELS.get(model, AGRI_MODELS["agriparam"])["id"]
             }), 503
         
-        response.raise_for_status()
-        result = response.json()
-        
-        # Extract generated text
-        if isinstance(result, list) and len(result) > 0:
-            generated = result[0].get("generated_text", "")
-        else:
-            generated = str(result)
-        
         return jsonify({
             "success": True,
-            "response": generated,
-            "model": model_id,
+            "response": result["response"],
+            "model": result["model"],
             "context": context
         }), 200
         
@@ -204,7 +228,7 @@ def hf_disease_detect():
         image_bytes = base64.b64decode(image_base64)
         
         # Call image classification endpoint
-        response = requests.post(
+        response = get_session("huggingface").post(
             f"{HF_INFERENCE_URL}/{model_id}",
             headers={"Authorization": f"Bearer {HF_API_KEY}"},
             data=image_bytes,
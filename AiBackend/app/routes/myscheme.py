@@ -3,6 +3,8 @@ import os
 import requests
 from dotenv import load_dotenv
 
+from app.http_client import get_session
+
 load_dotenv()
 
 myscheme_bp = Blueprint('myscheme_bp', __name__)
@@ -46,7 +48,7 @@ def search_schemes():
             "Content-Type": "application/json"
         }
         
-        response = requests.get(
+        response = get_session("myscheme").get(
             f"{MYSCHEME_BASE_URL}/api/v1/schemes/search",
             headers=headers,
             params=params,
@@ -103,7 +105,7 @@ def check_eligibility():
             "Content-Type": "application/json"
         }
         
-        response = requests.post(
+        response = get_session("myscheme").post(
             f"{MYSCHEME_BASE_URL}/api/v1/eligibility/check",
             headers=headers,
             json=user_profile,
@@ -1,8 +1,16 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify, stream_with_context
+import json
+import math
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout, as_completed
 import requests
 from dotenv import load_dotenv
 
+from app.http_client import get_session
+from app.providers import ProviderError
+
 load_dotenv()
 
 openrouter_bp = Blueprint('openrouter_bp', __name__)
@@ -21,6 +29,34 @@ RECOMMENDED_MODELS = {
     "vision": "google/gemini-2.0-flash-exp:free"            # Image understanding
 }
 
+# Candidates for the "auto" preset, by capability. Free models' queue times
+# swing from hour to hour, so "auto" picks the fastest healthy one measured
+# from live traffic (see ModelLatencyTable).
+AUTO_CANDIDATES = {
+    "text": os.getenv("OPENROUTER_AUTO_TEXT_MODELS", ",".join([
+        "mistralai/mistral-7b-instruct:free",
+        "meta-llama/llama-3-8b-instruct:free",
+        "google/gemini-2.0-flash-exp:free",
+        "meta-llama/llama-3.3-70b-instruct:free",
+        "qwen/qwen-2.5-72b-instruct:free",
+    ])).split(","),
+    "vision": os.getenv("OPENROUTER_AUTO_VISION_MODELS", ",".join([
+        "google/gemini-2.0-flash-exp:free",
+        "meta-llama/llama-3.2-11b-vision-instruct:free",
+        "qwen/qwen2.5-vl-72b-instruct:free",
+    ])).split(","),
+}
+AUTO_ATTEMPTS = 2  # an "auto" request moves to the next-fastest model once on failure
+
+# /openrouter/compare calls its models concurrently under one deadline (seconds)
+MAX_COMPARE_MODELS = 6
+COMPARE_DEADLINE = float(os.getenv("OPENROUTER_COMPARE_DEADLINE", "45"))
+MIN_COMPARE_DEADLINE = 5  # shorter client timeouts are raised to this
+_compare_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("OPENROUTER_COMPARE_THREADS", "24")),
+    thread_name_prefix="openrouter-compare"
+)
+
 # Agricultural system prompts
 AGRI_SYSTEM_PROMPT = """You are an expert agricultural advisor for Indian farmers.
 Provide practical, actionable advice on:
@@ -35,6 +71,112 @@ Keep responses concise, practical, and in simple language farmers can understand
 Include specific quantities, timings, and costs when relevant."""
 
 
+class ModelLatencyTable:
+    """
+    EWMA of time-to-first-byte and total latency per OpenRouter model ID.
+    A model that fails twice in a row is unhealthy until MODEL_COOLDOWN
+    seconds pass, after which it gets another chance.
+    """
+
+    ALPHA = float(os.getenv("OPENROUTER_EWMA_ALPHA", "0.3"))
+    MODEL_COOLDOWN = float(os.getenv("OPENROUTER_MODEL_COOLDOWN", "120"))
+    UNHEALTHY_AFTER = 2
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.models = {}
+
+    def _entry(self, model_id):
+        return self.models.setdefault(model_id, {
+            "ttfb_ewma_s": None, "total_ewma_s": None, "calls": 0, "errors": 0,
+            "consecutive_errors": 0, "last_error": None, "last_error_at": None
+        })
+
+    def _ewma(self, previous, sample):
+        return sample if previous is None else self.ALPHA * sample + (1 - self.ALPHA) * previous
+
+    def record_success(self, model_id, ttfb, total):
+        with self._lock:
+            entry = self._entry(model_id)
+            entry["calls"] += 1
+            entry["consecutive_errors"] = 0
+            entry["ttfb_ewma_s"] = round(self._ewma(entry["ttfb_ewma_s"], ttfb), 3)
+            entry["total_ewma_s"] = round(self._ewma(entry["total_ewma_s"], total), 3)
+
+    def record_failure(self, model_id, error):
+        with self._lock:
+            entry = self._entry(model_id)
+            entry["calls"] += 1
+            entry["errors"] += 1
+            entry["consecutive_errors"] += 1
+            entry["last_error"] = str(error)[:200]
+            entry["last_error_at"] = time.time()
+
+    def _healthy(self, entry):
+        return (entry["consecutive_errors"] < self.UNHEALTHY_AFTER or
+                time.time() - entry["last_error_at"] >= self.MODEL_COOLDOWN)
+
+    def ranked(self, capability):
+        """
+        Candidates for a capability, best first: healthy models never measured
+        (so every candidate gets measured), then healthy ones by total latency
+        EWMA, then unhealthy ones by how long ago they last failed.
+        """
+        def rank(model_id):
+            entry = self.models.get(model_id)
+            if entry is None:
+                return (0, 0)
+            if not self._healthy(entry):
+                return (2, entry["last_error_at"])
+            if entry["total_ewma_s"] is None:
+                return (0, 0)
+            return (1, entry["total_ewma_s"])
+
+        with self._lock:
+            return sorted(AUTO_CANDIDATES[capability], key=rank)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                model_id: dict(entry, healthy=self._healthy(entry),
+                               last_error_at=round(entry["last_error_at"]) if entry["last_error_at"] else None)
+                for model_id, entry in self.models.items()
+            }
+
+
+latency_table = ModelLatencyTable()
+
+
+def chat_completion(model_id, messages, timeout=60, title="AgriX Agricultural Assistant", **params):
+    """
+    POST a chat completion to OpenRouter and record its latency (TTFB from
+    response.elapsed, total including the body) in latency_table.
+    Returns the parsed JSON; raises for HTTP errors.
+    """
+    started = time.perf_counter()
+    try:
+        response = get_session("openrouter").post(
+            f"{OPENROUTER_BASE_URL}/chat/completions",
+            headers={
+                "Authorization": f"Bearer {OPENROUTER_API_KEY}",
+                "Content-Type": "application/json",
+                "HTTP-Referer": "https://agrix.app",  # Required by OpenRouter
+                "X-Title": title
+            },
+            json={"model": model_id, "messages": messages, **params},
+            timeout=timeout
+        )
+        response.raise_for_status()
+        result = response.json()
+        if "choices" not in result:
+            raise ValueError(result.get("error", {}).get("message", "No choices in OpenRouter response"))
+    except Exception as e:
+        latency_table.record_failure(model_id, e)
+        raise
+    latency_table.record_success(model_id, response.elapsed.total_seconds(), time.perf_counter() - started)
+    return result
+
+
 @openrouter_bp.after_request
 def after_request(response):
     response.headers.add('Access-Control-Allow-Origin', '*')
@@ -43,6 +185,57 @@ def after_request(response):
     return response
 
 
+def resolve_models(model, capability):
+    """Model IDs to try, in order: "auto" gives the fastest healthy candidates, else the preset or ID"""
+    if model == "auto":
+        return latency_table.ranked(capability)[:AUTO_ATTEMPTS]
+    return [RECOMMENDED_MODELS.get(model, model)]
+
+
+def complete_first(model_ids, messages, **kwargs):
+    """
+    chat_completion with each model in turn until one answers.
+    Returns (model_id, result); raises the last model's error.
+    """
+    for attempt, model_id in enumerate(model_ids, 1):
+        try:
+            return model_id, chat_completion(model_id, messages, **kwargs)
+        except Exception as e:
+            if attempt == len(model_ids):
+                raise
+            print(f"OpenRouter auto: {model_id} failed ({e}), trying next model")
+
+
+def generate(messages, context="advisory", lang="English", timeout=None, model="fast", system_prompt=None):
+    """
+    Provider interface (see app/providers.py): answer OpenAI-style
+    messages with an OpenRouter model (preset name, "auto" or full model ID).
+    """
+    if not OPENROUTER_API_KEY:
+        raise ProviderError("OpenRouter API key not configured")
+
+    # Resolve model preset to actual model ID(s); "auto" tries the fastest healthy models
+    model_ids = resolve_models(model, "text")
+
+    # Build system prompt
+    system_prompt = system_prompt or AGRI_SYSTEM_PROMPT
+    system_prompt += f"\n\nRespond in {lang} language."
+
+    # Call OpenRouter API (OpenAI-compatible format)
+    model_id, result = complete_first(
+        model_ids,
+        [{"role": "system", "content": system_prompt}, *messages],
+        timeout=(5, timeout) if timeout else 60,
+        temperature=0.7,
+        max_tokens=2048
+    )
+    return {
+        "response": result["choices"][0]["message"]["content"],
+        "model": model_id,
+        "usage": result.get("usage", {})
+    }
+
+
 @openrouter_bp.route("/openrouter/chat", methods=["POST"])
 def openrouter_chat():
     """
@@ -63,46 +256,17 @@ def openrouter_chat():
         if not OPENROUTER_API_KEY:
             return jsonify({"error": "OpenRouter API key not configured"}), 500
         
-        # Resolve model preset to actual model ID
-        model_id = RECOMMENDED_MODELS.get(model, model)
-        
-        # Build system prompt
-        system_prompt = custom_system or AGRI_SYSTEM_PROMPT
-        system_prompt += f"\n\nRespond in {lang} language."
-        
         # Build messages
-        messages = [{"role": "system", "content": system_prompt}]
-        for h in history:
-            messages.append({"role": h.get("role", "user"), "content": h.get("content", "")})
+        messages = [{"role": h.get("role", "user"), "content": h.get("content", "")} for h in history]
         messages.append({"role": "user", "content": message})
         
-        # Call OpenRouter API (OpenAI-compatible format)
-        response = requests.post(
-            f"{OPENROUTER_BASE_URL}/chat/completions",
-            headers={
-                "Authorization": f"Bearer {OPENROUTER_API_KEY}",
-                "Content-Type": "application/json",
-                "HTTP-Referer": "https://agrix.app",  # Required by OpenRouter
-                "X-Title": "AgriX Agricultural Assistant"
-            },
-            json={
-                "model": model_id,
-                "messages": messages,
-                "temperature": 0.7,
-                "max_tokens": 2048
-            },
-            timeout=60
-        )
-        response.raise_for_status()
-        
-        result = response.json()
-        answer = result["choices"][0]["message"]["content"]
+        result = generate(messages, lang=lang, model=model, system_prompt=custom_system)
         
         return jsonify({
             "success": True,
-            "response": answer,
-            "model": model_id,
-            "usage": result.get("usage", {})
+            "response": result["response"],
+            "model": result["model"],
+            "usage": result["usage"]
         }), 200
         
     except requests.exceptions.RequestException as e:
@@ -124,7 +288,7 @@ def openrouter_vision():
         image_url = data.get("image_url")  # URL or base64 data URL
         image_base64 = data.get("image_base64")
         query = data.get("query", "Analyze this plant image for diseases or health issues.")
-        model = data.get("model", "google/gemini-2.0-flash-exp:free")
+        model = data.get("model", "google/gemini-2.0-flash-exp:free")  # or "auto"
         lang = data.get("lang", "English")
         
         if not image_url and not image_base64:
@@ -149,34 +313,24 @@ def openrouter_vision():
         Be specific about treatments including product names and dosages.
         Respond in {lang} language."""
         
-        response = requests.post(
-            f"{OPENROUTER_BASE_URL}/chat/completions",
-            headers={
-                "Authorization": f"Bearer {OPENROUTER_API_KEY}",
-                "Content-Type": "application/json",
-                "HTTP-Referer": "https://agrix.app",
-                "X-Title": "AgriX Plant Disease Detection"
-            },
-            json={
-                "model": model,
-                "messages": [
-                    {"role": "system", "content": system_prompt},
-                    {
-                        "role": "user",
-                        "content": [
-                            {"type": "text", "text": query},
-                            image_content
-                        ]
-                    }
-                ],
-                "temperature": 0.3,
-                "max_tokens": 2048
-            },
-            timeout=60
+        # "auto" moves on to the next-fastest vision model if the first fails
+        model, result = complete_first(
+            resolve_models(model, "vision"),
+            [
+                {"role": "system", "content": system_prompt},
+                {
+                    "role": "user",
+                    "content": [
+                        {"type": "text", "text": query},
+                        image_content
+                    ]
+                }
+            ],
+            timeout=60,
+            title="AgriX Plant Disease Detection",
+            temperature=0.3,
+            max_tokens=2048
         )
-        response.raise_for_status()
-        
-        result = response.json()
         analysis = result["choices"][0]["message"]["content"]
         
         return jsonify({
@@ -203,7 +357,7 @@ def list_models():
                 "note": "Get full list by configuring OPENROUTER_API_KEY"
             }), 200
         
-        response = requests.get(
+        response = get_session("openrouter").get(
             f"{OPENROUTER_BASE_URL}/models",
             headers={"Authorization": f"Bearer {OPENROUTER_API_KEY}"},
             timeout=30
@@ -227,17 +381,87 @@ def list_models():
         return jsonify({"error": str(e)}), 500
 
 
+def compare_one(model_preset, message, lang, timeout):
+    """One /openrouter/compare entry: the model's answer or error, with latency"""
+    model_id = RECOMMENDED_MODELS.get(model_preset, model_preset)
+    started = time.perf_counter()
+    entry = {"model": model_id, "preset": model_preset}
+    try:
+        result = chat_completion(
+            model_id,
+            [
+                {"role": "system", "content": f"{AGRI_SYSTEM_PROMPT}\nRespond in {lang}."},
+                {"role": "user", "content": message}
+            ],
+            timeout=(5, timeout),
+            title="AgriX Model Comparison",
+            temperature=0.7,
+            max_tokens=1024
+        )
+        entry["response"] = result["choices"][0]["message"]["content"]
+        entry["usage"] = result.get("usage", {})
+    except requests.exceptions.HTTPError as e:
+        entry["error"] = f"Status {e.response.status_code}"
+    except Exception as e:
+        entry["error"] = str(e)
+    entry["latency_s"] = round(time.perf_counter() - started, 3)
+    return entry
+
+
+def run_comparisons(models, message, lang, deadline):
+    """
+    Call every model concurrently and yield each entry as it finishes.
+    Models still running at the deadline are reported as timed out.
+    """
+    started = time.perf_counter()
+    futures = {
+        _compare_executor.submit(compare_one, preset, message, lang, deadline): preset
+        for preset in models
+    }
+    yielded = set()
+    try:
+        for future in as_completed(futures, timeout=deadline):
+            yielded.add(future)
+            yield future.result()
+    except FutureTimeout:
+        for future, preset in futures.items():
+            if future in yielded:
+                continue
+            if future.done():
+                # finished between the deadline and this loop; its answer still counts
+                yield future.result()
+            else:
+                future.cancel()
+                yield {
+                    "model": RECOMMENDED_MODELS.get(preset, preset),
+                    "preset": preset,
+                    "error": f"No answer within {deadline}s",
+                    "latency_s": round(time.perf_counter() - started, 3)
+                }
+
+
 @openrouter_bp.route("/openrouter/compare", methods=["POST"])
 def compare_models():
     """
     Compare responses from multiple models for the same query
     Useful for testing which model works best
+
+    Models are called concurrently under one overall deadline ("timeout",
+    seconds). With "stream": true the response is NDJSON, one comparison per
+    line as soon as each model finishes, followed by a {"done": true} line.
     """
     try:
         data = request.json
         message = data.get("message", "")
-        models = data.get("models", ["fast", "balanced", "smart"])
+        models = data.get("models", ["fast", "balanced", "smart"])[:MAX_COMPARE_MODELS]
         lang = data.get("lang", "English")
+        try:
+            deadline = float(data.get("timeout", COMPARE_DEADLINE))
+        except (TypeError, ValueError):
+            return jsonify({"error": "timeout must be a number of seconds"}), 400
+        if math.isnan(deadline):
+            return jsonify({"error": "timeout must be a number of seconds"}), 400
+        deadline = min(max(deadline, MIN_COMPARE_DEADLINE), COMPARE_DEADLINE)
         
         if not message:
             return jsonify({"error": "Message is required"}), 400
@@ -245,58 +469,25 @@ def compare_models():
         if not OPENROUTER_API_KEY:
             return jsonify({"error": "OpenRouter API key not configured"}), 500
         
-        results = []
+        started = time.perf_counter()
+        
+        if data.get("stream"):
+            def generate_lines():
+                for entry in run_comparisons(models, message, lang, deadline):
+                    yield json.dumps(entry) + "\n"
+                yield json.dumps({"done": True, "query": message,
+                                  "total_s": round(time.perf_counter() - started, 3)}) + "\n"
+            return Response(stream_with_context(generate_lines()), mimetype="application/x-ndjson")
         
-        for model_preset in models[:3]:  # Max 3 comparisons
-            model_id = RECOMMENDED_MODELS.get(model_preset, model_preset)
-            
-            try:
-                response = requests.post(
-                    f"{OPENROUTER_BASE_URL}/chat/completions",
-                    headers={
-                        "Authorization": f"Bearer {OPENROUTER_API_KEY}",
-                        "Content-Type": "application/json",
-                        "HTTP-Referer": "https://agrix.app",
-                        "X-Title": "AgriX Model Comparison"
-                    },
-                    json={
-                        "model": model_id,
-                        "messages": [
-                            {"role": "system", "content": f"{AGRI_SYSTEM_PROMPT}\nRespond in {lang}."},
-                            {"role": "user", "content": message}
-                        ],
-                        "temperature": 0.7,
-                        "max_tokens": 1024
-                    },
-                    timeout=30
-                )
-                
-                if response.status_code == 200:
-                    result = response.json()
-                    results.append({
-                        "model": model_id,
-                        "preset": model_preset,
-                        "response": result["choices"][0]["message"]["content"],
-                        "usage": result.get("usage", {})
-                    })
-                else:
-                    results.append({
-                        "model": model_id,
-                        "preset": model_preset,
-                        "error": f"Status {response.status_code}"
-                    })
-                    
-            except Exception as e:
-                results.append({
-                    "model": model_id,
-                    "preset": model_preset,
-                    "error": str(e)
-                })
+        # Keep the requested model order in the JSON response
+        order = {preset: i for i, preset in enumerate(models)}
+        results = sorted(run_comparisons(models, message, lang, deadline), key=lambda r: order[r["preset"]])
         
         return jsonify({
             "success": True,
             "query": message,
-            "comparisons": results
+            "comparisons": results,
+            "total_s": round(time.perf_counter() - started, 3)
         }), 200
         
     except Exception as e:
@@ -315,5 +506,10 @@ def openrouter_status():
             "/openrouter/compare"
         ],
         "recommended_models": RECOMMENDED_MODELS,
+        "auto": {
+            capability: latency_table.ranked(capability)
+            for capability in AUTO_CANDIDATES
+        },
+        "latency": latency_table.snapshot(),
         "note": "Get API key at: https://openrouter.ai/keys"
     }), 200
@@ -3,6 +3,8 @@ import os
 import requests
 from dotenv import load_dotenv
 
+from app.http_client import get_session
+
 load_dotenv()
 
 perplexity_bp = Blueprint('perplexity_bp', __name__)
@@ -61,7 +63,7 @@ def perplexity_chat():
             "Content-Type": "application/json"
         }
         
-        response = requests.post(
+        response = get_session("perplexity").post(
             "https://api.perplexity.ai/chat/completions",
             headers=headers,
             json=payload,
@@ -8,6 +8,8 @@ from langchain.output_parsers import PydanticOutputParser
 from pydantic import BaseModel, Field
 import json
 
+from app.http_client import get_session
+
 load_dotenv()
 
 plant_disease_bp = Blueprint('plant_disease_bp', __name__)
@@ -71,7 +73,7 @@ def detect_plant_disease():
             "Content-Type": "application/json"
         }
 
-        response = requests.post("https://api.groq.com/openai/v1/chat/completions", headers=headers, json=payload)
+        response = get_session("groq").post("https://api.groq.com/openai/v1/chat/completions", headers=headers, json=payload)
         response.raise_for_status()
         result = response.json()
         content = result["choices"][0]["message"]["content"]
@@ -101,7 +103,7 @@ def detect_plant_disease():
                 "temperature": 0.4
             }
 
-            treatment_response = requests.post("https://api.groq.com/openai/v1/chat/completions", headers=headers, json=treatment_payload)
+            treatment_response = get_session("groq").post("https://api.groq.com/openai/v1/chat/completions", headers=headers, json=treatment_payload)
             treatment_response.raise_for_status()
             treatment_result = treatment_response.json()
             treatment_content = treatment_result["choices"][0]["message"]["content"]
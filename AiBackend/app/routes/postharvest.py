@@ -5,36 +5,16 @@ from dotenv import load_dotenv
 from langchain.output_parsers import PydanticOutputParser
 from pydantic import BaseModel, Field
 
+from app import weather
+from app.http_client import get_session
+
 load_dotenv()
 
 postharvest_bp = Blueprint('postharvest_bp', __name__)
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 
-# Updated Weather Forecast function using daily data
-def get_weather_forecast(lat, lon):
-    try:
-        url = (
-            f"https://api.open-meteo.com/v1/forecast"
-            f"?latitude={lat}&longitude={lon}"
-            f"&daily=temperature_2m_max,temperature_2m_min,precipitation_sum,wind_speed_10m_max,"
-            f"relative_humidity_2m_max,relative_humidity_2m_min"
-            f"&forecast_days=7&timezone=auto"
-        )
-        response = requests.get(url)
-        data = response.json()
-
-        return {
-            "dates": data.get("daily", {}).get("time", []),
-            "temp_max": data.get("daily", {}).get("temperature_2m_max", []),
-            "temp_min": data.get("daily", {}).get("temperature_2m_min", []),
-            "humidity_max": data.get("daily", {}).get("relative_humidity_2m_max", []),
-            "humidity_min": data.get("daily", {}).get("relative_humidity_2m_min", []),
-            "precipitation": data.get("daily", {}).get("precipitation_sum", []),
-            "wind_speed_max": data.get("daily", {}).get("wind_speed_10m_max", [])
-        }
-    except Exception as e:
-        print(f"[ERROR] Forecast fetch failed: {e}")
-        return {}
+# Weather forecast fields (shared, cached open-meteo forecast)
+WEATHER_FIELDS = ["dates", "temp_max", "temp_min", "humidity_max", "humidity_min", "precipitation", "wind_speed_max"]
 
 # Pydantic models
 class PlanItem(BaseModel):
@@ -75,7 +55,7 @@ def postharvest_instructions():
         return jsonify({"error": "Missing 'latitude' or 'longitude' in request for weather data."}), 400
 
     # Use forecast data
-    weather_info = get_weather_forecast(lat, lon)
+    weather_info = weather.get_daily(lat, lon, WEATHER_FIELDS)
 
     # Build prompt with language instruction
     system_prompt = (
@@ -109,7 +89,7 @@ def postharvest_instructions():
     }
 
     try:
-        response = requests.post(
+        response = get_session("groq").post(
             "https://api.groq.com/openai/v1/chat/completions",
             headers=headers,
             json=payload
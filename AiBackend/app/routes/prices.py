@@ -0,0 +1,228 @@
+from flask import Blueprint, request, jsonify
+import os
+import threading
+import time
+from dotenv import load_dotenv
+
+from app import prices, upag_mirror
+
+load_dotenv()
+
+prices_bp = Blueprint('prices_bp', __name__)
+
+# The index is built from agmarknet records in the UPAg mirror
+# (sync_upag_mirror.py) when it has them, otherwise from a live UPAg export,
+# and rebuilt in the background once it is older than PRICE_INDEX_TTL. After
+# a failed build, no new attempt starts for PRICE_INDEX_RETRY seconds.
+PRICE_INDEX_TTL = int(os.getenv("PRICE_INDEX_TTL", "21600"))
+PRICE_INDEX_RETRY = int(os.getenv("PRICE_INDEX_RETRY", "300"))
+PRICE_INDEX_YEARS = [
+    year.strip() for year in os.getenv(
+        "PRICE_INDEX_YEARS", f"{time.localtime().tm_year - 1},{time.localtime().tm_year}"
+    ).split(",") if year.strip()
+]
+MAX_WINDOW = 90
+
+_index = None
+_index_lock = threading.Lock()
+_rebuilding = False
+_last_error = None
+_last_failure_at = 0.0
+
+
+@prices_bp.after_request
+def after_request(response):
+    response.headers.add('Access-Control-Allow-Origin', '*')
+    response.headers.add('Access-Control-Allow-Headers', 'Content-Type,Authorization')
+    response.headers.add('Access-Control-Allow-Methods', 'GET,PUT,POST,DELETE,OPTIONS')
+    return response
+
+
+def load_agmarknet_records():
+    """agmarknet records for PRICE_INDEX_YEARS, and where they came from"""
+    if upag_mirror.has_source("agmarknet"):
+        return upag_mirror.iter_records("agmarknet", PRICE_INDEX_YEARS), "mirror"
+
+    from app.routes import upag
+    source_input = upag.build_source_input("agmarknet", {"year": PRICE_INDEX_YEARS})
+
+    def pages():
+        for _, records, _ in upag.export_pages("agmarknet", source_input, 0,
+                                               upag.EXPORT_PAGE_SIZE, upag.EXPORT_CONCURRENCY):
+            yield from records
+    return pages(), "upag"
+
+
+def build_index():
+    global _index, _last_error, _last_failure_at
+    try:
+        records, source = load_agmarknet_records()
+        index = prices.PriceIndex(records)
+        index.source = source
+    except Exception as e:
+        _last_error, _last_failure_at = str(e), time.time()
+        print(f"[ERROR] Price index build failed: {e}")
+        raise
+    _index, _last_error, _last_failure_at = index, None, 0.0
+    print(f"Price index built from {source}: {index.stats()['rows']} rows, "
+          f"{index.stats()['series']} series in {index.build_s}s")
+    return index
+
+
+def _background_rebuild():
+    global _rebuilding
+    try:
+        build_index()
+    except Exception:
+        pass
+    finally:
+        _rebuilding = False
+
+
+def _retry_in():
+    """Seconds until a failed build may be retried (0 if the last build didn't fail)"""
+    return max(0.0, _last_failure_at + PRICE_INDEX_RETRY - time.time()) if _last_failure_at else 0.0
+
+
+def get_index():
+    """
+    The price index, building it on first use; a stale index is served while
+    it is rebuilt. A failed build is not retried for PRICE_INDEX_RETRY seconds.
+    """
+    global _rebuilding
+    index = _index
+    if index is None:
+        with _index_lock:
+            if _index is not None:
+                return _index
+            if _retry_in():
+                raise RuntimeError(f"last build failed ({_last_error}); retrying in {int(_retry_in()) + 1}s")
+            return build_index()
+    if time.time() - index.built_at > PRICE_INDEX_TTL:
+        with _index_lock:
+            if not _rebuilding and not _retry_in():
+                _rebuilding = True
+                threading.Thread(target=_background_rebuild, daemon=True).start()
+    return index
+
+
+def _window():
+    window = int(request.args.get("window", prices.DEFAULT_WINDOW))
+    if not 1 <= window <= MAX_WINDOW:
+        raise ValueError(f"window must be between 1 and {MAX_WINDOW} days")
+    return window
+
+
+@prices_bp.route("/prices/latest", methods=["GET"])
+def latest_prices():
+    """
+    Latest mandi price per market with rolling min/max/mean and week-on-week change
+    Query: commodity, state (optional), window (days, default 7)
+    """
+    started = time.perf_counter()
+    try:
+        window = _window()
+        rows = get_index().latest(request.args.get("commodity"), request.args.get("state"), window)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": f"Price index unavailable: {e}"}), 503
+
+    return jsonify({
+        "success": True,
+        "count": len(rows),
+        "window_days": window,
+        "data": sorted(rows, key=lambda row: (row["commodity"], row["market"])),
+        "query_ms": round((time.perf_counter() - started) * 1000, 2)
+    }), 200
+
+
+@prices_bp.route("/prices/series", methods=["GET"])
+def price_series():
+    """
+    Daily price series with rolling analytics
+    Query: commodity (required), market, state, start, end (YYYY-MM-DD), window
+    """
+    started = time.perf_counter()
+    commodity = request.args.get("commodity")
+    if not commodity:
+        return jsonify({"error": "commodity is required"}), 400
+
+    try:
+        window = _window()
+        series = get_index().series_for(
+            commodity,
+            market=request.args.get("market"),
+            state=request.args.get("state"),
+            start=request.args.get("start"),
+            end=request.args.get("end"),
+            window=window
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": f"Price index unavailable: {e}"}), 503
+
+    return jsonify({
+        "success": True,
+        "commodity": commodity,
+        "window_days": window,
+        "markets": len(series),
+        "series": series,
+        "query_ms": round((time.perf_counter() - started) * 1000, 2)
+    }), 200
+
+
+@prices_bp.route("/prices/summary", methods=["GET"])
+def price_summary():
+    """
+    Spread of modal prices across markets over the most recent days
+    Query: commodity (required), state, days (default 7)
+    """
+    started = time.perf_counter()
+    commodity = request.args.get("commodity")
+    if not commodity:
+        return jsonify({"error": "commodity is required"}), 400
+
+    try:
+        days = int(request.args.get("days", prices.WOW_DAYS))
+        summary = get_index().summary(commodity, request.args.get("state"), days=max(1, days))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": f"Price index unavailable: {e}"}), 503
+
+    if summary is None:
+        return jsonify({"success": False, "error": f"No prices for {commodity}"}), 404
+
+    return jsonify({
+        "success": True,
+        "summary": summary,
+        "query_ms": round((time.perf_counter() - started) * 1000, 2)
+    }), 200
+
+
+@prices_bp.route("/prices/refresh", methods=["POST"])
+def refresh_prices():
+    """Rebuild the price index now (e.g. after sync_upag_mirror.py)"""
+    try:
+        with _index_lock:
+            index = build_index()
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 502
+    return jsonify({"success": True, "index": {**index.stats(), "source": index.source}}), 200
+
+
+@prices_bp.route("/prices/status", methods=["GET"])
+def prices_status():
+    """Price index size, coverage and age"""
+    index = _index
+    return jsonify({
+        "built": index is not None,
+        "index": {**index.stats(), "source": index.source} if index else None,
+        "ttl_s": PRICE_INDEX_TTL,
+        "years": PRICE_INDEX_YEARS,
+        "rebuilding": _rebuilding,
+        "last_error": _last_error,
+        "retry_in_s": round(_retry_in(), 1)
+    }), 200
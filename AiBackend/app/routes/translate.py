@@ -1,15 +1,18 @@
 # translate_bp.py
 
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify, stream_with_context
+import json
 import os
-import fitz  # PyMuPDF
-import requests
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
 from dotenv import load_dotenv
+from werkzeug.exceptions import RequestEntityTooLarge
 
-# RAG imports
-from langchain.embeddings import HuggingFaceEmbeddings
-from langchain.vectorstores import Chroma
-from langchain.schema import Document
+from app import pdf_text, translate_cache
+from app.http_client import get_session
+from app.resources import get_retriever
 
 load_dotenv()
 
@@ -18,25 +21,37 @@ GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 GROQ_URL = "https://api.groq.com/openai/v1/chat/completions"
 MODEL_ID = "llama-3.3-70b-versatile"
 
-# ==== VECTOR STORE SETUP ====
-EMBED_MODEL = "all-MiniLM-L6-v2"
-PERSIST_DIR   = "./app/chromadb"
-embeddings    = HuggingFaceEmbeddings(model_name=EMBED_MODEL)
-vectorstore   = Chroma(
-    persist_directory=PERSIST_DIR,
-    embedding_function=embeddings
-)
-retriever     = vectorstore.as_retriever(
-    search_type="similarity",
-    search_kwargs={"k": 3}
+# Long documents are explained in chunks of about TRANSLATE_CHUNK_CHARS
+# characters (whole pages where possible), then stitched together in one
+# reduce call. TRANSLATE_MAX_PARALLEL caps concurrent chunk calls to Groq
+# per process, and TRANSLATE_REQUEST_PARALLEL how many chunks of one document
+# may be running or queued at once, so a long PDF can't hold up other uploads.
+CHUNK_CHARS = int(os.getenv("TRANSLATE_CHUNK_CHARS", "6000"))
+MAX_PARALLEL = int(os.getenv("TRANSLATE_MAX_PARALLEL", "4"))
+REQUEST_PARALLEL = int(os.getenv("TRANSLATE_REQUEST_PARALLEL", str(MAX_PARALLEL)))
+CHUNK_MAX_TOKENS = int(os.getenv("TRANSLATE_CHUNK_MAX_TOKENS", "1024"))
+REDUCE_MAX_CHARS = int(os.getenv("TRANSLATE_REDUCE_MAX_CHARS", "40000"))
+_translate_executor = ThreadPoolExecutor(max_workers=MAX_PARALLEL, thread_name_prefix="translate")
+
+SYSTEM_PROMPT = (
+    "You are an expert in explaining agricultural and government documents to rural farmers. "
+    "Instead of directly translating, summarize and explain the content in very simple and clear terms "
+    "in the target language ({language}). Use a farmer-friendly tone. Preserve any important data or rules, "
+    "but avoid complex language. If needed, use bullet points or sections for better clarity."
 )
 
+@translate_bp.errorhandler(RequestEntityTooLarge)
+def upload_too_large(e):
+    """Werkzeug stopped reading the body at MAX_CONTENT_LENGTH"""
+    return jsonify({"error": pdf_text.too_large_message()}), 413
+
+
 def retrieve_references(query: str) -> list[dict]:
     """
     Fetch top-K docs most similar to `query` and return
     a snippet + (optional) metadata as references.
     """
-    docs = retriever.get_relevant_documents(query)
+    docs = get_retriever().get_relevant_documents(query)
     refs = []
     for doc in docs:
         refs.append({
@@ -46,6 +61,220 @@ def retrieve_references(query: str) -> list[dict]:
     return refs
 
 
+def load_chunks(path):
+    """Open a spooled PDF, extract it page by page and split it; returns (page count, chunks)"""
+    with pdf_text.open_pdf(path) as doc:
+        return doc.page_count, split_chunks(pdf_text.iter_pages(doc))
+
+
+def split_text(text, max_chars):
+    """Split text into pieces of at most max_chars, on paragraph breaks where possible"""
+    pieces, piece = [], ""
+    for paragraph in text.split("\n\n"):
+        while len(paragraph) > max_chars:
+            if piece:
+                pieces.append(piece)
+                piece = ""
+            pieces.append(paragraph[:max_chars])
+            paragraph = paragraph[max_chars:]
+        if piece and len(piece) + 2 + len(paragraph) > max_chars:
+            pieces.append(piece)
+            piece = ""
+        piece = f"{piece}\n\n{paragraph}" if piece else paragraph
+    if piece.strip():
+        pieces.append(piece)
+    return pieces
+
+
+def split_chunks(pages, max_chars=CHUNK_CHARS):
+    """
+    Group consecutive pages into chunks of at most max_chars; a longer page
+    is split on paragraph breaks. Returns [{"pages": (first, last), "text"}]
+    with 1-based page numbers.
+    """
+    chunks = []
+    for number, text in enumerate(pages, 1):
+        for piece in split_text(text.strip(), max_chars) if text.strip() else []:
+            last = chunks[-1] if chunks else None
+            if last and len(last["text"]) + 1 + len(piece) <= max_chars:
+                last["text"] += "\n" + piece
+                last["pages"] = (last["pages"][0], number)
+            else:
+                chunks.append({"pages": (number, number), "text": piece})
+    return chunks
+
+
+def groq_chat(messages, temperature=0.4, max_tokens=None):
+    """One Groq chat completion; returns the message text"""
+    payload = {
+        "model": MODEL_ID,
+        "messages": messages,
+        "temperature": temperature
+    }
+    if max_tokens:
+        payload["max_tokens"] = max_tokens
+    headers = {
+        "Authorization": f"Bearer {GROQ_API_KEY}",
+        "Content-Type": "application/json"
+    }
+    response = get_session("groq").post(GROQ_URL, headers=headers, json=payload)
+    response.raise_for_status()
+    return response.json()["choices"][0]["message"]["content"]
+
+
+def stream_groq(messages, temperature=0.4, max_tokens=None, cancelled=None):
+    """Groq chat completion with stream=true; yields text deltas as they arrive"""
+    payload = {
+        "model": MODEL_ID,
+        "messages": messages,
+        "temperature": temperature,
+        "stream": True
+    }
+    if max_tokens:
+        payload["max_tokens"] = max_tokens
+    headers = {
+        "Authorization": f"Bearer {GROQ_API_KEY}",
+        "Content-Type": "application/json"
+    }
+    with get_session("groq").post(GROQ_URL, headers=headers, json=payload, stream=True) as response:
+        response.raise_for_status()
+        for line in response.iter_lines(chunk_size=None, decode_unicode=True):  # no read-ahead buffering
+            if cancelled is not None and cancelled.is_set():
+                return
+            if not line or not line.startswith("data:"):
+                continue
+            data = line[5:].strip()
+            if data == "[DONE]":
+                return
+            delta = json.loads(data)["choices"][0].get("delta", {}).get("content")
+            if delta:
+                yield delta
+
+
+def chunk_messages(chunk, target_language, total_pages, n_chunks):
+    """Prompt explaining one chunk (the map step)"""
+    first, last = chunk["pages"]
+    pages = f"page {first}" if first == last else f"pages {first}-{last}"
+    if n_chunks == 1:
+        prompt = f"Explain the following document in {target_language}:\n\n{chunk['text']}"
+    else:
+        prompt = (
+            f"This is {pages} of a {total_pages}-page document. Explain this part in {target_language}. "
+            "Keep every figure, date, amount and eligibility rule; do not add an introduction or conclusion "
+            f"for the whole document.\n\n{chunk['text']}"
+        )
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT.format(language=target_language)},
+        {"role": "user", "content": prompt}
+    ]
+
+
+def reduce_messages(partials, target_language):
+    """Prompt stitching the chunk explanations into one document (the reduce step)"""
+    sections = "\n\n".join(
+        f"--- Part {i} ({label}) ---\n{text}" for i, (label, text) in enumerate(partials, 1)
+    )
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT.format(language=target_language)},
+        {"role": "user", "content": (
+            f"Below are explanations, in {target_language}, of consecutive parts of one document. "
+            "Combine them into a single clear explanation for farmers in the same language: keep the "
+            "document's order, merge repeated points, and keep every figure, date and rule.\n\n" + sections
+        )}
+    ]
+
+
+def page_label(chunk):
+    first, last = chunk["pages"]
+    return f"page {first}" if first == last else f"pages {first}-{last}"
+
+
+def submit_windowed(fn, items, limit=None):
+    """
+    Run fn(item) for every item on the shared pool, but keep at most `limit`
+    of them in the pool at a time; each one that finishes submits the next.
+    Other requests' chunks queue in between, so documents share the workers
+    instead of being served one after another. Returns one future per item,
+    in order; cancelling a future that hasn't started skips it.
+    """
+    limit = max(1, limit or REQUEST_PARALLEL)
+    futures = [Future() for _ in items]
+    lock = threading.Lock()
+    position = [0]
+
+    def run(index):
+        try:
+            if not futures[index].set_running_or_notify_cancel():
+                return
+            try:
+                futures[index].set_result(fn(items[index]))
+            except BaseException as e:
+                futures[index].set_exception(e)
+        finally:
+            start_next()
+
+    def start_next():
+        with lock:
+            while position[0] < len(items) and futures[position[0]].cancelled():
+                position[0] += 1
+            if position[0] >= len(items):
+                return
+            index = position[0]
+            position[0] += 1
+        _translate_executor.submit(run, index)
+
+    for _ in range(min(limit, len(items))):
+        start_next()
+    return futures
+
+
+def submit_chunks(chunks, target_language, total_pages):
+    """
+    Map step: start explaining every chunk concurrently; returns one future
+    per chunk. A failed chunk is retried once before it fails the document.
+    """
+    def run(chunk):
+        started = time.perf_counter()
+        messages = chunk_messages(chunk, target_language, total_pages, len(chunks))
+        max_tokens = CHUNK_MAX_TOKENS if len(chunks) > 1 else None
+        try:
+            text = groq_chat(messages, max_tokens=max_tokens)
+        except Exception as e:
+            print(f"[WARN] Translate chunk ({page_label(chunk)}) failed, retrying: {e}")
+            text = groq_chat(messages, max_tokens=max_tokens)
+        return text, round(time.perf_counter() - started, 3)
+
+    return submit_windowed(run, chunks)
+
+
+def collect_chunks(chunks, futures):
+    """Wait for the map step; returns ([(label, text)] in document order, [per-chunk timing])"""
+    partials, timings = [], []
+    for chunk, future in zip(chunks, futures):
+        text, latency = future.result()
+        partials.append((page_label(chunk), text))
+        timings.append({"pages": page_label(chunk), "chars": len(chunk["text"]), "latency_s": latency})
+    return partials, timings
+
+
+def stitch(partials, target_language):
+    """
+    Reduce step: one call merging the chunk explanations. Returns the
+    explanations under page headings instead, as "sections" when they are
+    too long to merge and as "concatenated" when the merge call failed.
+    """
+    if len(partials) == 1:
+        return partials[0][1], "single"
+    sections = "\n\n".join(f"### {label.capitalize()}\n\n{text}" for label, text in partials)
+    if sum(len(text) for _, text in partials) > REDUCE_MAX_CHARS:
+        return sections, "sections"
+    try:
+        return groq_chat(reduce_messages(partials, target_language), temperature=0.3), "merged"
+    except Exception as e:
+        print(f"[WARN] Translate reduce step failed, concatenating sections: {e}")
+    return sections, "concatenated"
+
+
 @translate_bp.route("/translate", methods=["POST"])
 def translate_document():
     if 'file' not in request.files:
@@ -56,51 +285,201 @@ def translate_document():
     if not target_language:
         return jsonify({"error": "No target language specified."}), 400
 
+    spool_path = None
+    futures = []
     try:
-        # 1) Extract text from PDF
-        text = ""
-        with fitz.open(stream=pdf_file.read(), filetype="pdf") as doc:
-            for page in doc:
-                text += page.get_text()
-        if not text.strip():
+        started = time.perf_counter()
+        timings = {}
+
+        # 0) Spool the upload to disk while hashing it; the same circular in
+        #    the same language is served from the cache
+        spool_path, doc_hash, _ = pdf_text.spool_upload(pdf_file)
+        cached = translate_cache.get(doc_hash, target_language, MODEL_ID)
+        if cached is not None:
+            return jsonify({
+                **cached,
+                "cache": "hit",
+                "timings": {"total_s": round(time.perf_counter() - started, 3)}
+            }), 200
+
+        # 1) Extract text page by page and split it into chunks
+        page_count, chunks = load_chunks(spool_path)
+        pdf_text.remove_spool(spool_path)
+        timings["extract_s"] = round(time.perf_counter() - started, 3)
+        if not chunks:
             return jsonify({"error": "PDF appears empty or unreadable."}), 400
 
-        # 2) Retrieve “related” docs for references
+        # 2) Map: explain each chunk concurrently
+        map_started = time.perf_counter()
+        futures = submit_chunks(chunks, target_language, page_count)
+
+        # 3) Retrieve “related” docs for references while the chunks are explained
         #    Here we use the first 500 characters of the doc as a proxy query:
-        refs = retrieve_references(text[:500])
-
-        # 3) Build your Groq prompt (unchanged core logic)
-        system_prompt = (
-            "You are an expert in explaining agricultural and government documents to rural farmers. "
-            "Instead of directly translating, summarize and explain the content in very simple and clear terms "
-            f"in the target language ({target_language}). Use a farmer-friendly tone. Preserve any important data or rules, "
-            "but avoid complex language. If needed, use bullet points or sections for better clarity."
-        )
-        prompt = f"Explain the following document in {target_language}:\n\n{text.strip()}"
-
-        payload = {
-            "model": MODEL_ID,
-            "messages": [
-                {"role": "system", "content": system_prompt},
-                {"role": "user",   "content": prompt}
-            ],
-            "temperature": 0.4
-        }
-        headers = {
-            "Authorization": f"Bearer {GROQ_API_KEY}",
-            "Content-Type": "application/json"
-        }
+        refs = retrieve_references(chunks[0]["text"][:500])
 
-        # 4) Call Groq
-        response = requests.post(GROQ_URL, headers=headers, json=payload)
-        response.raise_for_status()
-        translated_text = response.json()["choices"][0]["message"]["content"]
+        partials, chunk_timings = collect_chunks(chunks, futures)
+        timings["map_s"] = round(time.perf_counter() - map_started, 3)
+        timings["longest_chunk_s"] = max(t["latency_s"] for t in chunk_timings)
 
-        # 5) Return both translated doc and references
-        return jsonify({
+        # 4) Reduce: stitch the explanations into one document
+        reduce_started = time.perf_counter()
+        translated_text, reduce_mode = stitch(partials, target_language)
+        timings["reduce_s"] = round(time.perf_counter() - reduce_started, 3)
+
+        timings["total_s"] = round(time.perf_counter() - started, 3)
+        timings["chunks"] = chunk_timings
+
+        result = {
             "translated_document": translated_text,
-            "references": refs
-        }), 200
+            "references": refs,
+            "pages": page_count,
+            "chunks": len(chunks),
+            "reduce": reduce_mode
+        }
+        if reduce_mode != "concatenated":
+            # "concatenated" means the reduce call failed this time; don't
+            # make that the answer for every later upload
+            translate_cache.put(doc_hash, target_language, MODEL_ID, result)
+
+        # 5) Return both translated doc and references
+        return jsonify({**result, "cache": "miss", "timings": timings}), 200
+
+    except pdf_text.UploadTooLarge as e:
+        return jsonify({"error": str(e)}), 413
+    except pdf_text.UnreadablePDF as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    finally:
+        # On failure, drop chunks still queued so they don't spend Groq quota
+        # (and pool slots other requests wait for) on a response nobody gets
+        for future in futures:
+            future.cancel()
+        pdf_text.remove_spool(spool_path)
+
+
+def sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def cached_events(cached, started):
+    """A cached /translate result replayed as one section of the event stream"""
+    yield sse("references", {"references": cached["references"], "pages": cached["pages"], "sections": 1})
+    yield sse("section", {"index": 0, "pages": f"pages 1-{cached['pages']}"})
+    yield sse("token", {"index": 0, "text": cached["translated_document"]})
+    yield sse("section_end", {"index": 0, "latency_s": 0})
+    yield sse("done", {"pages": cached["pages"], "sections": 1, "cache": "hit",
+                       "timings": {"total_s": round(time.perf_counter() - started, 3)}})
 
+
+@translate_bp.route("/translate/stream", methods=["POST"])
+def translate_document_stream():
+    """
+    Server-sent events variant of /translate. Emits `references`, then for
+    each section in document order `section` (start), `token` events as
+    Groq streams the text and `section_end`, and finally `done` with
+    timings (or `error`). Sections are generated concurrently; later ones
+    are buffered until their turn. There is no merge step, so each section
+    is shown as explained. Cached /translate results are replayed, but a
+    streamed result is not cached: without the merge it is not the answer
+    /translate would give.
+    """
+    if 'file' not in request.files:
+        return jsonify({"error": "No PDF file provided."}), 400
+
+    pdf_file       = request.files['file']
+    target_language = request.form.get("target_language")
+    if not target_language:
+        return jsonify({"error": "No target language specified."}), 400
+
+    spool_path = None
+    try:
+        started = time.perf_counter()
+        spool_path, doc_hash, _ = pdf_text.spool_upload(pdf_file)
+        cached = translate_cache.get(doc_hash, target_language, MODEL_ID)
+        if cached is not None:
+            return Response(cached_events(cached, started), mimetype="text/event-stream",
+                            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+        page_count, chunks = load_chunks(spool_path)
+        extract_s = round(time.perf_counter() - started, 3)
+    except pdf_text.UploadTooLarge as e:
+        return jsonify({"error": str(e)}), 413
+    except pdf_text.UnreadablePDF as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
+    finally:
+        pdf_text.remove_spool(spool_path)
+    if not chunks:
+        return jsonify({"error": "PDF appears empty or unreadable."}), 400
+
+    cancelled = threading.Event()
+    outputs = [queue.Queue() for _ in chunks]  # per section: ("token", text) ... ("end", latency) | ("error", msg)
+
+    def run(index):
+        chunk_started = time.perf_counter()
+        try:
+            messages = chunk_messages(chunks[index], target_language, page_count, len(chunks))
+            max_tokens = CHUNK_MAX_TOKENS if len(chunks) > 1 else None
+            for delta in stream_groq(messages, max_tokens=max_tokens, cancelled=cancelled):
+                outputs[index].put(("token", delta))
+            outputs[index].put(("end", round(time.perf_counter() - chunk_started, 3)))
+        except Exception as e:
+            outputs[index].put(("error", str(e)))
+
+    def generate_events():
+        futures = []
+        first_token_s = None
+        try:
+            # Sections start in order, REQUEST_PARALLEL at a time
+            futures = submit_windowed(run, range(len(chunks)))
+
+            refs = retrieve_references(chunks[0]["text"][:500])
+            yield sse("references", {"references": refs, "pages": page_count, "sections": len(chunks)})
+
+            section_timings = []
+            for index, chunk in enumerate(chunks):
+                yield sse("section", {"index": index, "pages": page_label(chunk)})
+                while True:
+                    kind, value = outputs[index].get()
+                    if kind == "token":
+                        if first_token_s is None:
+                            first_token_s = round(time.perf_counter() - started, 3)
+                        yield sse("token", {"index": index, "text": value})
+                    elif kind == "end":
+                        section_timings.append({"pages": page_label(chunk), "latency_s": value})
+                        yield sse("section_end", {"index": index, "latency_s": value})
+                        break
+                    else:
+                        yield sse("error", {"index": index, "error": value})
+                        return
+
+            yield sse("done", {
+                "pages": page_count,
+                "sections": len(chunks),
+                "timings": {
+                    "extract_s": extract_s,
+                    "first_token_s": first_token_s,
+                    "total_s": round(time.perf_counter() - started, 3),
+                    "sections": section_timings
+                }
+            })
+        except Exception as e:
+            yield sse("error", {"error": str(e)})
+        finally:
+            # Client gone or finished: stop sections still generating or queued
+            cancelled.set()
+            for future in futures:
+                future.cancel()
+
+    return Response(
+        stream_with_context(generate_events()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@translate_bp.route("/translate/cache/stats", methods=["GET"])
+def translate_cache_stats():
+    """Hit rate, entries and bytes stored in the translation cache"""
+    return jsonify(translate_cache.stats()), 200
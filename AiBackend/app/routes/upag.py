@@ -1,8 +1,16 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify, stream_with_context
+import base64
+import json
 import os
-import requests
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 
+from app import upag_mirror
+from app.http_client import get_session
+
 load_dotenv()
 
 upag_bp = Blueprint('upag_bp', __name__)
@@ -12,8 +20,129 @@ UPAG_BASE_URL = "https://data.upag.gov.in/v1/upag/api-data-share"
 UPAG_USERNAME = os.getenv("UPAG_USERNAME")
 UPAG_PASSWORD = os.getenv("UPAG_PASSWORD")
 
-# Token cache (in production, use Redis or similar)
-_token_cache = {"access_token": None}
+# Tokens are refreshed this many seconds before they expire; used as the
+# lifetime when the login response gives neither expires_in nor a JWT exp
+TOKEN_REFRESH_MARGIN = int(os.getenv("UPAG_TOKEN_REFRESH_MARGIN", "120"))
+TOKEN_DEFAULT_TTL = int(os.getenv("UPAG_TOKEN_TTL", "1800"))
+# After a failed login, no new login is attempted for this many seconds
+TOKEN_LOGIN_RETRY = int(os.getenv("UPAG_LOGIN_RETRY", "30"))
+
+# /upag/export walks every page of a source; at most EXPORT_CONCURRENCY pages
+# per export are in flight, so memory stays at a few pages whatever the size
+EXPORT_PAGE_SIZE = int(os.getenv("UPAG_EXPORT_PAGE_SIZE", "1000"))
+EXPORT_CONCURRENCY = int(os.getenv("UPAG_EXPORT_CONCURRENCY", "4"))
+MAX_EXPORT_CONCURRENCY = 8
+_export_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("UPAG_EXPORT_THREADS", "16")),
+    thread_name_prefix="upag-export"
+)
+
+
+class TokenManager:
+    """
+    UPAg access token shared by all request threads.
+
+    Only one login runs at a time: callers that find no valid token wait for
+    it instead of logging in themselves. A token inside the refresh margin is
+    still handed out while one background login replaces it, so requests
+    don't stall on expiry. After a failed login, callers get the current
+    token (or None) without a new login for TOKEN_LOGIN_RETRY seconds.
+    """
+
+    def __init__(self, login):
+        self._login = login
+        self._lock = threading.Lock()
+        self._login_lock = threading.Lock()
+        self.token = None
+        self.expires_at = 0.0
+        self.refresh_at = 0.0
+        self._refreshing = False
+        self.failed_at = 0.0
+        self.logins = 0
+        self.login_errors = 0
+
+    def get(self):
+        """A valid access token, or None if login failed"""
+        with self._lock:
+            token, now = self.token, time.time()
+            if token and now < self.refresh_at:
+                return token
+            if token and now < self.expires_at:
+                if not self._refreshing and not self._backing_off(now):
+                    self._refreshing = True
+                    threading.Thread(target=self._background_refresh, daemon=True).start()
+                return token
+        return self.refresh(stale=token)
+
+    def refresh(self, stale=None):
+        """
+        Log in unless another thread already replaced `stale` while we
+        waited for the login lock, or a login failed less than
+        TOKEN_LOGIN_RETRY seconds ago. Returns the current token or None.
+        """
+        with self._login_lock:
+            with self._lock:
+                now = time.time()
+                if self.token and self.token != stale and self.expires_at > now:
+                    return self.token
+                if self._backing_off(now):
+                    return self.token if self.expires_at > now else None
+            try:
+                token, expires_in = self._login()
+            except Exception as e:
+                print(f"UPAg login error: {str(e)}")
+                token = None
+            with self._lock:
+                self.logins += 1
+                now = time.time()
+                if not token:
+                    self.login_errors += 1
+                    self.failed_at = now
+                    return None
+                self.failed_at = 0.0
+                # Refresh ahead of expiry, but not before half the lifetime
+                self.token = token
+                self.expires_at = now + expires_in
+                self.refresh_at = now + max(expires_in - TOKEN_REFRESH_MARGIN, expires_in / 2)
+                return token
+
+    def _backing_off(self, now):
+        return self.failed_at and now < self.failed_at + TOKEN_LOGIN_RETRY
+
+    def _background_refresh(self):
+        try:
+            self.refresh(stale=self.token)
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+    def invalidate(self, token):
+        """Drop `token` after the API rejected it (a newer token is kept)"""
+        with self._lock:
+            if self.token == token:
+                self.token = None
+                self.expires_at = self.refresh_at = 0.0
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "authenticated": bool(self.token) and self.expires_at > time.time(),
+                "expires_in_s": max(0, round(self.expires_at - time.time())) if self.token else None,
+                "logins": self.logins,
+                "login_errors": self.login_errors,
+            }
+
+
+def token_lifetime(result):
+    """Seconds until a login response's token expires: expires_in, else the JWT exp claim"""
+    if result.get("expires_in"):
+        return float(result["expires_in"])
+    try:
+        payload = result["access_token"].split(".")[1]
+        claims = json.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))
+        return float(claims["exp"]) - time.time()
+    except (KeyError, IndexError, ValueError, TypeError):
+        return TOKEN_DEFAULT_TTL
 
 
 @upag_bp.after_request
@@ -24,36 +153,115 @@ def after_request(response):
     return response
 
 
+def upag_login_request():
+    """POST the OAuth2 password login; returns (access_token, lifetime_s) or (None, 0)"""
+    response = get_session("upag").post(
+        f"{UPAG_BASE_URL}/login",
+        data={
+            "username": UPAG_USERNAME,
+            "password": UPAG_PASSWORD,
+            "grant_type": "password"
+        },
+        headers={"Content-Type": "application/x-www-form-urlencoded"},
+        timeout=30
+    )
+    
+    if response.status_code != 200:
+        print(f"UPAg login failed: {response.status_code}")
+        return None, 0
+    
+    result = response.json()
+    return result.get("access_token"), token_lifetime(result)
+
+
+tokens = TokenManager(upag_login_request)
+
+
 def get_upag_token():
     """
     Get OAuth2 token from UPAg API
     """
-    if _token_cache["access_token"]:
-        return _token_cache["access_token"]
+    return tokens.get()
+
+
+def upag_request(method, path, headers=None, **kwargs):
+    """
+    Authenticated UPAg call. A 401 drops the token, logs in again and
+    retries once. Returns the response, or None if no token could be obtained.
+    """
+    token = tokens.get()
+    if not token:
+        return None
     
-    try:
-        response = requests.post(
-            f"{UPAG_BASE_URL}/login",
-            data={
-                "username": UPAG_USERNAME,
-                "password": UPAG_PASSWORD,
-                "grant_type": "password"
-            },
-            headers={"Content-Type": "application/x-www-form-urlencoded"},
-            timeout=30
+    def send(token):
+        return get_session("upag").request(
+            method,
+            f"{UPAG_BASE_URL}{path}",
+            headers={**(headers or {}), "Authorization": f"Bearer {token}"},
+            **kwargs
         )
-        
-        if response.status_code == 200:
-            result = response.json()
-            _token_cache["access_token"] = result.get("access_token")
-            return _token_cache["access_token"]
-        else:
-            print(f"UPAg login failed: {response.status_code}")
-            return None
-            
-    except Exception as e:
-        print(f"UPAg login error: {str(e)}")
-        return None
+    
+    response = send(token)
+    if response.status_code == 401:
+        tokens.invalidate(token)
+        token = tokens.refresh(stale=token)
+        if token:
+            response = send(token)
+    return response
+
+
+def build_source_input(source_name, data):
+    """Build the source_input_object for a UPAg source from request fields"""
+    source_input = {
+        "limit": data.get("limit", 100),
+        "offset": data.get("offset", 0),
+        "source_name": source_name,
+        "year": data.get("year", ["2023"])
+    }
+    
+    # Add optional parameters based on source type
+    if source_name in ["dafw_state", "mncfc", "ieg", "nsso", "cwwg", "pmfby_ay", "trs", "state_reported", "farmers_survey"]:
+        source_input["location_granularity"] = data.get("location_granularity", "state")
+    
+    if source_name in ["dafw_state", "dafw_district", "dcs"]:
+        source_input["season"] = data.get("season", ["kharif"])
+    
+    if source_name == "dafw_district":
+        source_input["location_granularity"] = "district"
+    
+    if source_name == "dcs":
+        source_input["location_granularity"] = "village"
+        source_input["district"] = data.get("district", [])
+        source_input["cropkey"] = data.get("cropkey", ["1"])
+    
+    if source_name == "dgcis":
+        source_input["HsCode"] = data.get("hs_code", [])
+        source_input["export_import_type"] = data.get("trade_type", ["import"])
+    
+    if source_name == "ncdex":
+        source_input["date"] = data.get("date", ["2023-11-16"])
+        del source_input["year"]
+    
+    return source_input
+
+
+def fetch_source_page(source_name, source_input, offset, limit, timeout=60):
+    """
+    One page of a UPAg source. Returns (records, totalRecords); raises on
+    authentication or HTTP errors.
+    """
+    response = upag_request(
+        "POST",
+        f"/sources/{source_name}",
+        headers={"Content-Type": "application/json"},
+        json={"source_input_object": {**source_input, "offset": offset, "limit": limit}},
+        timeout=timeout
+    )
+    if response is None:
+        raise RuntimeError("Not authenticated")
+    response.raise_for_status()
+    result = response.json()
+    return result.get("data", []), result.get("totalRecords", 0)
 
 
 @upag_bp.route("/upag/login", methods=["POST"])
@@ -63,7 +271,11 @@ def upag_login():
     """
     token = get_upag_token()
     if token:
-        return jsonify({"success": True, "message": "Authenticated successfully"}), 200
+        return jsonify({
+            "success": True,
+            "message": "Authenticated successfully",
+            "token": tokens.snapshot()
+        }), 200
     else:
         return jsonify({"success": False, "error": "Authentication failed"}), 401
 
@@ -73,26 +285,18 @@ def get_allowed_sources():
     """
     Get list of available data sources
     """
-    token = get_upag_token()
-    if not token:
-        return jsonify({"error": "Not authenticated"}), 401
-    
     try:
-        response = requests.get(
-            f"{UPAG_BASE_URL}/sources/user-allowed-sources",
-            headers={
-                "Authorization": f"Bearer {token}",
-                "Accept": "application/json"
-            },
+        response = upag_request(
+            "GET",
+            "/sources/user-allowed-sources",
+            headers={"Accept": "application/json"},
             timeout=30
         )
         
+        if response is None:
+            return jsonify({"error": "Not authenticated"}), 401
         if response.status_code == 200:
             return jsonify(response.json()), 200
-        elif response.status_code == 401:
-            # Token expired, clear cache and retry
-            _token_cache["access_token"] = None
-            return jsonify({"error": "Token expired, please retry"}), 401
         else:
             return jsonify({"error": f"API returned {response.status_code}"}), response.status_code
             
@@ -116,56 +320,23 @@ def get_source_data(source_name):
     - fci_procurement: FCI procurement data
     - horticulture: Horticulture data
     """
-    token = get_upag_token()
-    if not token:
-        return jsonify({"error": "Not authenticated"}), 401
-    
     try:
         data = request.json
         
-        # Build source input object based on source type
-        source_input = {
-            "limit": data.get("limit", 100),
-            "offset": data.get("offset", 0),
-            "source_name": source_name,
-            "year": data.get("year", ["2023"])
-        }
-        
-        # Add optional parameters based on source type
-        if source_name in ["dafw_state", "mncfc", "ieg", "nsso", "cwwg", "pmfby_ay", "trs", "state_reported", "farmers_survey"]:
-            source_input["location_granularity"] = data.get("location_granularity", "state")
-        
-        if source_name in ["dafw_state", "dafw_district", "dcs"]:
-            source_input["season"] = data.get("season", ["kharif"])
-        
-        if source_name == "dafw_district":
-            source_input["location_granularity"] = "district"
-        
-        if source_name == "dcs":
-            source_input["location_granularity"] = "village"
-            source_input["district"] = data.get("district", [])
-            source_input["cropkey"] = data.get("cropkey", ["1"])
-        
-        if source_name == "dgcis":
-            source_input["HsCode"] = data.get("hs_code", [])
-            source_input["export_import_type"] = data.get("trade_type", ["import"])
-        
-        if source_name == "ncdex":
-            source_input["date"] = data.get("date", ["2023-11-16"])
-            del source_input["year"]
+        source_input = build_source_input(source_name, data)
         
         payload = {"source_input_object": source_input}
         
-        response = requests.post(
-            f"{UPAG_BASE_URL}/sources/{source_name}",
-            headers={
-                "Authorization": f"Bearer {token}",
-                "Content-Type": "application/json"
-            },
+        response = upag_request(
+            "POST",
+            f"/sources/{source_name}",
+            headers={"Content-Type": "application/json"},
             json=payload,
             timeout=60
         )
         
+        if response is None:
+            return jsonify({"error": "Not authenticated"}), 401
         if response.status_code == 200:
             result = response.json()
             return jsonify({
@@ -174,9 +345,6 @@ def get_source_data(source_name):
                 "totalRecords": result.get("totalRecords", 0),
                 "data": result.get("data", [])
             }), 200
-        elif response.status_code == 401:
-            _token_cache["access_token"] = None
-            return jsonify({"error": "Token expired, please retry"}), 401
         else:
             return jsonify({
                 "success": False,
@@ -188,6 +356,180 @@ def get_source_data(source_name):
         return jsonify({"error": str(e)}), 500
 
 
+def encode_cursor(source_name, offset):
+    """Opaque resume token for an export position"""
+    raw = json.dumps({"source": source_name, "offset": offset}).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor, source_name):
+    """Offset encoded in a cursor; raises ValueError if it is malformed or for another source"""
+    try:
+        state = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        offset = int(state["offset"])
+    except (ValueError, KeyError, TypeError) as e:
+        raise ValueError(f"Invalid cursor: {e}")
+    if state.get("source") != source_name or offset < 0:
+        raise ValueError("Cursor does not belong to this source")
+    return offset
+
+
+def export_pages(source_name, source_input, start, page_size, concurrency, max_records=None):
+    """
+    Yield (offset, records, total) for consecutive pages from `start`, in
+    order, keeping up to `concurrency` page requests in flight. Stops at
+    totalRecords, on an empty page, or once max_records have been yielded;
+    a short page only ends the export when upstream reports no total. A
+    short page before the total means upstream caps its page size below
+    ours, so the remaining pages are re-planned at that size.
+    """
+    end = start + max_records if max_records else None
+    total = None
+    next_offset = start
+    pending = deque()  # (offset, limit, future) in page order
+    
+    def launch(slots):
+        nonlocal next_offset
+        while len(pending) < slots:
+            bounds = [x for x in (total, end) if x is not None]
+            if bounds and next_offset >= min(bounds):
+                return
+            limit = page_size if end is None else min(page_size, end - next_offset)
+            pending.append((next_offset, limit, _export_executor.submit(
+                fetch_source_page, source_name, source_input, next_offset, limit)))
+            next_offset += limit
+    
+    try:
+        launch(1)  # the first page tells us totalRecords before fanning out
+        while pending:
+            offset, limit, future = pending.popleft()
+            records, reported = future.result()
+            if reported:
+                total = reported
+            yield offset, records, total
+            if not records:
+                return
+            if len(records) < limit:
+                if not total or offset + len(records) >= total:
+                    return  # short page: end of the source
+                # Pages already in flight were sized for our limit and would skip records
+                for _, _, stale in pending:
+                    stale.cancel()
+                pending.clear()
+                page_size = len(records)
+                next_offset = offset + len(records)
+            launch(concurrency)
+    finally:
+        for _, _, future in pending:
+            future.cancel()
+
+
+@upag_bp.route("/upag/export/<source_name>", methods=["POST"])
+def export_source_data(source_name):
+    """
+    Stream every record of a UPAg source as NDJSON.
+    
+    Takes the same filters as /upag/data/<source_name> plus optional
+    page_size, concurrency, max_records and cursor. Records are written one
+    per line as pages arrive; after each page a {"checkpoint": {...}} line
+    carries a cursor that resumes the export after that page. The stream
+    ends with {"done": true, ...}, or {"error": ..., "cursor": ...} if an
+    upstream page failed.
+    """
+    data = request.json or {}
+    
+    try:
+        page_size = max(1, min(int(data.get("page_size", EXPORT_PAGE_SIZE)), EXPORT_PAGE_SIZE))
+        concurrency = max(1, min(int(data.get("concurrency", EXPORT_CONCURRENCY)), MAX_EXPORT_CONCURRENCY))
+        max_records = int(data["max_records"]) if data.get("max_records") else None
+        start = decode_cursor(data["cursor"], source_name) if data.get("cursor") else int(data.get("offset", 0))
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": str(e)}), 400
+    
+    if not get_upag_token():
+        return jsonify({"error": "Not authenticated"}), 401
+    
+    source_input = build_source_input(source_name, data)
+    
+    def generate_lines():
+        started = time.perf_counter()
+        exported = pages = 0
+        position = start
+        total = None
+        try:
+            for offset, records, total in export_pages(
+                    source_name, source_input, start, page_size, concurrency, max_records):
+                for record in records:
+                    yield json.dumps(record) + "\n"
+                exported += len(records)
+                pages += 1
+                position = offset + len(records)
+                yield json.dumps({"checkpoint": {
+                    "cursor": encode_cursor(source_name, position),
+                    "offset": position,
+                    "total": total,
+                    "records": exported
+                }}) + "\n"
+        except Exception as e:
+            print(f"UPAg export {source_name} failed at offset {position}: {e}")
+            yield json.dumps({"error": str(e), "cursor": encode_cursor(source_name, position),
+                              "offset": position, "records": exported}) + "\n"
+            return
+        yield json.dumps({
+            "done": True,
+            "source": source_name,
+            "records": exported,
+            "pages": pages,
+            "total": total,
+            "cursor": encode_cursor(source_name, position),
+            "elapsed_s": round(time.perf_counter() - started, 3)
+        }) + "\n"
+    
+    return Response(stream_with_context(generate_lines()), mimetype="application/x-ndjson")
+
+
+@upag_bp.route("/upag/mirror/query", methods=["POST"])
+def query_mirror():
+    """
+    Query the local UPAg mirror (filled by sync_upag_mirror.py) instead of
+    the live API.
+    
+    Body:
+    - filters: {source, year, season, state, district, crop}, each a value or list
+    - group_by: list of those columns (optional)
+    - aggregates: {"<record field>": "sum|avg|min|max|count"} (needs group_by)
+    - limit: max rows (default 1000)
+    """
+    data = request.json or {}
+    started = time.perf_counter()
+    
+    try:
+        rows = upag_mirror.query(
+            filters=data.get("filters"),
+            group_by=data.get("group_by"),
+            aggregates=data.get("aggregates"),
+            limit=data.get("limit", 1000)
+        )
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    
+    return jsonify({
+        "success": True,
+        "source": "mirror",
+        "count": len(rows),
+        "rows": rows,
+        "query_ms": round((time.perf_counter() - started) * 1000, 2)
+    }), 200
+
+
+@upag_bp.route("/upag/mirror/status", methods=["GET"])
+def mirror_status():
+    """Records, partitions and last sync time per mirrored source"""
+    return jsonify(upag_mirror.stats()), 200
+
+
 @upag_bp.route("/upag/crop-prices", methods=["POST"])
 def get_crop_prices():
     """
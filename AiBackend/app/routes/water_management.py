@@ -6,32 +6,16 @@ from dotenv import load_dotenv
 from langchain.output_parsers import PydanticOutputParser
 from pydantic import BaseModel, Field
 
+from app import weather
+from app.http_client import get_session
+
 load_dotenv()
 
 water_management_bp = Blueprint("water_management_bp", __name__)
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 
-# Step 1: Weather Forecast API (Reusing Open-Meteo)
-def get_weather_forecast(lat, lon):
-    try:
-        url = (
-            f"https://api.open-meteo.com/v1/forecast"
-            f"?latitude={lat}&longitude={lon}"
-            f"&daily=temperature_2m_max,temperature_2m_min,precipitation_sum,evapotranspiration"
-            f"&forecast_days=7&timezone=auto"
-        )
-        response = requests.get(url)
-        data = response.json()
-        return {
-            "dates": data.get("daily", {}).get("time", []),
-            "temp_max": data.get("daily", {}).get("temperature_2m_max", []),
-            "temp_min": data.get("daily", {}).get("temperature_2m_min", []),
-            "precipitation": data.get("daily", {}).get("precipitation_sum", []),
-            "evapotranspiration": data.get("daily", {}).get("evapotranspiration", []),
-        }
-    except Exception as e:
-        print(f"[ERROR] Weather fetch failed: {e}")
-        return {}
+# Step 1: Weather Forecast (shared, cached open-meteo forecast)
+WEATHER_FIELDS = ["dates", "temp_max", "temp_min", "precipitation", "evapotranspiration"]
 
 # Step 2: Pydantic Models
 class IrrigationEvent(BaseModel):
@@ -71,7 +55,7 @@ def suggest_water_management():
     if not all([lat, lon, crop, field_size_acres]):
         return jsonify({"error": "Missing latitude, longitude, crop, or field_size_acres."}), 400
 
-    weather_info = get_weather_forecast(lat, lon)
+    weather_info = weather.get_daily(lat, lon, WEATHER_FIELDS)
 
     # Prompt to LLM
     system_prompt = (
@@ -118,7 +102,7 @@ def suggest_water_management():
     }
 
     try:
-        response = requests.post(
+        response = get_session("groq").post(
             "https://api.groq.com/openai/v1/chat/completions",
             headers=headers,
             json=payload
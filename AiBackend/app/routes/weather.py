@@ -0,0 +1,68 @@
+from flask import Blueprint, request, jsonify
+
+from app import weather
+
+weather_bp = Blueprint("weather_bp", __name__)
+
+MAX_BATCH_FARMS = 5000
+
+
+@weather_bp.after_request
+def after_request(response):
+    response.headers.add('Access-Control-Allow-Origin', '*')
+    response.headers.add('Access-Control-Allow-Headers', 'Content-Type,Authorization')
+    response.headers.add('Access-Control-Allow-Methods', 'GET,PUT,POST,DELETE,OPTIONS')
+    return response
+
+
+@weather_bp.route("/weather/batch", methods=["POST"])
+def weather_batch():
+    """
+    7-day forecasts for many farms at once (cooperatives, bulk jobs).
+    Farms in the same grid cell share one forecast and uncached cells are
+    fetched ~100 per open-meteo request.
+
+    Body: {"farms": [{"id": "F1", "latitude": 28.6, "longitude": 77.2}, ...],
+           "fields": ["dates", "temp_max", ...], "current": true}
+    """
+    data = request.json or {}
+    farms = data.get("farms", [])
+    fields = data.get("fields")
+    include_current = data.get("current", True)
+
+    if not farms:
+        return jsonify({"error": "farms is required"}), 400
+    if len(farms) > MAX_BATCH_FARMS:
+        return jsonify({"error": f"At most {MAX_BATCH_FARMS} farms per request"}), 400
+    unknown = [f for f in (fields or []) if f not in weather.DAILY_FIELDS]
+    if unknown:
+        return jsonify({"error": f"Unknown fields: {unknown}", "available": list(weather.DAILY_FIELDS)}), 400
+
+    points = []
+    for i, farm in enumerate(farms):
+        try:
+            points.append((float(farm["latitude"]), float(farm["longitude"])))
+        except (KeyError, TypeError, ValueError):
+            return jsonify({"error": f"farms[{i}] needs numeric latitude and longitude"}), 400
+
+    forecasts, stats = weather.get_forecasts(points)
+
+    results = []
+    for i, (farm, forecast) in enumerate(zip(farms, forecasts)):
+        entry = {
+            "id": farm.get("id", i),
+            "cell": {"latitude": forecast.get("latitude"), "longitude": forecast.get("longitude")}
+        }
+        if "error" in forecast:
+            entry["error"] = forecast["error"]
+        else:
+            entry["daily"] = weather.daily_fields(forecast, fields)
+            if include_current:
+                entry["current"] = weather.current_conditions(forecast)
+        results.append(entry)
+
+    return jsonify({
+        "success": all("error" not in r for r in results),
+        "results": results,
+        "stats": stats
+    }), 200
@@ -0,0 +1,191 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from app import soil_store
+from app.http_client import get_session
+
+# ==== CONFIGURATION ====
+# Soil properties at a location do not change, so one openepi lookup per soil
+# grid cell is kept on disk and shared by every worker. SOIL_GRID_DEG of 0.05°
+# (~5.5 km) groups neighbouring farms, which share a soil class at the scale
+# fertilizer advice is given.
+SOIL_URL = "https://api.openepi.io/soil/property"
+SOIL_GRID_DEG = float(os.getenv("SOIL_GRID_DEG", "0.05"))
+SOIL_CACHE_PATH = os.getenv("SOIL_CACHE_PATH", "./app/cache/soil.sqlite3")
+
+# Property -> (depth label in the request, key in the response, our name)
+SOIL_PROPERTIES = {
+    "phh2o":    ("0-5cm",  "depth_0_5",  "soil_ph"),
+    "nitrogen": ("0-5cm",  "depth_0_5",  "soil_nitrogen"),
+    "soc":      ("0-5cm",  "depth_0_5",  "soil_organic_carbon"),
+    "clay":     ("0-5cm",  "depth_0_5",  "soil_clay"),
+    "ocs":      ("0-30cm", "depth_0_30", "soil_organic_carbon_stock"),  # only published for 0-30 cm
+}
+
+DEFAULTS = {
+    "soil_ph": 6.5,
+    "soil_organic_carbon": 1.2,
+    "soil_nitrogen": 0.1,
+    "soil_clay": 20.0,
+    "soil_organic_carbon_stock": 50.0
+}
+
+_local = threading.local()
+_stats_lock = threading.Lock()
+_stats = {"store_hits": 0, "store_partial": 0, "hits": 0, "misses": 0, "upstream_calls": 0, "upstream_errors": 0}
+
+
+def _count(key):
+    with _stats_lock:
+        _stats[key] += 1
+
+
+def snap(lat, lon, grid=SOIL_GRID_DEG):
+    """Snap coordinates to the centre of their soil grid cell"""
+    return (round(round(float(lat) / grid) * grid, 4),
+            round(round(float(lon) / grid) * grid, 4))
+
+
+def _db():
+    """Per-thread SQLite connection to the on-disk soil cache"""
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        os.makedirs(os.path.dirname(SOIL_CACHE_PATH) or ".", exist_ok=True)
+        conn = sqlite3.connect(SOIL_CACHE_PATH, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")  # readers in other workers don't block writers
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS soil_cells (
+                lat REAL NOT NULL,
+                lon REAL NOT NULL,
+                grid_deg REAL NOT NULL,
+                data TEXT NOT NULL,
+                fetched_at REAL NOT NULL,
+                PRIMARY KEY (lat, lon, grid_deg)
+            )
+        """)
+        conn.commit()
+        _local.conn = conn
+    return conn
+
+
+def _cached(cell):
+    row = _db().execute(
+        "SELECT data FROM soil_cells WHERE lat = ? AND lon = ? AND grid_deg = ?",
+        (*cell, SOIL_GRID_DEG)
+    ).fetchone()
+    return json.loads(row[0]) if row else None
+
+
+def _store(cell, soil):
+    conn = _db()
+    conn.execute(
+        "INSERT OR REPLACE INTO soil_cells (lat, lon, grid_deg, data, fetched_at) VALUES (?, ?, ?, ?, ?)",
+        (*cell, SOIL_GRID_DEG, json.dumps(soil), time.time())
+    )
+    conn.commit()
+
+
+def fetch_soil(lat, lon):
+    """
+    All soil properties for a point in one openepi request (0-5 cm for pH,
+    N, SOC and clay; 0-30 cm for organic carbon stock). Properties openepi
+    has no value for are None. Raises on upstream errors.
+    """
+    params = [("lat", lat), ("lon", lon), ("values", "mean")]
+    params += [("properties", prop) for prop in SOIL_PROPERTIES]
+    params += [("depths", depth) for depth in sorted({d for d, _, _ in SOIL_PROPERTIES.values()})]
+
+    _count("upstream_calls")
+    try:
+        response = get_session("openepi").get(SOIL_URL, params=params)
+        response.raise_for_status()
+        properties = response.json().get("properties", [])
+    except Exception:
+        _count("upstream_errors")
+        raise
+
+    soil = {name: None for _, _, name in SOIL_PROPERTIES.values()}
+    for prop in properties:
+        spec = SOIL_PROPERTIES.get(prop.get("property"))
+        if spec:
+            _, depth_key, name = spec
+            soil[name] = (prop.get(depth_key) or {}).get("mean")
+    return soil
+
+
+def is_cached(lat, lon):
+    """Whether the cell containing (lat, lon) is already on disk"""
+    return _cached(snap(lat, lon)) is not None
+
+
+def _cell_soil(lat, lon):
+    """Soil properties for the cell containing (lat, lon): on-disk cache, else openepi"""
+    cell = snap(lat, lon)
+    soil = _cached(cell)
+    if soil is not None:
+        _count("hits")
+        return soil
+
+    _count("misses")
+    soil = fetch_soil(*cell)
+    _store(cell, soil)
+    return soil
+
+
+def lookup(lat, lon):
+    """
+    Soil properties at (lat, lon): from the local soil store when the point
+    is inside its extent, otherwise from the on-disk cache for its cell,
+    fetching and storing them on a miss. Layers the store has no value for
+    (not imported, or nodata at this point) come from the cache / openepi.
+    Values may be None.
+    """
+    store = soil_store.get_store()
+    if store is not None:
+        soil = store.lookup(float(lat), float(lon))
+        if soil is not None:
+            missing = [key for key in DEFAULTS if soil.get(key) is None]
+            if not missing:
+                _count("store_hits")
+                return soil
+            _count("store_partial")
+            try:
+                cell_soil = _cell_soil(lat, lon)
+            except Exception as e:
+                print(f"[WARN] Soil fetch for layers missing from the store failed: {e}")
+                return soil
+            return {**soil, **{key: cell_soil.get(key) for key in missing}}
+
+    return _cell_soil(lat, lon)
+
+
+def get_soil(lat, lon):
+    """Soil properties with defaults filled in; never raises"""
+    try:
+        soil = lookup(lat, lon)
+    except Exception as e:
+        print(f"[ERROR] Soil data fetch failed: {e}")
+        return dict(DEFAULTS)
+    return {key: DEFAULTS[key] if soil.get(key) is None else soil[key] for key in DEFAULTS}
+
+
+def stats():
+    """Local store and cache hits, misses and openepi calls in this process, plus cells on disk"""
+    with _stats_lock:
+        counters = dict(_stats)
+    lookups = counters["store_hits"] + counters["hits"] + counters["misses"]
+    try:
+        cells = _db().execute("SELECT COUNT(*) FROM soil_cells WHERE grid_deg = ?", (SOIL_GRID_DEG,)).fetchone()[0]
+    except sqlite3.Error:
+        cells = None
+    return {
+        "grid_deg": SOIL_GRID_DEG,
+        "path": SOIL_CACHE_PATH,
+        "cells_on_disk": cells,
+        "hit_ratio": round((counters["store_hits"] + counters["hits"]) / lookups, 3) if lookups else None,
+        **counters,
+        "store": soil_store.stats()
+    }
@@ -0,0 +1,104 @@
+import json
+import os
+import threading
+
+import numpy as np
+
+# ==== LOCAL SOIL STORE ====
+# SoilGrids-style rasters imported by import_soil_rasters.py into one
+# memory-mapped int16 array of shape (layers, rows, cols) on a regular
+# lat/lon grid. A point lookup is an array index; pages are read from disk
+# on demand and shared by every worker through the OS page cache.
+#
+#   <SOIL_STORE_DIR>/meta.json   extent, resolution, layer names, nodata
+#   <SOIL_STORE_DIR>/soil.npy    the array
+
+SOIL_STORE_DIR = os.getenv("SOIL_STORE_DIR", "./app/cache/soil_store")
+NODATA = -32768
+
+_lock = threading.Lock()
+_store = None
+_loaded = False
+
+
+class SoilStore:
+    def __init__(self, directory):
+        with open(os.path.join(directory, "meta.json")) as f:
+            self.meta = json.load(f)
+        self.data = np.load(os.path.join(directory, "soil.npy"), mmap_mode="r")
+        self.layers = self.meta["layers"]
+        self.west = self.meta["west"]
+        self.north = self.meta["north"]
+        self.res = self.meta["res_deg"]
+        _, self.rows, self.cols = self.data.shape
+
+    def _index(self, lats, lons):
+        rows = np.floor((self.north - lats) / self.res).astype(np.int64)
+        cols = np.floor((lons - self.west) / self.res).astype(np.int64)
+        inside = (rows >= 0) & (rows < self.rows) & (cols >= 0) & (cols < self.cols)
+        return rows, cols, inside
+
+    def lookup(self, lat, lon):
+        """Soil properties at a point, or None outside the extent or where every layer is nodata"""
+        row = int(np.floor((self.north - lat) / self.res))
+        col = int(np.floor((lon - self.west) / self.res))
+        if not (0 <= row < self.rows and 0 <= col < self.cols):
+            return None
+        values = self.data[:, row, col]
+        if (values == NODATA).all():
+            return None
+        return {name: None if value == NODATA else int(value) for name, value in zip(self.layers, values)}
+
+    def lookup_many(self, lats, lons):
+        """
+        Vectorized lookup for arrays of coordinates.
+        Returns ({layer: float array with NaN for nodata}, found mask).
+        """
+        lats = np.asarray(lats, dtype=np.float64)
+        lons = np.asarray(lons, dtype=np.float64)
+        rows, cols, inside = self._index(lats, lons)
+
+        values = np.full((len(self.layers), lats.size), NODATA, dtype=np.int16)
+        values[:, inside] = self.data[:, rows[inside], cols[inside]]
+        missing = values == NODATA
+        found = ~missing.all(axis=0)
+
+        out = values.astype(np.float64)
+        out[missing] = np.nan
+        return {name: out[i] for i, name in enumerate(self.layers)}, found
+
+    def stats(self):
+        return {
+            "dir": SOIL_STORE_DIR,
+            "layers": self.layers,
+            "extent": {"west": self.west, "north": self.north,
+                       "east": round(self.west + self.cols * self.res, 6),
+                       "south": round(self.north - self.rows * self.res, 6)},
+            "res_deg": self.res,
+            "shape": list(self.data.shape),
+            "size_mb": round(self.data.nbytes / (1024 * 1024), 1),
+            "source": self.meta.get("source"),
+        }
+
+
+def get_store():
+    """The local soil store, or None if none has been imported"""
+    global _store, _loaded
+    if not _loaded:
+        with _lock:
+            if not _loaded:
+                try:
+                    _store = SoilStore(SOIL_STORE_DIR)
+                    print(f"Soil store loaded: {_store.stats()['shape']} at {_store.res}°")
+                except FileNotFoundError:
+                    _store = None
+                except Exception as e:
+                    print(f"⚠️ Warning: Could not open soil store at {SOIL_STORE_DIR}: {e}")
+                    _store = None
+                _loaded = True
+    return _store
+
+
+def stats():
+    store = get_store()
+    return store.stats() if store else {"dir": SOIL_STORE_DIR, "loaded": False}
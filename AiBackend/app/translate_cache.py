@@ -0,0 +1,153 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# ==== TRANSLATION CACHE ====
+# Finished /translate results keyed by (SHA-256 of the PDF bytes, target
+# language, model), so a circular uploaded again is answered without text
+# extraction or a Groq call. Stored in SQLite shared by every worker; the
+# least recently used entries are evicted once the stored results exceed
+# TRANSLATE_CACHE_MAX_MB.
+
+TRANSLATE_CACHE_PATH = os.getenv("TRANSLATE_CACHE_PATH", "./app/cache/translate.sqlite3")
+TRANSLATE_CACHE_MAX_BYTES = int(float(os.getenv("TRANSLATE_CACHE_MAX_MB", "200")) * 1024 * 1024)
+READ_BLOCK = 1024 * 1024
+
+_local = threading.local()
+_stats_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+
+
+def _count(key, n=1):
+    with _stats_lock:
+        _stats[key] += n
+
+
+def _db():
+    """Per-thread SQLite connection to the translation cache"""
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        os.makedirs(os.path.dirname(TRANSLATE_CACHE_PATH) or ".", exist_ok=True)
+        conn = sqlite3.connect(TRANSLATE_CACHE_PATH, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS translations (
+                doc_hash TEXT NOT NULL,
+                language TEXT NOT NULL,
+                model TEXT NOT NULL,
+                result TEXT NOT NULL,
+                bytes INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_used REAL NOT NULL,
+                hits INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (doc_hash, language, model)
+            );
+            CREATE INDEX IF NOT EXISTS idx_translations_lru ON translations (last_used);
+        """)
+        conn.commit()
+        _local.conn = conn
+    return conn
+
+
+def hash_stream(stream, sink=None):
+    """
+    SHA-256 of a file-like object, read in blocks. Each block is also
+    passed to sink() if given. Returns (hex digest, bytes read).
+    """
+    digest = hashlib.sha256()
+    size = 0
+    while True:
+        block = stream.read(READ_BLOCK)
+        if not block:
+            break
+        digest.update(block)
+        size += len(block)
+        if sink is not None:
+            sink(block)
+    return digest.hexdigest(), size
+
+
+def _language(language):
+    return language.strip().lower()
+
+
+def get(doc_hash, language, model):
+    """Cached result dict or None; a hit marks the entry as recently used"""
+    key = (doc_hash, _language(language), model)
+    try:
+        conn = _db()
+        row = conn.execute(
+            "SELECT result FROM translations WHERE doc_hash = ? AND language = ? AND model = ?", key
+        ).fetchone()
+        if row is None:
+            _count("misses")
+            return None
+        with conn:
+            conn.execute(
+                "UPDATE translations SET last_used = ?, hits = hits + 1 "
+                "WHERE doc_hash = ? AND language = ? AND model = ?",
+                (time.time(), *key)
+            )
+    except sqlite3.Error as e:
+        print(f"[WARN] Translation cache read failed: {e}")
+        _count("misses")
+        return None
+    _count("hits")
+    return json.loads(row[0])
+
+
+def put(doc_hash, language, model, result):
+    """Store a result, then evict least recently used entries beyond the size limit"""
+    data = json.dumps(result, ensure_ascii=False)
+    size = len(data.encode("utf-8"))
+    if size > TRANSLATE_CACHE_MAX_BYTES:
+        return
+    now = time.time()
+    try:
+        conn = _db()
+        with conn:
+            conn.execute("""
+                INSERT OR REPLACE INTO translations
+                    (doc_hash, language, model, result, bytes, created_at, last_used, hits)
+                VALUES (?, ?, ?, ?, ?, ?, ?, 0)
+            """, (doc_hash, _language(language), model, data, size, now, now))
+            total = conn.execute("SELECT COALESCE(SUM(bytes), 0) FROM translations").fetchone()[0]
+            evicted = 0
+            if total > TRANSLATE_CACHE_MAX_BYTES:
+                for rowid, entry_bytes in conn.execute(
+                        "SELECT rowid, bytes FROM translations ORDER BY last_used").fetchall():
+                    if total <= TRANSLATE_CACHE_MAX_BYTES:
+                        break
+                    conn.execute("DELETE FROM translations WHERE rowid = ?", (rowid,))
+                    total -= entry_bytes
+                    evicted += 1
+    except sqlite3.Error as e:
+        print(f"[WARN] Translation cache write failed: {e}")
+        return
+    _count("stores")
+    if evicted:
+        _count("evictions", evicted)
+
+
+def stats():
+    """Hit rate in this process, plus entries and bytes stored"""
+    with _stats_lock:
+        counters = dict(_stats)
+    lookups = counters["hits"] + counters["misses"]
+    try:
+        entries, stored = _db().execute(
+            "SELECT COUNT(*), COALESCE(SUM(bytes), 0) FROM translations"
+        ).fetchone()
+    except sqlite3.Error:
+        entries = stored = None
+    return {
+        "path": TRANSLATE_CACHE_PATH,
+        "entries": entries,
+        "bytes_stored": stored,
+        "max_bytes": TRANSLATE_CACHE_MAX_BYTES,
+        "hit_ratio": round(counters["hits"] / lookups, 3) if lookups else None,
+        **counters
+    }
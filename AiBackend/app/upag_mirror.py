@@ -0,0 +1,223 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+
+# ==== UPAG MIRROR ====
+# Local copy of selected UPAg sources, filled by sync_upag_mirror.py, so
+# statistics queries are answered from indexed SQLite instead of one slow,
+# rate-limited upstream call each. Records are kept whole as JSON; the
+# columns used for filtering and grouping are pulled out and indexed.
+
+UPAG_MIRROR_PATH = os.getenv("UPAG_MIRROR_PATH", "./app/cache/upag_mirror.sqlite3")
+MIRROR_SOURCES = ["dafw_state", "dafw_district", "agmarknet", "fci_procurement"]
+
+# Indexed column -> record keys it is read from (UPAg sources name them differently)
+COLUMN_KEYS = {
+    "state": ["state_name", "state", "State", "stateName"],
+    "district": ["district_name", "district", "District", "districtName"],
+    "crop": ["crop_name", "crop", "commodity", "commodity_name", "Crop", "Commodity"],
+}
+FILTER_COLUMNS = ["source", "year", "season", "state", "district", "crop"]
+AGGREGATES = {"sum": "SUM", "avg": "AVG", "min": "MIN", "max": "MAX", "count": "COUNT"}
+MAX_QUERY_ROWS = 10000
+
+_FIELD_RE = re.compile(r"^[A-Za-z0-9_ ()./%-]{1,64}$")
+_local = threading.local()
+
+
+def _db():
+    """Per-thread SQLite connection to the mirror"""
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        os.makedirs(os.path.dirname(UPAG_MIRROR_PATH) or ".", exist_ok=True)
+        conn = sqlite3.connect(UPAG_MIRROR_PATH, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS upag_records (
+                source TEXT NOT NULL,
+                year TEXT NOT NULL,
+                season TEXT NOT NULL DEFAULT '',
+                state TEXT COLLATE NOCASE,
+                district TEXT COLLATE NOCASE,
+                crop TEXT COLLATE NOCASE,
+                record_hash TEXT NOT NULL,
+                data TEXT NOT NULL,
+                synced_at REAL NOT NULL,
+                PRIMARY KEY (source, record_hash)
+            );
+            CREATE INDEX IF NOT EXISTS idx_upag_partition ON upag_records (source, year, season);
+            CREATE INDEX IF NOT EXISTS idx_upag_state ON upag_records (source, state, district);
+            CREATE INDEX IF NOT EXISTS idx_upag_crop ON upag_records (source, crop, year);
+
+            CREATE TABLE IF NOT EXISTS upag_partitions (
+                source TEXT NOT NULL,
+                year TEXT NOT NULL,
+                season TEXT NOT NULL DEFAULT '',
+                upstream_total INTEGER,
+                fetched INTEGER NOT NULL,
+                synced_at REAL NOT NULL,
+                PRIMARY KEY (source, year, season)
+            );
+        """)
+        conn.commit()
+        _local.conn = conn
+    return conn
+
+
+def _column(record, column):
+    for key in COLUMN_KEYS[column]:
+        value = record.get(key)
+        if value not in (None, ""):
+            return str(value).strip()
+    return None
+
+
+def get_partition(source, year, season=""):
+    """Sync state of one (source, year, season): {"upstream_total", "fetched", "synced_at"} or None"""
+    row = _db().execute(
+        "SELECT upstream_total, fetched, synced_at FROM upag_partitions WHERE source = ? AND year = ? AND season = ?",
+        (source, year, season)
+    ).fetchone()
+    return {"upstream_total": row[0], "fetched": row[1], "synced_at": row[2]} if row else None
+
+
+def clear_partition(source, year, season=""):
+    conn = _db()
+    with conn:
+        conn.execute("DELETE FROM upag_records WHERE source = ? AND year = ? AND season = ?", (source, year, season))
+        conn.execute("DELETE FROM upag_partitions WHERE source = ? AND year = ? AND season = ?", (source, year, season))
+
+
+def store_records(source, year, season, records, fetched, upstream_total):
+    """
+    Upsert one page of records and advance the partition's sync position in
+    the same transaction, so an interrupted sync resumes where it stopped.
+    Identical records are stored once. Returns the number of new records.
+    """
+    now = time.time()
+    rows = []
+    for record in records:
+        data = json.dumps(record, sort_keys=True)
+        rows.append((
+            source, year, season,
+            _column(record, "state"), _column(record, "district"), _column(record, "crop"),
+            hashlib.sha1(f"{year}|{season}|{data}".encode()).hexdigest(), data, now
+        ))
+    conn = _db()
+    with conn:
+        before = conn.total_changes
+        conn.executemany("""
+            INSERT OR IGNORE INTO upag_records
+                (source, year, season, state, district, crop, record_hash, data, synced_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, rows)
+        added = conn.total_changes - before
+        conn.execute("""
+            INSERT OR REPLACE INTO upag_partitions (source, year, season, upstream_total, fetched, synced_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, (source, year, season, upstream_total, fetched, now))
+    return added
+
+
+def _as_list(value):
+    if value is None:
+        return []
+    return [str(v) for v in value] if isinstance(value, (list, tuple)) else [str(value)]
+
+
+def query(filters=None, group_by=None, aggregates=None, limit=1000):
+    """
+    Query the mirror. `filters` maps FILTER_COLUMNS to a value or list of
+    values (state/district/crop match case-insensitively). With `group_by`,
+    returns one row per group with a `count` and each requested aggregate,
+    e.g. {"production": "sum"} over the numeric record field `production`.
+    Without it, returns the matching records. Raises ValueError for
+    unknown columns, fields or aggregates.
+    """
+    filters = filters or {}
+    group_by = group_by or []
+    aggregates = aggregates or {}
+    limit = max(1, min(int(limit), MAX_QUERY_ROWS))
+
+    where, params = [], []
+    for column, value in filters.items():
+        if column not in FILTER_COLUMNS:
+            raise ValueError(f"Unknown filter '{column}'; use {FILTER_COLUMNS}")
+        values = _as_list(value)
+        if not values:
+            continue
+        where.append(f"{column} IN ({', '.join('?' * len(values))})")
+        params += values
+    where_sql = f"WHERE {' AND '.join(where)}" if where else ""
+
+    if not group_by:
+        if aggregates:
+            raise ValueError("aggregates need group_by")
+        rows = _db().execute(
+            f"SELECT data FROM upag_records {where_sql} ORDER BY source, year, season, state, district LIMIT ?",
+            (*params, limit)
+        ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    for column in group_by:
+        if column not in FILTER_COLUMNS:
+            raise ValueError(f"Cannot group by '{column}'; use {FILTER_COLUMNS}")
+
+    select = list(group_by) + ["COUNT(*) AS count"]
+    select_params = []
+    for field, func in aggregates.items():
+        if func not in AGGREGATES or not _FIELD_RE.match(field):
+            raise ValueError(f"Invalid aggregate {field}: {func}; functions are {list(AGGREGATES)}")
+        select.append(f"{AGGREGATES[func]}(CAST(json_extract(data, ?) AS REAL))")
+        select_params.append(f'$."{field}"')
+
+    group_sql = ", ".join(group_by)
+    cursor = _db().execute(
+        f"SELECT {', '.join(select)} FROM upag_records {where_sql} "
+        f"GROUP BY {group_sql} ORDER BY {group_sql} LIMIT ?",
+        (*select_params, *params, limit)
+    )
+    names = list(group_by) + ["count"] + [f"{field}_{func}" for field, func in aggregates.items()]
+    return [dict(zip(names, row)) for row in cursor.fetchall()]
+
+
+def iter_records(source, years=None):
+    """Every mirrored record of a source (optionally only some years), streamed from disk"""
+    years = _as_list(years)
+    sql = "SELECT data FROM upag_records WHERE source = ?"
+    if years:
+        sql += f" AND year IN ({', '.join('?' * len(years))})"
+    for (data,) in _db().execute(sql, (source, *years)):
+        yield json.loads(data)
+
+
+def has_source(source):
+    return _db().execute("SELECT 1 FROM upag_records WHERE source = ? LIMIT 1", (source,)).fetchone() is not None
+
+
+def stats():
+    """Records and partitions per source, with the last sync time"""
+    try:
+        rows = _db().execute("""
+            SELECT p.source, COUNT(*), SUM(p.fetched), MAX(p.synced_at),
+                   (SELECT COUNT(*) FROM upag_records r WHERE r.source = p.source)
+            FROM upag_partitions p GROUP BY p.source
+        """).fetchall()
+    except sqlite3.Error as e:
+        return {"path": UPAG_MIRROR_PATH, "error": str(e)}
+    return {
+        "path": UPAG_MIRROR_PATH,
+        "sources": {
+            source: {
+                "partitions": partitions,
+                "records": records,
+                "fetched": fetched,
+                "last_sync": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(synced_at)),
+            }
+            for source, partitions, fetched, synced_at, records in rows
+        }
+    }
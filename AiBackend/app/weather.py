@@ -0,0 +1,190 @@
+import os
+import time
+
+from app.cache import TTLCache
+from app.http_client import get_session
+
+# ==== CONFIGURATION ====
+# One open-meteo forecast per grid cell serves every route. Coordinates are
+# snapped to WEATHER_GRID_DEG (0.1° ≈ 11 km, finer than the models' own grid),
+# so farmers in the same cell share one cached download.
+FORECAST_URL = "https://api.open-meteo.com/v1/forecast"
+WEATHER_GRID_DEG = float(os.getenv("WEATHER_GRID_DEG", "0.1"))
+FORECAST_DAYS = 7
+
+# Open-meteo refreshes current conditions every 15 minutes and forecasts
+# hourly; entries expire at the next WEATHER_CACHE_TTL boundary so a cached
+# forecast never outlives an upstream update.
+WEATHER_CACHE_TTL = int(os.getenv("WEATHER_CACHE_TTL", "900"))
+
+# Open-meteo takes comma-separated coordinate lists; one request per this many cells
+WEATHER_BATCH_SIZE = int(os.getenv("WEATHER_BATCH_SIZE", "100"))
+
+# Union of the daily variables used by every route
+DAILY_VARIABLES = [
+    "temperature_2m_max",
+    "temperature_2m_min",
+    "precipitation_sum",
+    "wind_speed_10m_max",
+    "relative_humidity_2m_max",
+    "relative_humidity_2m_min",
+    "et0_fao_evapotranspiration",
+]
+CURRENT_VARIABLES = ["temperature_2m", "relative_humidity_2m", "precipitation", "wind_speed_10m"]
+
+# Short names routes use for the daily series
+DAILY_FIELDS = {
+    "dates": "time",
+    "temp_max": "temperature_2m_max",
+    "temp_min": "temperature_2m_min",
+    "humidity_max": "relative_humidity_2m_max",
+    "humidity_min": "relative_humidity_2m_min",
+    "precipitation": "precipitation_sum",
+    "wind_speed_max": "wind_speed_10m_max",
+    "evapotranspiration": "et0_fao_evapotranspiration",
+}
+
+_cache = TTLCache("weather", ttl=WEATHER_CACHE_TTL, maxsize=int(os.getenv("WEATHER_CACHE_SIZE", "4096")))
+
+
+def snap(lat, lon, grid=WEATHER_GRID_DEG):
+    """Snap coordinates to the centre of their weather grid cell"""
+    return (round(round(float(lat) / grid) * grid, 4),
+            round(round(float(lon) / grid) * grid, 4))
+
+
+def _ttl():
+    """Seconds until the next cache boundary (at least a minute)"""
+    return max(WEATHER_CACHE_TTL - int(time.time()) % WEATHER_CACHE_TTL, 60)
+
+
+def _params(cells):
+    return {
+        "latitude": ",".join(str(lat) for lat, _ in cells),
+        "longitude": ",".join(str(lon) for _, lon in cells),
+        "daily": ",".join(DAILY_VARIABLES),
+        "current": ",".join(CURRENT_VARIABLES),
+        "forecast_days": FORECAST_DAYS,
+        "timezone": "auto",
+    }
+
+
+def _forecast(cell, data):
+    return {
+        "latitude": cell[0],
+        "longitude": cell[1],
+        "timezone": data.get("timezone"),
+        "daily": data.get("daily", {}),
+        "current": data.get("current", {}),
+    }
+
+
+def _fetch(lat, lon):
+    response = get_session("open_meteo").get(FORECAST_URL, params=_params([(lat, lon)]))
+    response.raise_for_status()
+    return _forecast((lat, lon), response.json())
+
+
+def _fetch_many(cells):
+    """One multi-location request; open-meteo answers with a list in input order"""
+    response = get_session("open_meteo").get(FORECAST_URL, params=_params(cells))
+    response.raise_for_status()
+    data = response.json()
+    if isinstance(data, dict):
+        data = [data]
+    if len(data) != len(cells):
+        raise ValueError(f"open-meteo returned {len(data)} locations for {len(cells)} requested")
+    return [_forecast(cell, item) for cell, item in zip(cells, data)]
+
+
+def get_forecast(lat, lon):
+    """
+    Cached 7-day daily forecast plus current conditions for the grid cell
+    containing (lat, lon). Raises on upstream errors.
+    """
+    cell = snap(lat, lon)
+    return _cache.get_or_load(cell, lambda: _fetch(*cell), ttl=_ttl())
+
+
+def get_forecasts(points):
+    """
+    Forecasts for many (lat, lon) points with as few upstream calls as
+    possible: points are deduped to grid cells, cached cells are served from
+    the cache and the rest are fetched WEATHER_BATCH_SIZE cells per request.
+
+    Returns (forecasts, stats) where forecasts[i] is the forecast for
+    points[i], or {"latitude", "longitude", "error"} if its chunk failed.
+    """
+    cells = [snap(lat, lon) for lat, lon in points]
+    unique = list(dict.fromkeys(cells))
+
+    by_cell = {}
+    missing = []
+    for cell in unique:
+        forecast = _cache.get(cell)
+        if forecast is None:
+            missing.append(cell)
+        else:
+            by_cell[cell] = forecast
+
+    requests_made = 0
+    ttl = _ttl()
+    for start in range(0, len(missing), WEATHER_BATCH_SIZE):
+        chunk = missing[start:start + WEATHER_BATCH_SIZE]
+        requests_made += 1
+        try:
+            forecasts = _cache.record_load(lambda: _fetch_many(chunk))
+        except Exception as e:
+            print(f"[ERROR] Batch weather fetch failed for {len(chunk)} cells: {e}")
+            by_cell.update({cell: {"latitude": cell[0], "longitude": cell[1], "error": str(e)} for cell in chunk})
+            continue
+        for cell, forecast in zip(chunk, forecasts):
+            _cache.set(cell, forecast, ttl)
+            by_cell[cell] = forecast
+
+    stats = {
+        "points": len(points),
+        "cells": len(unique),
+        "cache_hits": len(unique) - len(missing),
+        "upstream_requests": requests_made,
+    }
+    return [by_cell[cell] for cell in cells], stats
+
+
+def get_daily(lat, lon, fields=None):
+    """
+    Daily series keyed by short name (see DAILY_FIELDS), e.g.
+    get_daily(lat, lon, ["dates", "temp_max"]). Returns {} if the forecast
+    is unavailable, like the per-route fetchers it replaces.
+    """
+    try:
+        return daily_fields(get_forecast(lat, lon), fields)
+    except Exception as e:
+        print(f"[ERROR] Weather fetch failed: {e}")
+        return {}
+
+
+def daily_fields(forecast, fields=None):
+    """Project a forecast's daily series onto short field names"""
+    daily = forecast["daily"]
+    return {field: daily.get(DAILY_FIELDS[field], []) for field in (fields or DAILY_FIELDS)}
+
+
+def current_conditions(forecast):
+    current = forecast["current"]
+    return {
+        "temperature": current.get("temperature_2m"),
+        "humidity": current.get("relative_humidity_2m"),
+        "precipitation": current.get("precipitation"),
+        "windspeed": current.get("wind_speed_10m"),
+    }
+
+
+def get_current(lat, lon):
+    """Current temperature (°C), humidity (%), precipitation (mm) and wind speed (km/h)"""
+    return current_conditions(get_forecast(lat, lon))
+
+
+def stats():
+    """Cache hit ratio and upstream call counts for /api/status"""
+    return {"grid_deg": WEATHER_GRID_DEG, **_cache.stats()}
@@ -0,0 +1,122 @@
+"""
+Peak RSS of /translate's PDF handling: the old in-memory path against the
+spooled, page-by-page path (app/pdf_text.py). Each mode runs in a fresh
+process so peaks don't mix; no Groq calls are made.
+
+    cd AiBackend
+    python benchmark_translate_memory.py circular.pdf --concurrency 4
+    python benchmark_translate_memory.py --generate-mb 50 --pages 60
+
+before: upload.read() -> fitz.open(stream=bytes) -> text += page.get_text()
+after:  spool to a temp file while hashing -> fitz.open(path) -> one string per page
+"""
+import argparse
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+
+def rss_mb():
+    """Peak RSS of this process so far (ru_maxrss is KB on Linux, bytes on macOS)"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def before(path):
+    import fitz
+    with open(path, "rb") as upload:
+        data = upload.read()
+    text = ""
+    with fitz.open(stream=data, filetype="pdf") as doc:
+        for page in doc:
+            text += page.get_text()
+    return len(text)
+
+
+def after(path):
+    from app import pdf_text
+
+    class Upload:
+        stream = open(path, "rb")
+
+    spool_path = None
+    try:
+        spool_path, _, _ = pdf_text.spool_upload(Upload, max_bytes=os.path.getsize(path))
+        with pdf_text.open_pdf(spool_path, max_pages=10 ** 6) as doc:
+            pages = list(pdf_text.iter_pages(doc))
+        return sum(len(page) for page in pages)
+    finally:
+        Upload.stream.close()
+        pdf_text.remove_spool(spool_path)
+
+
+def run_mode(mode, path, concurrency):
+    """Child process: run `concurrency` requests at once and print the RSS growth"""
+    import fitz  # noqa: F401  (import cost is not part of the measurement)
+    from app import pdf_text  # noqa: F401
+    baseline = rss_mb()
+    func = before if mode == "before" else after
+    started = time.perf_counter()
+    threads = [threading.Thread(target=func, args=(path,)) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    print(f"{rss_mb() - baseline:.1f} {time.perf_counter() - started:.2f}")
+
+
+def generate_pdf(size_mb, pages):
+    """A scanned-looking PDF: each page a noise image (incompressible) plus a text layer"""
+    import fitz
+    doc = fitz.open()
+    image_bytes = int(size_mb * 1024 * 1024 / pages)
+    side = int((image_bytes / 3) ** 0.5)
+    for number in range(pages):
+        page = doc.new_page()
+        pixmap = fitz.Pixmap(fitz.csRGB, side, side, os.urandom(side * side * 3), False)
+        page.insert_image(page.rect, pixmap=pixmap)
+        page.insert_textbox(fitz.Rect(40, 40, 560, 800), f"Page {number + 1}. " + "Scheme circular clause. " * 150,
+                            fontsize=7)
+    path = tempfile.NamedTemporaryFile(suffix=".pdf", delete=False).name
+    doc.save(path, deflate=False)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("pdf", nargs="?", help="PDF to measure (or use --generate-mb)")
+    parser.add_argument("--generate-mb", type=float, help="generate a scanned-style PDF of about this size")
+    parser.add_argument("--pages", type=int, default=40)
+    parser.add_argument("--concurrency", type=int, default=1, help="simultaneous requests per process")
+    parser.add_argument("--mode", choices=["before", "after"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        run_mode(args.mode, args.pdf, args.concurrency)
+        return 0
+
+    if not args.pdf and not args.generate_mb:
+        parser.error("pass a PDF or --generate-mb")
+    path = args.pdf or generate_pdf(args.generate_mb, args.pages)
+    size_mb = os.path.getsize(path) / (1024 * 1024)
+    print(f"{path}: {size_mb:.1f} MB, {args.concurrency} concurrent request(s)")
+
+    try:
+        for mode in ("before", "after"):
+            output = subprocess.run(
+                [sys.executable, __file__, path, "--mode", mode, "--concurrency", str(args.concurrency)],
+                capture_output=True, text=True, check=True, cwd=os.path.dirname(os.path.abspath(__file__))
+            ).stdout.splitlines()[-1].split()  # last line: the measurement
+            print(f"  {mode:<6} peak RSS +{float(output[0]):7.1f} MB   {float(output[1]):.2f}s")
+    finally:
+        if not args.pdf:
+            os.unlink(path)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
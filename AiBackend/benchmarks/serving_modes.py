@@ -0,0 +1,162 @@
+"""
+Compare requests/sec and latency of the gunicorn serving modes against a
+stubbed upstream LLM, so the numbers measure our server and not the provider.
+
+    cd AiBackend
+    python benchmarks/serving_modes.py                 # the README table
+    python benchmarks/serving_modes.py --concurrency 200 --duration 20 --delay 1.0
+
+Modes:
+  sync     the previous deployment: default sync workers, gunicorn.conf.py ignored
+  gthread  gunicorn.conf.py defaults (threaded workers)
+  gevent   gunicorn.conf.py with GUNICORN_WORKER_CLASS=gevent (async mode)
+
+Every mode serves /openrouter/chat; the OpenRouter upstream is redirected to
+a local stub via HTTP_UPSTREAM_OVERRIDES that answers after --delay seconds.
+"""
+import argparse
+import json
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODES = {
+    "sync": {"args": ["-c", "/dev/null", "run:app"], "env": {}},
+    "gthread": {"args": ["-c", "gunicorn.conf.py", "run:app"], "env": {}},
+    "gevent": {"args": ["-c", "gunicorn.conf.py", "run:app"], "env": {"GUNICORN_WORKER_CLASS": "gevent"}},
+}
+
+
+def start_stub_upstream(delay):
+    """OpenAI-compatible chat completion stub that answers after `delay` seconds"""
+    body = json.dumps({
+        "choices": [{"message": {"role": "assistant", "content": "Sow wheat in early November."}}],
+        "usage": {"prompt_tokens": 50, "completion_tokens": 8}
+    }).encode()
+
+    class StubHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            time.sleep(delay)
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def start_server(mode, port, stub_port, workers):
+    env = dict(
+        os.environ,
+        PORT=str(port),
+        WEB_CONCURRENCY=str(workers),
+        OPENROUTER_API_KEY="benchmark",
+        HTTP_UPSTREAM_OVERRIDES=f"openrouter=http://127.0.0.1:{stub_port}",
+        **MODES[mode]["env"]
+    )
+    args = ["gunicorn", *MODES[mode]["args"]]
+    if mode == "sync":
+        args += ["--bind", f"127.0.0.1:{port}", "--workers", str(workers), "--timeout", "180"]
+
+    proc = subprocess.Popen(args, cwd=BACKEND_DIR, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.time() + 300
+    while time.time() < deadline:
+        try:
+            if requests.get(f"http://127.0.0.1:{port}/health", timeout=1).status_code == 200:
+                return proc
+        except requests.RequestException:
+            time.sleep(0.5)
+    proc.kill()
+    raise RuntimeError(f"{mode}: server did not become healthy")
+
+
+def run_load(port, concurrency, duration):
+    url = f"http://127.0.0.1:{port}/openrouter/chat"
+    payload = {"message": "When should I sow wheat in Punjab?", "model": "fast"}
+    stop_at = time.time() + duration
+    latencies, errors = [], []
+    lock = threading.Lock()
+
+    def client():
+        session = requests.Session()
+        while time.time() < stop_at:
+            started = time.perf_counter()
+            try:
+                ok = session.post(url, json=payload, timeout=120).status_code == 200
+            except requests.RequestException:
+                ok = False
+            elapsed = time.perf_counter() - started
+            with lock:
+                (latencies if ok else errors).append(elapsed)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for _ in range(concurrency):
+            pool.submit(client)
+    wall = time.perf_counter() - started
+
+    latencies.sort()
+
+    def pct(p):
+        return round(latencies[min(int(len(latencies) * p), len(latencies) - 1)] * 1000) if latencies else None
+
+    return {
+        "requests": len(latencies),
+        "errors": len(errors),
+        "rps": round(len(latencies) / wall, 1),
+        "p50_ms": pct(0.50),
+        "p99_ms": pct(0.99),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modes", default="sync,gthread,gevent")
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--duration", type=float, default=8)
+    parser.add_argument("--delay", type=float, default=0.5, help="stub upstream latency in seconds")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--port", type=int, default=5102)
+    args = parser.parse_args()
+
+    stub = start_stub_upstream(args.delay)
+    results = {}
+    for mode in args.modes.split(","):
+        print(f"▶ {mode}: {args.concurrency} clients for {args.duration}s ...", flush=True)
+        proc = start_server(mode, args.port, stub.server_port, args.workers)
+        try:
+            results[mode] = run_load(args.port, args.concurrency, args.duration)
+        finally:
+            proc.send_signal(signal.SIGTERM)
+            proc.wait(timeout=60)
+        print(f"  {results[mode]}", flush=True)
+
+    print(f"\n{'mode':<10}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'errors':>10}")
+    for mode, r in results.items():
+        print(f"{mode:<10}{r['rps']:>10}{str(r['p50_ms']):>10}{str(r['p99_ms']):>10}{r['errors']:>10}")
+    stub.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
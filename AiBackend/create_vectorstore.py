@@ -1,52 +1,270 @@
+"""
+Build or update the Chroma vector store (app/resources.py) from the PDFs in
+./app/data/.
+
+    cd AiBackend
+    python create_vectorstore.py                # only added, changed or removed PDFs
+    python create_vectorstore.py --full         # drop the collection and re-ingest everything
+    python create_vectorstore.py --baseline     # time the old single-process PyPDFLoader build
+
+A manifest next to the store records each PDF's SHA-256 and the ids of its
+chunks. A re-run hashes the folder (files whose size and mtime are unchanged
+are not re-read), deletes the chunks of removed and changed files, and only
+parses and embeds what is new. PDFs are parsed with PyMuPDF in a process
+pool while the main process embeds finished files in large batches. The
+manifest is saved after each batch, so an interrupted run resumes.
+"""
+import argparse
+import json
 import os
-from langchain_community.document_loaders import PyPDFLoader
-from langchain_community.embeddings import HuggingFaceEmbeddings
-from langchain_community.vectorstores import Chroma
-from langchain.text_splitter import RecursiveCharacterTextSplitter
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
-# Path to your folder containing only PDFs
-pdf_folder_path = "./app/data/"
+from app.resources import COLLECTION, EMBED_MODEL, PERSIST_DIR
+from app.translate_cache import hash_stream
 
-# Function to load documents only from PDF files
-def load_pdfs_from_folder(pdf_path):
-    documents = []
-    for filename in os.listdir(pdf_path):
-        if filename.endswith(".pdf"):
-            file_path = os.path.join(pdf_path, filename)
-            loader = PyPDFLoader(file_path)
-            documents.extend(loader.load())
-    return documents
+PDF_FOLDER = "./app/data/"
+MANIFEST_PATH = os.path.join(PERSIST_DIR, "ingest_manifest.json")
+CHUNK_SIZE = 1000
+CHUNK_OVERLAP = 150
+EMBED_BATCH = 512  # chunks per embed + upsert call
+ENCODE_BATCH = 64  # sentence-transformers batch inside each call
+
+_splitter = None
+
+
+def parse_pdf(path):
+    """
+    Worker process: text chunks of one PDF as (text, page) pairs, split the
+    same way as before (1000 characters, 150 overlap). Returns (path, pages, chunks, seconds).
+    """
+    global _splitter
+    import fitz  # PyMuPDF
+    if _splitter is None:
+        from langchain.text_splitter import RecursiveCharacterTextSplitter
+        _splitter = RecursiveCharacterTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
+
+    started = time.perf_counter()
+    chunks = []
+    with fitz.open(path) as doc:
+        pages = doc.page_count
+        for number, page in enumerate(doc):
+            for text in _splitter.split_text(page.get_text()):
+                chunks.append((text, number))
+    return path, pages, chunks, time.perf_counter() - started
+
+
+def chunk_ids(name, entry):
+    """Chunk ids are derived from the file name and hash, so they never need to be stored"""
+    return [f"{name}:{entry['sha256'][:16]}:{i}" for i in range(entry["chunks"])]
+
+
+def load_manifest():
+    try:
+        with open(MANIFEST_PATH) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def save_manifest(manifest):
+    os.makedirs(PERSIST_DIR, exist_ok=True)
+    tmp = MANIFEST_PATH + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp, MANIFEST_PATH)
+
+
+def scan_folder(folder, manifest):
+    """{file name: {"sha256", "size", "mtime"}} for every PDF; unchanged files are not re-hashed"""
+    files = {}
+    for name in sorted(os.listdir(folder)):
+        if not name.endswith(".pdf"):
+            continue
+        path = os.path.join(folder, name)
+        stat = os.stat(path)
+        known = manifest.get(name)
+        if known and known["size"] == stat.st_size and known["mtime"] == stat.st_mtime:
+            sha256 = known["sha256"]
+        else:
+            with open(path, "rb") as f:
+                sha256, _ = hash_stream(f)
+        files[name] = {"sha256": sha256, "size": stat.st_size, "mtime": stat.st_mtime}
+    return files
+
+
+def open_vectorstore(persist_directory, reset=False):
+    from langchain_community.embeddings import HuggingFaceEmbeddings
+    from langchain_community.vectorstores import Chroma
 
-# Load documents from the PDF folder
-documents = load_pdfs_from_folder(pdf_folder_path)
+    embedding_function = HuggingFaceEmbeddings(model_name=EMBED_MODEL, encode_kwargs={"batch_size": ENCODE_BATCH})
+    vectorstore = Chroma(collection_name=COLLECTION, persist_directory=persist_directory,
+                         embedding_function=embedding_function)
+    if reset:
+        vectorstore.delete_collection()
+        vectorstore = Chroma(collection_name=COLLECTION, persist_directory=persist_directory,
+                             embedding_function=embedding_function)
+    return vectorstore
 
-print(f"Total PDF documents loaded: {len(documents)}")
 
-# Split documents into chunks with overlap
-text_splitter = RecursiveCharacterTextSplitter(
-    chunk_size=1000,
-    chunk_overlap=150,
-)
-split_documents = text_splitter.split_documents(documents)
+class BatchWriter:
+    """
+    Buffers chunks from parsed files and embeds + upserts them EMBED_BATCH at
+    a time. A file's manifest entry (and the removal of its previous chunks)
+    is committed only once all of its chunks are stored.
+    """
+
+    def __init__(self, vectorstore, manifest, batch_size):
+        self.vectorstore = vectorstore
+        self.manifest = manifest
+        self.batch_size = batch_size
+        self.texts, self.metadatas, self.ids = [], [], []
+        self.files = []  # (name, entry) whose chunks are all in the buffer
+        self.embed_s = 0.0
+        self.chunks = 0
+
+    def add(self, name, path, entry, chunks):
+        entry = {**entry, "chunks": len(chunks)}
+        self.texts.extend(text for text, _ in chunks)
+        self.metadatas.extend({"source": path, "page": page} for _, page in chunks)
+        self.ids.extend(chunk_ids(name, entry))
+        self.files.append((name, entry))
+        if len(self.texts) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        started = time.perf_counter()
+        for i in range(0, len(self.texts), self.batch_size):
+            self.vectorstore.add_texts(self.texts[i:i + self.batch_size],
+                                       metadatas=self.metadatas[i:i + self.batch_size],
+                                       ids=self.ids[i:i + self.batch_size])
+        self.embed_s += time.perf_counter() - started
+        self.chunks += len(self.texts)
+
+        stale = []
+        for name, entry in self.files:
+            old = self.manifest.get(name)
+            if old and old["sha256"] != entry["sha256"]:
+                stale.extend(chunk_ids(name, old))
+            self.manifest[name] = entry
+        if stale:
+            self.vectorstore.delete(ids=stale)
+        if self.files:
+            save_manifest(self.manifest)
+        self.texts, self.metadatas, self.ids, self.files = [], [], [], []
+
+
+def ingest(folder, full, workers, batch_size):
+    started = time.perf_counter()
+    manifest = load_manifest()
+    if manifest is None and os.path.isdir(PERSIST_DIR) and os.listdir(PERSIST_DIR):
+        # A store built before the manifest existed has chunks we can't match to files
+        print("No ingest manifest found; rebuilding the collection")
+        full = True
+    if full:
+        manifest = {}
+    manifest = manifest or {}
+
+    files = scan_folder(folder, manifest)
+    removed = sorted(set(manifest) - set(files))
+    changed = [name for name in files if name in manifest and manifest[name]["sha256"] != files[name]["sha256"]]
+    added = [name for name in files if name not in manifest]
+    todo = added + changed
+    print(f"{len(files)} PDFs: {len(added)} added, {len(changed)} changed, {len(removed)} removed, "
+          f"{len(files) - len(todo)} unchanged")
+
+    for name in set(files) - set(todo):
+        manifest[name].update(size=files[name]["size"], mtime=files[name]["mtime"])  # touched, same content
+
+    vectorstore = open_vectorstore(PERSIST_DIR, reset=full)
+    if removed:
+        vectorstore.delete(ids=[chunk_id for name in removed for chunk_id in chunk_ids(name, manifest[name])])
+        for name in removed:
+            del manifest[name]
+        save_manifest(manifest)
+
+    writer = BatchWriter(vectorstore, manifest, batch_size)
+    pages = 0
+    parse_s = 0.0
+    failed = []
+    if todo:
+        with ProcessPoolExecutor(max_workers=min(workers, len(todo))) as pool:
+            futures = {pool.submit(parse_pdf, os.path.join(folder, name)): name for name in todo}
+            for future in as_completed(futures):
+                name = futures[future]
+                try:
+                    path, page_count, chunks, seconds = future.result()
+                except Exception as e:
+                    failed.append(name)
+                    print(f"  ❌ {name}: {e}")
+                    continue
+                pages += page_count
+                parse_s += seconds
+                writer.add(name, path, files[name], chunks)
+                print(f"  ✅ {name}: {page_count} pages, {len(chunks)} chunks ({seconds:.1f}s)")
+        writer.flush()
+    vectorstore.persist()
+
+    wall = time.perf_counter() - started
+    print(f"Ingested {len(todo) - len(failed)} PDFs ({pages} pages, {writer.chunks} chunks) in {wall:.1f}s: "
+          f"{pages / wall:.1f} pages/s, {(len(todo) - len(failed)) / wall:.2f} files/s")
+    print(f"  parse {parse_s:.1f}s across {workers} workers, embed + upsert {writer.embed_s:.1f}s")
+    print(f"Vector store updated in '{PERSIST_DIR}' ({sum(e['chunks'] for e in manifest.values())} chunks)")
+    return 1 if failed else 0
+
+
+def baseline(folder):
+    """The previous build: PyPDFLoader one file at a time, then embed everything, into a throwaway store"""
+    from langchain_community.document_loaders import PyPDFLoader
+    from langchain_community.embeddings import HuggingFaceEmbeddings
+    from langchain_community.vectorstores import Chroma
+    from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+    started = time.perf_counter()
+    documents = []
+    for filename in os.listdir(folder):
+        if filename.endswith(".pdf"):
+            documents.extend(PyPDFLoader(os.path.join(folder, filename)).load())
+    parsed = time.perf_counter()
+    split_documents = RecursiveCharacterTextSplitter(
+        chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP
+    ).split_documents(documents)
+
+    persist_directory = tempfile.mkdtemp(prefix="chroma_baseline_")
+    try:
+        Chroma.from_documents(
+            documents=split_documents,
+            embedding=HuggingFaceEmbeddings(model_name=EMBED_MODEL),
+            collection_name=COLLECTION,
+            persist_directory=persist_directory
+        )
+    finally:
+        shutil.rmtree(persist_directory, ignore_errors=True)
 
-# Initialize embedding function
-embedding_function = HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2")
+    wall = time.perf_counter() - started
+    files = len([f for f in os.listdir(folder) if f.endswith(".pdf")])
+    print(f"Baseline: {files} PDFs ({len(documents)} pages, {len(split_documents)} chunks) in {wall:.1f}s: "
+          f"{len(documents) / wall:.1f} pages/s, {files / wall:.2f} files/s")
+    print(f"  parse {parsed - started:.1f}s in one process, embed + write {time.perf_counter() - parsed:.1f}s")
+    return 0
 
-# Set Chroma vector store config
-collection_name = "agri_collection"
-persist_directory = "./app/chromadb"
 
-# Create and persist the vector store
-vectorstore = Chroma.from_documents(
-    documents=split_documents,
-    embedding=embedding_function,
-    collection_name=collection_name,
-    persist_directory=persist_directory
-)
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--folder", default=PDF_FOLDER)
+    parser.add_argument("--full", action="store_true", help="drop the collection and re-ingest every PDF")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 4, help="PDF parsing processes")
+    parser.add_argument("--batch-size", type=int, default=EMBED_BATCH, help="chunks per embedding batch")
+    parser.add_argument("--baseline", action="store_true", help="time the old build instead (store is not touched)")
+    args = parser.parse_args()
 
-vectorstore.persist()
+    if args.baseline:
+        return baseline(args.folder)
+    return ingest(args.folder, args.full, args.workers, args.batch_size)
 
-# Optional: Set up the retriever
-retriever = vectorstore.as_retriever()
 
-print(f"Vector store created and persisted to '{persist_directory}'")
\ No newline at end of file
+if __name__ == "__main__":
+    sys.exit(main())
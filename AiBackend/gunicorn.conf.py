@@ -0,0 +1,87 @@
+# Gunicorn configuration for the AgriX AI backend
+#
+#   gunicorn -c gunicorn.conf.py run:app
+#
+# With preload enabled (the default) the master process builds the Flask app,
+# imports every route module and loads the MiniLM embedding model and the
+# Chroma index *before* forking. Workers share those pages copy-on-write
+# instead of each loading their own copy. Compare `uss_mb` (memory unique to a
+# worker) with `rss_mb` in the worker logs or in /api/status to confirm.
+#
+# This is how render.yaml deploys. LAZY_BLUEPRINTS=true is the opposite trade:
+# the master only registers stubs and each worker imports route modules (and
+# its own copy of the models) on first use. With both set, lazy mode wins and
+# only the app skeleton is preloaded.
+
+import gc
+import os
+
+# HuggingFace tokenizers start a thread pool on first use; forking after
+# that triggers warnings and can deadlock, so keep them single-threaded.
+os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5002')}"
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+
+# Almost every route waits seconds on an upstream LLM or weather API, so a
+# threaded worker serves several farmers at once per process.
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "gthread")
+threads = int(os.getenv("GUNICORN_THREADS", "8"))
+
+# Async serving mode: gevent workers turn every blocking socket call in the
+# existing blueprints (requests, the Groq/Gemini SDKs) into a cooperative one,
+# so a single worker holds hundreds of in-flight upstream calls.
+if worker_class == "gevent":
+    from gevent import monkey
+
+    # Patch before the app (and ssl, threading) is imported in the master
+    monkey.patch_all()
+
+    worker_connections = int(os.getenv("GUNICORN_WORKER_CONNECTIONS", "500"))
+    # Let every in-flight request hold its own keep-alive upstream connection
+    os.environ.setdefault("HTTP_POOL_MAXSIZE", str(worker_connections))
+
+# Upstream LLM calls can take up to two minutes (HuggingFace warmup)
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "180"))
+graceful_timeout = 30
+keepalive = 5
+
+preload_app = os.getenv("GUNICORN_PRELOAD", "true").lower() == "true"
+
+
+def when_ready(server):
+    """Runs in the master before workers are forked"""
+    if not preload_app:
+        return
+
+    from app import resources
+    from app.blueprint_loader import load_all
+    from app.procstats import memory_usage
+
+    flask_app = server.app.wsgi()
+    if flask_app.config['LAZY_BLUEPRINTS']:
+        server.log.info("LAZY_BLUEPRINTS is on: route modules and models load in each worker on first use")
+    else:
+        load_all(flask_app)
+        try:
+            resources.warm()
+        except Exception as e:
+            server.log.warning(f"Could not preload shared resources: {e}")
+        flask_app.config['PRELOADED'] = True
+
+    # Move everything allocated so far out of the GC's reach so collections
+    # in the workers don't write to (and un-share) these pages.
+    gc.collect()
+    gc.freeze()
+
+    server.log.info(f"Preloaded app in master: {memory_usage()}")
+
+
+def post_worker_init(worker):
+    from app.procstats import memory_usage
+    worker.log.info(f"Worker {worker.pid} ready: {memory_usage()}")
+
+
+def worker_exit(server, worker):
+    from app.procstats import memory_usage
+    server.log.info(f"Worker {worker.pid} exiting: {memory_usage()}")
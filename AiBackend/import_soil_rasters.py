@@ -0,0 +1,122 @@
+"""
+Import SoilGrids-style rasters into the local soil store (app/soil_store.py)
+so fertilizer soil lookups need no network for points inside the extent.
+
+    cd AiBackend
+    pip install rasterio
+    python import_soil_rasters.py \\
+        --ph phh2o_0-5cm_mean.tif --nitrogen nitrogen_0-5cm_mean.tif \\
+        --soc soc_0-5cm_mean.tif --clay clay_0-5cm_mean.tif \\
+        --ocs ocs_0-30cm_mean.tif --res-deg 0.01
+
+Each raster (GeoTIFF or VRT, any CRS, e.g. SoilGrids' Homolosine tiles) is
+reprojected to a regular lat/lon grid over --bbox (India by default) with
+average resampling and stored as int16 in SoilGrids' mapped units, the same
+units openepi returns. At 0.01° (~1.1 km) India takes ~100 MB for 5 layers.
+Layers you don't pass are left out and fall back to openepi.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+from app.soil_store import NODATA, SOIL_STORE_DIR
+
+# CLI flag -> layer name used by app/soil.py
+LAYERS = {
+    "ph": "soil_ph",
+    "nitrogen": "soil_nitrogen",
+    "soc": "soil_organic_carbon",
+    "clay": "soil_clay",
+    "ocs": "soil_organic_carbon_stock",
+}
+
+INDIA_BBOX = (68.0, 6.0, 98.0, 38.0)  # west, south, east, north
+
+
+def read_layer(path, bbox, res, width, height):
+    """Reproject and resample one raster onto the store grid"""
+    import rasterio
+    from rasterio.enums import Resampling
+    from rasterio.transform import from_origin
+    from rasterio.vrt import WarpedVRT
+
+    west, _, _, north = bbox
+    with rasterio.open(path) as src:
+        src_nodata = src.nodata
+        with WarpedVRT(src, crs="EPSG:4326", transform=from_origin(west, north, res, res),
+                       width=width, height=height, resampling=Resampling.average,
+                       src_nodata=src_nodata, nodata=NODATA) as vrt:
+            data = vrt.read(1, out_dtype="float64")
+
+    data[(data == NODATA) | ~np.isfinite(data)] = np.nan
+    if src_nodata is not None:
+        data[data == src_nodata] = np.nan
+    out = np.full(data.shape, NODATA, dtype=np.int16)
+    valid = ~np.isnan(data)
+    out[valid] = np.clip(np.rint(data[valid]), -32767, 32767).astype(np.int16)
+    return out, int(valid.sum())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    for flag, layer in LAYERS.items():
+        parser.add_argument(f"--{flag}", metavar="RASTER", help=f"raster for {layer}")
+    parser.add_argument("--bbox", type=float, nargs=4, default=INDIA_BBOX,
+                        metavar=("WEST", "SOUTH", "EAST", "NORTH"))
+    parser.add_argument("--res-deg", type=float, default=0.01, help="grid resolution in degrees")
+    parser.add_argument("--out", default=SOIL_STORE_DIR)
+    args = parser.parse_args()
+
+    try:
+        import rasterio  # noqa: F401
+    except ImportError:
+        print("rasterio is required to import rasters: pip install rasterio")
+        return 1
+
+    sources = {layer: getattr(args, flag) for flag, layer in LAYERS.items() if getattr(args, flag)}
+    if not sources:
+        parser.error("pass at least one raster (--ph, --nitrogen, --soc, --clay, --ocs)")
+
+    west, south, east, north = args.bbox
+    width = int(round((east - west) / args.res_deg))
+    height = int(round((north - south) / args.res_deg))
+    print(f"Grid {height} x {width} at {args.res_deg}° over {args.bbox}, {len(sources)} layers")
+
+    os.makedirs(args.out, exist_ok=True)
+    tmp_path = os.path.join(args.out, "soil.npy.tmp")
+    array = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=np.int16, shape=(len(sources), height, width))
+
+    for i, (layer, path) in enumerate(sources.items()):
+        started = time.perf_counter()
+        array[i], valid = read_layer(path, args.bbox, args.res_deg, width, height)
+        print(f"  ✅ {layer}: {path} ({valid / (width * height):.0%} covered, {time.perf_counter() - started:.1f}s)")
+    array.flush()
+    del array
+
+    meta_tmp = os.path.join(args.out, "meta.json.tmp")
+    with open(meta_tmp, "w") as f:
+        json.dump({
+            "west": west,
+            "north": north,
+            "res_deg": args.res_deg,
+            "layers": list(sources),
+            "nodata": NODATA,
+            "source": {layer: os.path.basename(path) for layer, path in sources.items()},
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        }, f, indent=2)
+
+    # Swap in the new store; running workers keep their old mapping until restart
+    os.replace(tmp_path, os.path.join(args.out, "soil.npy"))
+    os.replace(meta_tmp, os.path.join(args.out, "meta.json"))
+
+    size_mb = len(sources) * width * height * 2 / (1024 * 1024)
+    print(f"Soil store written to {args.out} ({size_mb:.1f} MB)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
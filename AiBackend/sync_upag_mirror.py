@@ -0,0 +1,89 @@
+"""
+Mirror UPAg sources into the local SQLite store (app/upag_mirror.py) that
+backs /upag/mirror/query.
+
+    cd AiBackend
+    python sync_upag_mirror.py --sources dafw_state agmarknet --years 2022 2023
+    python sync_upag_mirror.py --full --years 2023   # re-fetch revised data
+
+Each source is synced per (year, season) partition. A partition resumes at
+the number of records already fetched, so re-runs only pull what is new
+upstream and an interrupted sync picks up where it stopped. If upstream now
+reports fewer records than were fetched, the partition is re-fetched from
+scratch. UPAg can also revise records in place; use --full for that.
+"""
+import argparse
+import sys
+import time
+
+from app import upag_mirror
+from app.routes import upag
+
+SEASONAL_SOURCES = ["dafw_state", "dafw_district", "dcs"]
+
+
+def sync_partition(source, year, season, full, page_size, concurrency):
+    """Fetch new records for one partition; returns (records fetched, new records stored)"""
+    state = upag_mirror.get_partition(source, year, season)
+    start = 0 if full or not state else state["fetched"]
+    if full and state:
+        upag_mirror.clear_partition(source, year, season)
+
+    data = {"year": [year]}
+    if season:
+        data["season"] = [season]
+    source_input = upag.build_source_input(source, data)
+
+    fetched = added = 0
+    total = None
+    for offset, records, total in upag.export_pages(source, source_input, start, page_size, concurrency):
+        if total and total < start:
+            print(f"  ↺ {source} {year} {season}: upstream shrank to {total} records, re-fetching")
+            upag_mirror.clear_partition(source, year, season)
+            return sync_partition(source, year, season, True, page_size, concurrency)
+        added += upag_mirror.store_records(source, year, season, records, offset + len(records), total)
+        fetched += len(records)
+    if fetched == 0:
+        # Nothing new; record the check so last_sync stays current
+        upag_mirror.store_records(source, year, season, [], start, total)
+    return fetched, added
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sources", nargs="+", default=upag_mirror.MIRROR_SOURCES)
+    parser.add_argument("--years", nargs="+", default=[str(time.localtime().tm_year - 1), str(time.localtime().tm_year)])
+    parser.add_argument("--seasons", nargs="+", default=["kharif", "rabi"], help="for seasonal sources")
+    parser.add_argument("--full", action="store_true", help="drop and re-fetch each partition")
+    parser.add_argument("--page-size", type=int, default=upag.EXPORT_PAGE_SIZE)
+    parser.add_argument("--concurrency", type=int, default=upag.EXPORT_CONCURRENCY, help="pages in flight")
+    args = parser.parse_args()
+
+    if not upag.get_upag_token():
+        print("UPAg login failed; set UPAG_USERNAME and UPAG_PASSWORD")
+        return 1
+
+    started = time.perf_counter()
+    failed = []
+    for source in args.sources:
+        seasons = args.seasons if source in SEASONAL_SOURCES else [""]
+        for year in args.years:
+            for season in seasons:
+                partition_started = time.perf_counter()
+                try:
+                    fetched, added = sync_partition(source, year, season, args.full, args.page_size, args.concurrency)
+                except Exception as e:
+                    failed.append((source, year, season))
+                    print(f"  ❌ {source} {year} {season}: {e}")
+                    continue
+                print(f"  ✅ {source} {year} {season}: {fetched} fetched, {added} new "
+                      f"({time.perf_counter() - partition_started:.1f}s)")
+
+    print(f"Synced in {time.perf_counter() - started:.1f}s, {len(failed)} partitions failed (re-run to resume)")
+    for source, info in upag_mirror.stats()["sources"].items():
+        print(f"  {source}: {info['records']} records in {info['partitions']} partitions")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
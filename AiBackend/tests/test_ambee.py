@@ -0,0 +1,46 @@
+import pytest
+from flask import Flask
+
+from app.routes import ambee
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(ambee, "AMBEE_API_KEY", "test-key")
+    app = Flask(__name__)
+    app.register_blueprint(ambee.ambee_bp)
+    return app.test_client()
+
+
+@pytest.fixture
+def timeouts(monkeypatch):
+    seen = []
+
+    def get_ambee(endpoint, lat, lng, timeout=30, bypass=False):
+        seen.append(timeout[1])
+        return {"data": []}, "miss"
+
+    monkeypatch.setattr(ambee, "get_ambee", get_ambee)
+    return seen
+
+
+BODY = {"latitude": 28.6, "longitude": 77.2}
+
+
+@pytest.mark.parametrize("timeout", ["soon", None, [], "nan"])
+def test_dashboard_rejects_a_non_numeric_timeout(client, timeouts, timeout):
+    response = client.post("/ambee/farming-dashboard", json={**BODY, "timeout": timeout})
+    assert response.status_code == 400
+    assert timeouts == []
+
+
+@pytest.mark.parametrize("timeout, expected", [
+    (0, ambee.MIN_DASHBOARD_DEADLINE),
+    (-5, ambee.MIN_DASHBOARD_DEADLINE),
+    ("2.5", 2.5),
+    (1e9, ambee.DASHBOARD_DEADLINE),
+])
+def test_dashboard_clamps_the_timeout(client, timeouts, timeout, expected):
+    response = client.post("/ambee/farming-dashboard", json={**BODY, "timeout": timeout})
+    assert response.status_code == 200
+    assert timeouts and set(timeouts) == {expected}
@@ -0,0 +1,33 @@
+import io
+
+import pytest
+
+import app as app_package
+from app import pdf_text
+
+
+@pytest.fixture
+def lazy_app(monkeypatch):
+    monkeypatch.setenv("LAZY_BLUEPRINTS", "true")
+    monkeypatch.setattr(pdf_text, "MAX_REQUEST_BYTES", 64 * 1024)
+    flask_app = app_package.create_app()
+    assert flask_app.config["BLUEPRINT_REPORT"]["translate_bp"]["mode"] == "lazy"
+    return flask_app
+
+
+def test_lazy_blueprint_uses_the_real_error_handlers(lazy_app):
+    body = io.BytesIO(b"%PDF-" + b"0" * (128 * 1024))
+    response = lazy_app.test_client().post(
+        "/translate",
+        data={"file": (body, "big.pdf"), "target_language": "Hindi"},
+        content_type="multipart/form-data"
+    )
+    assert response.status_code == 413
+    assert response.get_json() == {"error": pdf_text.too_large_message()}
+    assert response.headers["Access-Control-Allow-Origin"] == "*"  # after_request still proxied
+
+
+def test_lazy_blueprint_serves_ordinary_responses(lazy_app):
+    response = lazy_app.test_client().post("/translate", data={})
+    assert response.status_code == 400
+    assert response.get_json() == {"error": "No PDF file provided."}
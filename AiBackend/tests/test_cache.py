@@ -0,0 +1,144 @@
+import threading
+import time
+
+import pytest
+
+from app.cache import TTLCache
+
+
+def expire(cache, key, ago=0.01):
+    """Backdate an entry so it expired `ago` seconds ago"""
+    with cache._lock:
+        _, value = cache._entries[key]
+        cache._entries[key] = (time.monotonic() - ago, value)
+
+
+def test_concurrent_misses_call_the_loader_once():
+    cache = TTLCache("test", ttl=60)
+    calls = []
+    gate = threading.Event()
+
+    def loader():
+        calls.append(1)
+        gate.wait(2)
+        return "value"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_load("k", loader))) for _ in range(20)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.05)
+    gate.set()
+    for thread in threads:
+        thread.join()
+
+    assert calls == [1]
+    assert results == ["value"] * 20
+    stats = cache.stats()
+    assert stats["misses"] == 1 and stats["hits"] == 19 and stats["upstream_calls"] == 1
+
+
+def test_loader_error_propagates_and_is_not_cached():
+    cache = TTLCache("test", ttl=60)
+
+    def failing():
+        raise ConnectionError("upstream down")
+
+    with pytest.raises(ConnectionError):
+        cache.get_or_load("k", failing)
+    assert cache.get_or_load("k", lambda: "recovered") == "recovered"
+    assert cache.stats()["upstream_errors"] == 1
+
+
+def test_waiters_retry_after_a_failed_load():
+    cache = TTLCache("test", ttl=60)
+    gate = threading.Event()
+    calls = []
+
+    def loader():
+        calls.append(1)
+        if len(calls) == 1:
+            gate.wait(2)
+            raise ConnectionError("first load fails")
+        return "second"
+
+    errors, results = [], []
+
+    def first():
+        try:
+            cache.get_or_load("k", loader)
+        except ConnectionError as e:
+            errors.append(e)
+
+    leader = threading.Thread(target=first)
+    leader.start()
+    time.sleep(0.05)
+    waiter = threading.Thread(target=lambda: results.append(cache.get_or_load("k", loader)))
+    waiter.start()
+    time.sleep(0.05)
+    gate.set()
+    leader.join()
+    waiter.join()
+    assert len(errors) == 1 and results == ["second"] and len(calls) == 2
+
+
+def test_expired_entries_are_reloaded_and_lru_is_evicted():
+    cache = TTLCache("test", ttl=60, maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1  # a is now most recently used
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    expire(cache, "a")
+    assert cache.get("a") is None
+    assert cache.get_or_load("a", lambda: 10) == 10
+
+
+def test_stale_entry_is_served_while_one_refresh_runs():
+    cache = TTLCache("test", ttl=60, stale_ttl=60)
+    cache.set("k", "old")
+    expire(cache, "k")
+
+    refreshed = threading.Event()
+    gate = threading.Event()
+    calls = []
+
+    def loader():
+        calls.append(1)
+        gate.wait(2)
+        refreshed.set()
+        return "new"
+
+    states = [cache.get_or_load_stale("k", loader) for _ in range(5)]
+    assert states == [("old", "stale")] * 5
+    gate.set()
+    assert refreshed.wait(2)
+    deadline = time.monotonic() + 2
+    while cache.get_or_load_stale("k", loader)[1] != "hit" and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert cache.get_or_load_stale("k", loader) == ("new", "hit")
+    assert calls == [1]
+    assert cache.stats()["stale_hits"] >= 5
+
+
+def test_too_stale_entry_is_a_miss():
+    cache = TTLCache("test", ttl=60, stale_ttl=1)
+    cache.set("k", "old")
+    expire(cache, "k", ago=5)
+    assert cache.get_or_load_stale("k", lambda: "new") == ("new", "miss")
+
+
+def test_failed_refresh_keeps_serving_stale():
+    cache = TTLCache("test", ttl=60, stale_ttl=60)
+    cache.set("k", "old")
+    expire(cache, "k")
+
+    def failing():
+        raise ConnectionError("upstream down")
+
+    assert cache.get_or_load_stale("k", failing) == ("old", "stale")
+    deadline = time.monotonic() + 2
+    while cache.stats()["upstream_errors"] == 0 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    time.sleep(0.02)
+    assert cache.get_or_load_stale("k", lambda: "new")[1] == "stale"
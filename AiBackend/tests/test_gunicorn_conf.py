@@ -0,0 +1,54 @@
+import importlib.util
+import logging
+import os
+
+import pytest
+from flask import Flask
+
+from app import blueprint_loader, resources
+
+CONF_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "gunicorn.conf.py")
+
+
+@pytest.fixture
+def conf(monkeypatch):
+    monkeypatch.setenv("GUNICORN_PRELOAD", "true")
+    spec = importlib.util.spec_from_file_location("gunicorn_conf", CONF_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    seen = []
+    monkeypatch.setattr(blueprint_loader, "load_all", lambda app: seen.append("load_all"))
+    monkeypatch.setattr(resources, "warm", lambda: seen.append("warm"))
+    monkeypatch.setattr("gc.freeze", lambda: None)  # keep the test process's GC untouched
+    return seen
+
+
+class FakeServer:
+    def __init__(self, flask_app):
+        self.app = type("WSGIApp", (), {"wsgi": lambda _: flask_app})()
+        self.log = logging.getLogger("gunicorn-test")
+
+
+def make_app(lazy):
+    flask_app = Flask(__name__)
+    flask_app.config.update(LAZY_BLUEPRINTS=lazy, PRELOADED=False)
+    return flask_app
+
+
+def test_preload_imports_everything_in_the_master(conf, calls):
+    flask_app = make_app(lazy=False)
+    conf.when_ready(FakeServer(flask_app))
+    assert calls == ["load_all", "warm"]
+    assert flask_app.config["PRELOADED"]
+
+
+def test_lazy_mode_is_not_undone_by_preload(conf, calls):
+    flask_app = make_app(lazy=True)
+    conf.when_ready(FakeServer(flask_app))
+    assert calls == []
+    assert not flask_app.config["PRELOADED"]
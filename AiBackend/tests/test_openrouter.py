@@ -0,0 +1,116 @@
+import pytest
+from flask import Flask
+
+from app.routes import openrouter
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(openrouter, "OPENROUTER_API_KEY", "test-key")
+    app = Flask(__name__)
+    app.register_blueprint(openrouter.openrouter_bp)
+    return app.test_client()
+
+
+@pytest.fixture
+def deadlines(monkeypatch):
+    seen = []
+
+    def run_comparisons(models, message, lang, deadline):
+        seen.append(deadline)
+        return [{"model": preset, "preset": preset, "response": "ok", "latency_s": 0} for preset in models]
+
+    monkeypatch.setattr(openrouter, "run_comparisons", run_comparisons)
+    return seen
+
+
+@pytest.mark.parametrize("timeout", ["soon", None, [], "nan"])
+def test_compare_rejects_a_non_numeric_timeout(client, deadlines, timeout):
+    response = client.post("/openrouter/compare", json={"message": "wheat rust?", "timeout": timeout})
+    assert response.status_code == 400
+    assert deadlines == []
+
+
+@pytest.mark.parametrize("timeout, expected", [
+    (0, openrouter.MIN_COMPARE_DEADLINE),
+    (-3, openrouter.MIN_COMPARE_DEADLINE),
+    ("12.5", 12.5),
+    (10_000, openrouter.COMPARE_DEADLINE),
+])
+def test_compare_clamps_the_timeout(client, deadlines, timeout, expected):
+    response = client.post("/openrouter/compare", json={"message": "wheat rust?", "timeout": timeout})
+    assert response.status_code == 200
+    assert deadlines == [expected]
+
+
+@pytest.fixture
+def models(monkeypatch):
+    """chat_completion stub failing for models in `failing`; records the order models were tried"""
+    state = {"failing": set(), "tried": []}
+
+    def chat_completion(model_id, messages, **kwargs):
+        state["tried"].append(model_id)
+        if model_id in state["failing"]:
+            openrouter.latency_table.record_failure(model_id, "503")
+            raise ConnectionError(f"{model_id} unavailable")
+        openrouter.latency_table.record_success(model_id, 0.1, 0.5)
+        return {"choices": [{"message": {"content": f"answer from {model_id}"}}]}
+
+    monkeypatch.setattr(openrouter, "latency_table", openrouter.ModelLatencyTable())
+    monkeypatch.setattr(openrouter, "chat_completion", chat_completion)
+    return state
+
+
+def test_vision_auto_moves_to_the_next_model(client, models):
+    first, second = openrouter.latency_table.ranked("vision")[:2]
+    models["failing"].add(first)
+    response = client.post("/openrouter/vision", json={"image_url": "https://example.com/leaf.jpg", "model": "auto"})
+    assert response.status_code == 200
+    assert response.get_json()["model"] == second
+    assert models["tried"] == [first, second]
+
+
+def test_text_auto_moves_to_the_next_model(client, models):
+    first, second = openrouter.latency_table.ranked("text")[:2]
+    models["failing"].add(first)
+    response = client.post("/openrouter/chat", json={"message": "wheat rust?", "model": "auto"})
+    assert response.get_json()["model"] == second
+
+
+def test_auto_fails_after_auto_attempts(client, models):
+    models["failing"].update(openrouter.AUTO_CANDIDATES["vision"])
+    response = client.post("/openrouter/vision", json={"image_url": "https://example.com/leaf.jpg", "model": "auto"})
+    assert response.status_code == 500
+    assert len(models["tried"]) == openrouter.AUTO_ATTEMPTS
+
+
+def test_explicit_vision_model_is_not_replaced(client, models):
+    models["failing"].add("qwen/qwen2.5-vl-72b-instruct:free")
+    response = client.post("/openrouter/vision", json={"image_url": "https://example.com/leaf.jpg",
+                                                       "model": "qwen/qwen2.5-vl-72b-instruct:free"})
+    assert response.status_code == 500
+    assert models["tried"] == ["qwen/qwen2.5-vl-72b-instruct:free"]
+
+
+def test_comparison_finishing_after_the_deadline_is_still_reported(monkeypatch):
+    release = openrouter.threading.Event()
+
+    def compare_one(preset, message, lang, timeout):
+        if preset == "slow":
+            release.wait(5)
+        return {"model": preset, "preset": preset, "response": "ok", "latency_s": 0}
+
+    def as_completed(futures, timeout=None):
+        # The deadline fires, then "late" finishes before the handler looks at it
+        late = next(f for f, preset in futures.items() if preset == "late")
+        late.result()
+        raise openrouter.FutureTimeout()
+
+    monkeypatch.setattr(openrouter, "compare_one", compare_one)
+    monkeypatch.setattr(openrouter, "as_completed", as_completed)
+    try:
+        entries = {e["preset"]: e for e in openrouter.run_comparisons(["late", "slow"], "q", "en", 1)}
+    finally:
+        release.set()
+    assert entries["late"]["response"] == "ok"
+    assert "error" in entries["slow"]
@@ -0,0 +1,160 @@
+import time
+
+import numpy as np
+import pytest
+
+from app import prices
+from app.routes import prices as prices_routes
+
+
+def random_series(rng, n_series=300, max_days=60):
+    """Sorted unique (series, day) keys with NaN-sprinkled prices, as PriceIndex stores them"""
+    series, days = [], []
+    for s in range(n_series):
+        d = np.unique(rng.integers(19000, 19000 + 120, size=rng.integers(1, max_days)))
+        series.extend([s] * len(d))
+        days.extend(d.tolist())
+    series = np.asarray(series, dtype=np.int64)
+    days = np.asarray(days, dtype=np.int64)
+    keys = (series << prices._DAY_BITS) | days
+
+    def prices_with_gaps():
+        values = rng.uniform(500, 5000, size=len(keys))
+        values[rng.random(len(keys)) < 0.1] = np.nan
+        return values
+
+    return keys, series, days, prices_with_gaps(), prices_with_gaps(), prices_with_gaps()
+
+
+def naive(keys, series, days, mins, maxs, modal, window):
+    n = len(keys)
+    out = {name: np.full(n, np.nan) for name in ("rolling_min", "rolling_max", "rolling_mean", "wow_change_pct")}
+    for i in range(n):
+        rows = [j for j in range(i + 1) if series[j] == series[i] and days[j] >= days[i] - (window - 1)]
+        if not np.isnan(mins[rows]).all():
+            out["rolling_min"][i] = np.nanmin(mins[rows])
+        if not np.isnan(maxs[rows]).all():
+            out["rolling_max"][i] = np.nanmax(maxs[rows])
+        if not np.isnan(modal[rows]).all():
+            out["rolling_mean"][i] = np.nanmean(modal[rows])
+        earlier = [j for j in range(i) if series[j] == series[i] and days[j] <= days[i] - prices.WOW_DAYS]
+        if earlier and days[i] - days[earlier[-1]] <= prices.WOW_MAX_LOOKBACK:
+            out["wow_change_pct"][i] = (modal[i] - modal[earlier[-1]]) / modal[earlier[-1]] * 100
+    return out
+
+
+@pytest.mark.parametrize("window", [1, 7, 30])
+def test_rolling_stats_match_a_naive_loop(window):
+    rng = np.random.default_rng(window)
+    data = random_series(rng, n_series=60)
+    fast = prices.rolling_stats(*data, window)
+    slow = naive(*data, window)
+    for name in slow:
+        np.testing.assert_allclose(fast[name], slow[name], equal_nan=True, err_msg=name)
+
+
+def test_range_reduce_matches_slices():
+    rng = np.random.default_rng(0)
+    values = rng.uniform(0, 100, size=500)
+    values[rng.random(500) < 0.2] = np.nan
+    starts = np.maximum(np.arange(500) - rng.integers(0, 40, size=500), 0)
+    for func, reference in ((np.fmin, np.nanmin), (np.fmax, np.nanmax)):
+        result = prices.range_reduce(values, starts, func)
+        for i in range(500):
+            window = values[starts[i]:i + 1]
+            expected = np.nan if np.isnan(window).all() else reference(window)
+            assert result[i] == pytest.approx(expected, nan_ok=True)
+
+
+def test_range_reduce_empty():
+    assert prices.range_reduce(np.array([]), np.array([], dtype=np.int64), np.fmin).size == 0
+
+
+RECORDS = [
+    {"commodity": "Onion", "market": "Lasalgaon", "state": "Maharashtra", "arrival_date": "2024-03-01",
+     "min_price": "1000", "max_price": "1400", "modal_price": "1200"},
+    {"commodity": "Onion", "market": "Lasalgaon", "state": "Maharashtra", "arrival_date": "01/03/2024",
+     "min_price": "900", "max_price": "1500", "modal_price": "1300"},  # same day, other format
+    {"commodity": "Onion", "market": "Lasalgaon", "state": "Maharashtra", "arrival_date": "2024-03-08",
+     "min_price": "1100", "max_price": "1600", "modal_price": "1500"},
+    {"Commodity": "onion", "Market": "Pimpalgaon", "State": "Maharashtra", "Arrival_Date": "2024-03-08",
+     "Min_Price": "1000", "Max_Price": "1300", "Modal_Price": "1100"},
+    {"commodity": "Onion", "market": "", "arrival_date": "2024-03-08", "modal_price": "1"},  # no market
+]
+
+
+def test_index_merges_duplicate_days_and_reads_field_variants():
+    index = prices.PriceIndex(RECORDS)
+    assert index.stats()["rows"] == 3
+    assert index.stats()["series"] == 2
+    assert index.skipped == 1
+
+    lasalgaon = index.series_for("onion", market="lasalgaon")[0]["prices"]
+    assert [row["date"] for row in lasalgaon] == ["2024-03-01", "2024-03-08"]
+    assert lasalgaon[0]["min_price"] == 900 and lasalgaon[0]["max_price"] == 1500
+    assert lasalgaon[0]["modal_price"] == 1250
+    assert lasalgaon[1]["wow_change_pct"] == 20.0
+    assert lasalgaon[1]["rolling_min"] == 1100  # 7-day window excludes 1 March
+
+
+def test_non_default_window_matches_a_full_rebuild():
+    index = prices.PriceIndex(RECORDS)
+    wide = prices.PriceIndex(RECORDS, window=14)
+    assert index.latest("Onion", window=14) == wide.latest("Onion")
+    assert index.latest("Onion", window=14)[0]["rolling_min"] == 900
+
+
+def test_parse_date_formats():
+    expected = prices.parse_date("2024-03-01")
+    for value in ("01/03/2024", "01-03-2024", "2024/03/01", "01-Mar-2024", "2024-03-01T00:00:00"):
+        assert prices.parse_date(value) == expected
+    assert prices.parse_date("yesterday") is None
+
+
+@pytest.fixture
+def failing_source(monkeypatch):
+    """Index builds fail; counts the attempts"""
+    attempts = []
+
+    def load_agmarknet_records():
+        attempts.append(1)
+        raise ConnectionError("UPAg down")
+
+    monkeypatch.setattr(prices_routes, "load_agmarknet_records", load_agmarknet_records)
+    monkeypatch.setattr(prices_routes, "_index", None)
+    monkeypatch.setattr(prices_routes, "_last_error", None)
+    monkeypatch.setattr(prices_routes, "_last_failure_at", 0.0)
+    monkeypatch.setattr(prices_routes, "_rebuilding", False)
+    return attempts
+
+
+def test_failed_first_build_is_not_retried_on_every_request(failing_source, monkeypatch):
+    for _ in range(3):
+        with pytest.raises(Exception):
+            prices_routes.get_index()
+    assert len(failing_source) == 1
+    monkeypatch.setattr(prices_routes, "_last_failure_at", time.time() - prices_routes.PRICE_INDEX_RETRY - 1)
+    with pytest.raises(ConnectionError):
+        prices_routes.get_index()
+    assert len(failing_source) == 2
+
+
+def test_failed_rebuild_serves_the_stale_index_without_retrying(failing_source, monkeypatch):
+    stale = prices.PriceIndex(RECORDS)
+    stale.built_at -= prices_routes.PRICE_INDEX_TTL + 1
+    monkeypatch.setattr(prices_routes, "_index", stale)
+    monkeypatch.setattr(prices_routes.threading, "Thread", InlineThread)
+    for _ in range(3):
+        assert prices_routes.get_index() is stale
+    assert len(failing_source) == 1
+    assert not prices_routes._rebuilding
+
+
+class InlineThread:
+    """threading.Thread stand-in that runs the target on start()"""
+
+    def __init__(self, target, daemon=None):
+        self.target = target
+
+    def start(self):
+        self.target()
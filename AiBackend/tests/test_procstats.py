@@ -0,0 +1,31 @@
+import builtins
+import importlib
+import sys
+
+from app import procstats
+
+
+def test_rss_without_proc_or_resource_is_unknown(monkeypatch):
+    def no_proc(path, *args, **kwargs):
+        raise FileNotFoundError(path)
+
+    monkeypatch.setattr(builtins, "open", no_proc)
+    monkeypatch.setattr(procstats, "resource", None)
+    assert procstats.rss_mb() is None
+    assert procstats.rss_delta_mb(None) is None
+    assert procstats.memory_usage() == {"rss_mb": None}
+
+
+def test_rss_delta(monkeypatch):
+    monkeypatch.setattr(procstats, "rss_mb", lambda: 120.5)
+    assert procstats.rss_delta_mb(100.25) == 20.25
+
+
+def test_procstats_imports_without_the_resource_module(monkeypatch):
+    monkeypatch.setitem(sys.modules, "resource", None)  # import resource -> ImportError
+    try:
+        module = importlib.reload(procstats)
+        assert module.resource is None
+    finally:
+        monkeypatch.undo()
+        importlib.reload(procstats)
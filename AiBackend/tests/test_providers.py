@@ -0,0 +1,96 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app import providers
+
+
+@pytest.fixture
+def breaker(monkeypatch):
+    """A fresh breaker for groq, already opened, with no cooldown"""
+    breaker = providers.CircuitBreaker("groq")
+    monkeypatch.setitem(providers._breakers, "groq", breaker)
+    monkeypatch.setattr(providers, "BREAKER_COOLDOWN", 0)
+    for _ in range(providers.BREAKER_CONSECUTIVE):
+        breaker.record(False, 0.1)
+    assert breaker.state == "open"
+    return breaker
+
+
+def half_open(breaker):
+    assert breaker.allow()
+    assert breaker.state == "half_open" and breaker.trial_in_flight
+
+
+def test_closed_breaker_opens_after_consecutive_failures(monkeypatch):
+    breaker = providers.CircuitBreaker("groq")
+    for _ in range(providers.BREAKER_CONSECUTIVE - 1):
+        breaker.record(False, 0.1)
+    assert breaker.state == "closed"
+    breaker.record(False, 0.1)
+    assert breaker.state == "open"
+
+
+def test_half_open_allows_a_single_trial(breaker):
+    half_open(breaker)
+    assert not breaker.allow()
+    assert not breaker.available()
+
+
+def test_half_open_trial_success_closes(breaker, monkeypatch):
+    monkeypatch.setattr(providers, "get_generate", lambda name: lambda *args: {"response": "ok", "model": "m"})
+    half_open(breaker)
+    assert providers.call_provider("groq", [], "advisory", "English")["response"] == "ok"
+    assert breaker.state == "closed"
+
+
+def test_half_open_trial_failure_reopens(breaker, monkeypatch):
+    def generate(*args):
+        raise providers.ProviderError("upstream 500")
+
+    monkeypatch.setattr(providers, "get_generate", lambda name: generate)
+    half_open(breaker)
+    with pytest.raises(providers.ProviderError):
+        providers.call_provider("groq", [], "advisory", "English")
+    assert breaker.state == "open" and not breaker.trial_in_flight
+    half_open(breaker)  # not stuck: the next cooldown allows another trial
+
+
+def test_provider_import_failure_reopens(breaker, monkeypatch):
+    def get_generate(name):
+        raise ImportError("no module named app.routes.groq")
+
+    monkeypatch.setattr(providers, "get_generate", get_generate)
+    half_open(breaker)
+    with pytest.raises(ImportError):
+        providers.call_provider("groq", [], "advisory", "English")
+    assert breaker.state == "open" and not breaker.trial_in_flight
+    half_open(breaker)
+
+
+def test_submit_failure_reopens(breaker, monkeypatch):
+    executor = ThreadPoolExecutor(max_workers=1)
+    executor.shutdown()
+    monkeypatch.setattr(providers, "_executor", executor)
+    monkeypatch.setattr(providers, "get_generate", lambda name: lambda *args: {"response": "ok", "model": "m"})
+    half_open(breaker)
+    with pytest.raises(RuntimeError):
+        providers.call_provider("groq", [], "advisory", "English")
+    assert breaker.state == "open" and not breaker.trial_in_flight
+
+
+def test_hedged_launch_failure_moves_to_next_provider(monkeypatch):
+    for name in providers.PROVIDERS:
+        monkeypatch.setitem(providers._breakers, name, providers.CircuitBreaker(name))
+    monkeypatch.setattr(providers, "configured_providers", lambda: ["gemini", "groq"])
+
+    def get_generate(name):
+        if name == "gemini":
+            raise ImportError("gemini SDK missing")
+        return lambda *args: {"response": "ok", "model": "m"}
+
+    monkeypatch.setattr(providers, "get_generate", get_generate)
+    result, attempts, hedge = providers.generate_hedged([], delay=0)
+    assert result["provider"] == "groq"
+    assert attempts[0]["provider"] == "gemini" and "error" in attempts[0]
+    assert providers._breakers["gemini"].consecutive_failures == 1
@@ -0,0 +1,85 @@
+import json
+import threading
+
+import numpy as np
+import pytest
+
+from app import soil, soil_store
+
+# 2x2 grid of 1° cells from (10N, 70E); only pH and nitrogen imported
+LAYERS = ["soil_ph", "soil_nitrogen"]
+UPSTREAM = {
+    "soil_ph": 7.9,
+    "soil_nitrogen": 0.4,
+    "soil_organic_carbon": 2.5,
+    "soil_clay": 31.0,
+    "soil_organic_carbon_stock": 44.0,
+}
+
+
+@pytest.fixture
+def store(tmp_path):
+    data = np.array([
+        [[65, 70], [soil_store.NODATA, soil_store.NODATA]],  # soil_ph
+        [[12, soil_store.NODATA], [soil_store.NODATA, soil_store.NODATA]],  # soil_nitrogen
+    ], dtype=np.int16)
+    np.save(tmp_path / "soil.npy", data)
+    (tmp_path / "meta.json").write_text(json.dumps({"layers": LAYERS, "west": 70.0, "north": 12.0, "res_deg": 1.0}))
+    return soil_store.SoilStore(str(tmp_path))
+
+
+@pytest.fixture
+def upstream(monkeypatch, tmp_path, store):
+    calls = []
+
+    def fetch_soil(lat, lon):
+        calls.append((lat, lon))
+        return dict(UPSTREAM)
+
+    monkeypatch.setattr(soil_store, "get_store", lambda: store)
+    monkeypatch.setattr(soil, "fetch_soil", fetch_soil)
+    monkeypatch.setattr(soil, "SOIL_CACHE_PATH", str(tmp_path / "soil.sqlite3"))
+    monkeypatch.setattr(soil, "_local", threading.local())
+    return calls
+
+
+def test_store_lookup_reports_missing_layers_as_none(store):
+    assert store.lookup(11.5, 70.5) == {"soil_ph": 65, "soil_nitrogen": 12}
+    assert store.lookup(11.5, 71.5) == {"soil_ph": 70, "soil_nitrogen": None}
+    assert store.lookup(10.5, 70.5) is None  # every layer nodata
+    assert store.lookup(20.0, 70.5) is None  # outside the extent
+
+
+def test_layers_not_imported_come_from_openepi(upstream):
+    result = soil.get_soil(11.5, 70.5)
+    assert result["soil_ph"] == 65
+    assert result["soil_nitrogen"] == 12
+    assert result["soil_organic_carbon"] == UPSTREAM["soil_organic_carbon"]
+    assert result["soil_clay"] == UPSTREAM["soil_clay"]
+    assert result["soil_organic_carbon_stock"] == UPSTREAM["soil_organic_carbon_stock"]
+    assert len(upstream) == 1
+
+
+def test_nodata_layer_comes_from_openepi_and_is_cached(upstream):
+    first = soil.get_soil(11.5, 71.5)
+    second = soil.get_soil(11.5, 71.5)
+    assert first == second
+    assert first["soil_ph"] == 70
+    assert first["soil_nitrogen"] == UPSTREAM["soil_nitrogen"]
+    assert len(upstream) == 1  # second lookup served from the cell cache
+
+
+def test_complete_store_hit_skips_openepi(upstream, monkeypatch, store):
+    monkeypatch.setattr(soil, "DEFAULTS", {key: soil.DEFAULTS[key] for key in LAYERS})
+    assert soil.get_soil(11.5, 70.5) == {"soil_ph": 65, "soil_nitrogen": 12}
+    assert upstream == []
+
+
+def test_failed_fetch_keeps_store_values(upstream, monkeypatch):
+    def fail(lat, lon):
+        raise ConnectionError("openepi down")
+
+    monkeypatch.setattr(soil, "fetch_soil", fail)
+    result = soil.get_soil(11.5, 70.5)
+    assert result["soil_ph"] == 65
+    assert result["soil_clay"] == soil.DEFAULTS["soil_clay"]
@@ -0,0 +1,213 @@
+import io
+import threading
+
+import fitz
+import pytest
+from flask import Flask
+
+from app import pdf_text, translate_cache
+from app.routes import translate
+
+
+def make_pdf(pages):
+    doc = fitz.open()
+    for text in pages:
+        doc.new_page().insert_textbox(fitz.Rect(20, 20, 590, 820), text, fontsize=5)
+    return doc.tobytes()
+
+
+@pytest.fixture
+def client(monkeypatch, tmp_path):
+    monkeypatch.setattr(translate_cache, "TRANSLATE_CACHE_PATH", str(tmp_path / "translate.sqlite3"))
+    monkeypatch.setattr(translate_cache, "_local", threading.local())
+    monkeypatch.setattr(translate, "retrieve_references", lambda query: [])
+    app = Flask(__name__)
+    app.config["MAX_CONTENT_LENGTH"] = pdf_text.MAX_REQUEST_BYTES
+    app.register_blueprint(translate.translate_bp)
+    return app.test_client()
+
+
+@pytest.fixture
+def groq(monkeypatch):
+    """Fake Groq: chunk calls answer with their page range; `fail_reduce` makes the merge call fail"""
+    state = {"calls": 0, "fail_reduce": False}
+
+    def groq_chat(messages, temperature=0.4, max_tokens=None):
+        state["calls"] += 1
+        prompt = messages[-1]["content"]
+        if prompt.startswith("Below are explanations"):
+            if state["fail_reduce"]:
+                raise ConnectionError("groq 503")
+            return "merged"
+        return "part"
+
+    monkeypatch.setattr(translate, "groq_chat", groq_chat)
+    return state
+
+
+def test_split_text_keeps_paragraphs_together():
+    text = "\n\n".join(["a" * 40, "b" * 40, "c" * 40])
+    assert translate.split_text(text, 90) == ["a" * 40 + "\n\n" + "b" * 40, "c" * 40]
+
+
+def test_split_text_cuts_long_paragraphs():
+    pieces = translate.split_text("x" * 250, 100)
+    assert [len(piece) for piece in pieces] == [100, 100, 50]
+
+
+def test_split_chunks_groups_pages_within_the_limit():
+    chunks = translate.split_chunks(["one " * 10, "two " * 10, "", "three " * 30], max_chars=100)
+    assert [chunk["pages"] for chunk in chunks] == [(1, 2), (4, 4), (4, 4)]
+    assert all(len(chunk["text"]) <= 100 for chunk in chunks)
+    assert "".join(chunk["text"] for chunk in chunks).replace("\n", "").replace(" ", "") == \
+        ("one" * 10 + "two" * 10 + "three" * 30)
+
+
+def test_split_chunks_of_an_empty_document():
+    assert translate.split_chunks(["", "  \n "]) == []
+
+
+def post(client, pdf, language="Hindi", path="/translate"):
+    return client.post(path, data={"file": (io.BytesIO(pdf), "circular.pdf"), "target_language": language},
+                       content_type="multipart/form-data")
+
+
+# About 4000 characters a page, so the document spans several TRANSLATE_CHUNK_CHARS chunks
+PAGES = ["Scheme clause. " * 270, "Eligibility rule. " * 230, "Subsidy amount. " * 250]
+
+
+def test_merged_result_is_cached(client, groq):
+    pdf = make_pdf(PAGES)
+    first = post(client, pdf).get_json()
+    assert first["reduce"] == "merged" and first["cache"] == "miss"
+    calls = groq["calls"]
+    second = post(client, pdf).get_json()
+    assert second["cache"] == "hit"
+    assert second["translated_document"] == "merged"
+    assert groq["calls"] == calls
+
+
+def test_concatenated_result_is_not_cached(client, groq):
+    pdf = make_pdf(PAGES)
+    groq["fail_reduce"] = True
+    first = post(client, pdf).get_json()
+    assert first["reduce"] == "concatenated"
+
+    groq["fail_reduce"] = False
+    second = post(client, pdf).get_json()
+    assert second["cache"] == "miss"
+    assert second["reduce"] == "merged"
+
+
+def test_failed_chunk_is_retried_once(client, groq, monkeypatch):
+    chat = translate.groq_chat
+    failures = []
+
+    def flaky(messages, **kwargs):
+        if messages[-1]["content"].startswith("This is") and not failures:
+            failures.append(1)
+            raise ConnectionError("groq 502")
+        return chat(messages, **kwargs)
+
+    monkeypatch.setattr(translate, "groq_chat", flaky)
+    response = post(client, make_pdf(PAGES))
+    assert response.status_code == 200
+    assert failures == [1]
+
+
+def test_failed_document_cancels_queued_chunks(client, monkeypatch):
+    started = []
+    release = threading.Event()
+
+    def groq_chat(messages, **kwargs):
+        started.append(1)
+        if len(started) <= 2:
+            raise ConnectionError("groq 500")  # first chunk fails, and its retry
+        release.wait(5)
+        return "part"
+
+    monkeypatch.setattr(translate, "groq_chat", groq_chat)
+    monkeypatch.setattr(translate, "_translate_executor", translate.ThreadPoolExecutor(max_workers=1))
+    pages = ["Clause text. " * 300] * 12  # 12 chunks queued behind one worker
+    response = post(client, make_pdf(pages))
+    release.set()
+    translate._translate_executor.shutdown(wait=True)
+    assert response.status_code == 500
+    # The worker may already have picked up the next chunk; the other ten never run
+    assert len(started) <= 3
+
+
+@pytest.mark.parametrize("path", ["/translate", "/translate/stream"])
+def test_non_pdf_upload_is_a_400_without_the_spool_path(client, groq, path):
+    response = post(client, b"this is not a pdf" * 100, path=path)
+    assert response.status_code == 400
+    error = response.get_json()["error"]
+    assert error == "PDF appears empty or unreadable."
+    assert pdf_text.SPOOL_DIR is None or pdf_text.SPOOL_DIR not in error
+
+
+@pytest.mark.parametrize("path", ["/translate", "/translate/stream"])
+def test_chunked_upload_over_the_limit_is_refused(client, groq, path, monkeypatch):
+    def spool_upload(*args):
+        raise AssertionError("body should be refused before it is spooled")
+
+    monkeypatch.setattr(pdf_text, "spool_upload", spool_upload)
+    limit = client.application.config["MAX_CONTENT_LENGTH"]
+    body = (b"--b\r\nContent-Disposition: form-data; name=\"file\"; filename=\"big.pdf\"\r\n\r\n"
+            + b"0" * (limit + 1) + b"\r\n--b--\r\n")
+    response = client.post(path, input_stream=io.BytesIO(body), content_type="multipart/form-data; boundary=b",
+                           headers={"Transfer-Encoding": "chunked"},
+                           environ_overrides={"wsgi.input_terminated": True})  # as gunicorn sets for chunked bodies
+    assert response.status_code == 413
+    assert response.get_json()["error"] == pdf_text.too_large_message()
+
+
+def test_result_too_long_to_merge_is_cached_as_sections(client, groq, monkeypatch):
+    monkeypatch.setattr(translate, "REDUCE_MAX_CHARS", 5)
+    pdf = make_pdf(PAGES)
+    first = post(client, pdf).get_json()
+    assert first["reduce"] == "sections"
+    assert first["translated_document"].startswith("### Page")
+    calls = groq["calls"]
+
+    second = post(client, pdf).get_json()
+    assert second["cache"] == "hit" and second["reduce"] == "sections"
+    assert groq["calls"] == calls
+
+
+def test_windowed_chunks_share_the_pool_with_other_documents(monkeypatch):
+    monkeypatch.setattr(translate, "_translate_executor", translate.ThreadPoolExecutor(max_workers=1))
+    order = []
+    gate = threading.Event()
+
+    def work(item):
+        gate.wait(5)
+        order.append(item)
+        return item
+
+    big = translate.submit_windowed(work, ["a1", "a2", "a3", "a4"], limit=1)
+    small = translate.submit_windowed(work, ["b1"], limit=1)
+    gate.set()
+    assert [f.result(5) for f in big] == ["a1", "a2", "a3", "a4"]
+    assert small[0].result(5) == "b1"
+    translate._translate_executor.shutdown(wait=True)
+    # b1 queued behind only the one chunk of the big document in the pool
+    assert order.index("b1") == 1
+
+
+def test_windowed_chunks_skip_cancelled_items(monkeypatch):
+    monkeypatch.setattr(translate, "_translate_executor", translate.ThreadPoolExecutor(max_workers=1))
+    gate = threading.Event()
+    ran = []
+
+    def work(item):
+        gate.wait(5)
+        ran.append(item)
+        return item
+
+    futures = translate.submit_windowed(work, [1, 2, 3], limit=1)
+    assert all(f.cancel() for f in futures[1:])
+    gate.set()
+    assert futures[0].result(5) == 1
+    translate._translate_executor.shutdown(wait=True)
+    assert ran == [1]
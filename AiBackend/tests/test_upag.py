@@ -0,0 +1,141 @@
+import threading
+import time
+
+import pytest
+
+from app.routes import upag
+
+
+def test_cursor_round_trip():
+    cursor = upag.encode_cursor("agmarknet", 12000)
+    assert "=" not in cursor
+    assert upag.decode_cursor(cursor, "agmarknet") == 12000
+
+
+@pytest.mark.parametrize("cursor", ["", "not-base64!", upag.encode_cursor("dafw_state", 10)])
+def test_cursor_rejects_malformed_or_foreign_cursors(cursor):
+    with pytest.raises(ValueError):
+        upag.decode_cursor(cursor, "agmarknet")
+
+
+def test_cursor_rejects_negative_offset():
+    with pytest.raises(ValueError):
+        upag.decode_cursor(upag.encode_cursor("agmarknet", -1), "agmarknet")
+
+
+@pytest.fixture
+def source(monkeypatch):
+    """Fake UPAg source of `total` records; pages answer out of order, concurrency is tracked"""
+    state = {"total": 2350, "in_flight": 0, "peak": 0, "calls": [], "cap": None}
+    lock = threading.Lock()
+
+    def fetch_source_page(source_name, source_input, offset, limit, timeout=60):
+        with lock:
+            state["calls"].append(offset)
+            state["in_flight"] += 1
+            state["peak"] = max(state["peak"], state["in_flight"])
+        time.sleep(0.02 if (offset // limit) % 2 else 0.001)  # odd pages finish last
+        with lock:
+            state["in_flight"] -= 1
+        limit = min(limit, state["cap"] or limit)
+        records = [{"n": i} for i in range(offset, min(offset + limit, state["total"]))]
+        return records, state["total"]
+
+    monkeypatch.setattr(upag, "fetch_source_page", fetch_source_page)
+    return state
+
+
+def collect(start=0, page_size=100, concurrency=4, max_records=None):
+    pages = list(upag.export_pages("agmarknet", {}, start, page_size, concurrency, max_records))
+    return pages, [record["n"] for _, records, _ in pages for record in records]
+
+
+def test_export_yields_every_record_in_order(source):
+    pages, numbers = collect()
+    assert numbers == list(range(source["total"]))
+    assert [offset for offset, _, _ in pages] == list(range(0, source["total"], 100))
+    assert all(total == source["total"] for _, _, total in pages)
+    assert 1 < source["peak"] <= 4
+
+
+def test_export_resumes_from_an_offset(source):
+    _, numbers = collect(start=1700)
+    assert numbers == list(range(1700, source["total"]))
+
+
+def test_export_stops_at_max_records(source):
+    _, numbers = collect(start=50, max_records=230)
+    assert numbers == list(range(50, 280))
+    assert max(source["calls"]) < 280
+
+
+def test_export_stops_after_a_short_page_without_a_total(source, monkeypatch):
+    fetch = upag.fetch_source_page
+
+    def no_total(*args, **kwargs):
+        records, _ = fetch(*args, **kwargs)
+        return records, 0
+
+    monkeypatch.setattr(upag, "fetch_source_page", no_total)
+    _, numbers = collect(concurrency=1)
+    assert numbers == list(range(source["total"]))
+    assert len(source["calls"]) == 24  # 23 full pages and one short page
+
+
+def test_export_continues_when_upstream_caps_its_page_size(source):
+    source["cap"] = 30
+    pages, numbers = collect(page_size=100)
+    assert numbers == list(range(source["total"]))
+    assert [len(records) for _, records, _ in pages][:3] == [30, 30, 30]
+
+
+def test_export_stops_on_an_empty_page(source, monkeypatch):
+    fetch = upag.fetch_source_page
+
+    def overstated_total(*args, **kwargs):
+        records, _ = fetch(*args, **kwargs)
+        return records, 5000  # upstream claims more than it has
+
+    monkeypatch.setattr(upag, "fetch_source_page", overstated_total)
+    _, numbers = collect()
+    assert numbers == list(range(source["total"]))
+
+
+def test_failed_login_is_not_retried_until_the_backoff_passes(monkeypatch):
+    clock = [1000.0]
+    attempts = []
+
+    def login():
+        attempts.append(clock[0])
+        if len(attempts) == 1:
+            raise ConnectionError("UPAg down")
+        return "token-2", 600
+
+    monkeypatch.setattr(upag.time, "time", lambda: clock[0])
+    tokens = upag.TokenManager(login)
+    assert tokens.get() is None
+    assert tokens.get() is None  # within the backoff: no second login
+    assert len(attempts) == 1
+    clock[0] += upag.TOKEN_LOGIN_RETRY + 1
+    assert tokens.get() == "token-2"
+    assert len(attempts) == 2
+
+
+def test_failed_background_refresh_keeps_the_token_and_backs_off(monkeypatch):
+    clock = [1000.0]
+    results = [("token-1", 600), None]
+
+    def login():
+        result = results.pop(0)
+        if result is None:
+            raise ConnectionError("UPAg down")
+        return result
+
+    monkeypatch.setattr(upag.time, "time", lambda: clock[0])
+    tokens = upag.TokenManager(login)
+    assert tokens.get() == "token-1"
+    clock[0] += 590  # inside the refresh margin
+    assert tokens.refresh(stale="token-1") is None  # the refresh fails
+    assert tokens.get() == "token-1"
+    assert not tokens._refreshing  # no background login during the backoff
+    assert results == []
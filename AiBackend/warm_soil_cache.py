@@ -0,0 +1,81 @@
+"""
+Pre-populate the on-disk soil cache (app/soil.py) for a list of districts,
+so fertilizer recommendations there never wait on openepi.
+
+    cd AiBackend
+    python warm_soil_cache.py districts.csv --radius-km 25 --workers 4
+
+districts.csv needs `district,latitude,longitude` columns (an optional
+`radius_km` column overrides --radius-km per district). Every soil grid
+cell within the radius of each district centre is fetched once; cells
+already on disk are skipped, so the script can be re-run after a failure.
+"""
+import argparse
+import csv
+import math
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from app import soil
+
+
+def cells_around(lat, lon, radius_km):
+    """Soil grid cells whose centres lie within radius_km of (lat, lon)"""
+    grid = soil.SOIL_GRID_DEG
+    centre = soil.snap(lat, lon)
+    dlat = radius_km / 111.0
+    dlon = radius_km / (111.0 * max(math.cos(math.radians(lat)), 0.01))
+    steps_lat, steps_lon = int(dlat / grid), int(dlon / grid)
+
+    cells = []
+    for i in range(-steps_lat, steps_lat + 1):
+        for j in range(-steps_lon, steps_lon + 1):
+            cell = soil.snap(centre[0] + i * grid, centre[1] + j * grid)
+            if ((cell[0] - lat) / dlat) ** 2 + ((cell[1] - lon) / dlon) ** 2 <= 1 or (i, j) == (0, 0):
+                cells.append(cell)
+    return cells
+
+
+def read_districts(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        return list(csv.DictReader(f))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("districts", help="CSV with district,latitude,longitude[,radius_km]")
+    parser.add_argument("--radius-km", type=float, default=0, help="cover cells this far from each centre")
+    parser.add_argument("--workers", type=int, default=4, help="concurrent openepi requests")
+    args = parser.parse_args()
+
+    cells = {}
+    for row in read_districts(args.districts):
+        radius = float(row.get("radius_km") or args.radius_km)
+        for cell in cells_around(float(row["latitude"]), float(row["longitude"]), radius):
+            cells.setdefault(cell, row.get("district", ""))
+
+    todo = [cell for cell in cells if not soil.is_cached(*cell)]
+    print(f"{len(cells)} soil cells ({soil.SOIL_GRID_DEG}°) for the districts, {len(cells) - len(todo)} already cached")
+
+    started = time.perf_counter()
+    failed = []
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        futures = {pool.submit(soil.lookup, *cell): cell for cell in todo}
+        for done, future in enumerate(as_completed(futures), 1):
+            cell = futures[future]
+            try:
+                future.result()
+            except Exception as e:
+                failed.append(cell)
+                print(f"  ❌ {cells[cell]} {cell}: {e}")
+            if done % 50 == 0 or done == len(todo):
+                print(f"  {done}/{len(todo)} cells ({time.perf_counter() - started:.1f}s)")
+
+    print(f"Cached {len(todo) - len(failed)} cells in {time.perf_counter() - started:.1f}s, "
+          f"{len(failed)} failed (re-run to retry)")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())